@@ -1,59 +1,147 @@
-from jinja2 import Environment, FileSystemLoader
+"""
+Salida HTML de los resultados. La plantilla se compila una sola vez, la primera
+vez que se pide, y cada página se produce con Template.generate a medida que se
+recorren las filas: ni el resultado ni la página completa se guardan en memoria.
+"""
+from collections import deque
+from itertools import chain, islice
 
-class HtmlGenerator:
-    def __init__(self):
-        self.env = Environment(loader=FileSystemLoader('.'))
+from jinja2 import Environment
+
+PLANTILLA = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <title>Resultados SQL{% if pagina > 1 %} (página {{ pagina }}){% endif %}</title>
+    <style>
+        table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
+        th, td { border: 1px solid black; padding: 8px; text-align: left; }
+        th { background-color: #f2f2f2; }
+        .mensaje { margin-bottom: 10px; font-weight: bold; }
+    </style>
+</head>
+<body>
+    <h2>Resultados SQL{% if pagina > 1 %} (página {{ pagina }}){% endif %}</h2>
+{% for seccion in secciones %}
+    <h3>Resultado {{ seccion.numero }}{% if seccion.continuacion %} (continuación){% endif %}</h3>
+    <table>
+        <thead>
+            <tr>{% for col in seccion.columnas %}<th>{{ col }}</th>{% endfor %}</tr>
+        </thead>
+        <tbody>
+{% for fila in seccion.filas %}
+            <tr>{% for valor in fila %}<td>{{ valor }}</td>{% endfor %}</tr>
+{% endfor %}
+        </tbody>
+    </table>
+{% endfor %}
+{% for mensaje in mensajes %}
+    <p class="mensaje">{{ mensaje }}</p>
+{% endfor %}
+{% for enlace in siguiente %}
+    <p><a href="{{ enlace }}">Página siguiente</a></p>
+{% endfor %}
+</body>
+</html>
+"""
+
+_template = None
+
+
+def template():
+    """Plantilla compilada (se compila la primera vez que se pide)."""
+    global _template
+    if _template is None:
+        _template = Environment(trim_blocks=True, lstrip_blocks=True).from_string(PLANTILLA)
+    return _template
+
+
+class Pages:
+    """
+    Reparte los eventos de Executor.execute_stream en páginas de como mucho
+    page_rows filas (None: una sola página). Un resultado que no cabe sigue en
+    la página siguiente. Los mensajes (los últimos max_messages) se muestran al
+    final de la última página.
+    """
+
+    def __init__(self, events, page_rows=None, max_messages=None):
+        self.events = iter(events)
+        self.page_rows = page_rows
+        self.messages = deque(maxlen=max_messages)
+        self.results = 0
+        # Sección por empezar o a medias para la página siguiente
+        self.pending = None
+        self.done = False
+
+    def next_section(self):
+        for kind, value in self.events:
+            if kind == 'RESULTADO':
+                self.results += 1
+                columns, rows = value
+                return {'numero': self.results, 'columnas': columns, 'filas': iter(rows), 'continuacion': False}
+            self.messages.append(value)
+        return None
 
-    def generate_html(self, resultados, mensajes):
+    def sections(self):
+        """Secciones de la página actual; la plantilla las pide una a una."""
+        budget = self.page_rows
+        while budget is None or budget > 0:
+            section, self.pending = self.pending, None
+            if section is None:
+                section = self.next_section()
+            if section is None:
+                self.done = True
+                return
+            if budget is None:
+                yield section
+                continue
+            rows = section['filas']
+            chunk = list(islice(rows, budget))
+            budget -= len(chunk)
+            if budget == 0:
+                # Se mira si quedan filas (o resultados) para no dejar una última página vacía
+                row = next(rows, None)
+                if row is not None:
+                    self.pending = dict(section, filas=chain([row], rows), continuacion=True)
+                else:
+                    self.pending = self.next_section()
+                    self.done = self.pending is None
+            yield dict(section, filas=chunk)
+
+    def final_messages(self):
+        # Generador: se evalúa cuando la plantilla llega a los mensajes, ya recorrida la página
+        if self.done:
+            yield from self.messages
+
+    def next_link(self, href):
+        if not self.done:
+            yield href
+
+
+def render_pages(events, page_rows=None, max_messages=None, page_href=None):
+    """
+    Genera una página tras otra; cada una es un generador de trozos de HTML que
+    hay que consumir entero antes de pedir la siguiente. page_href(n) es el
+    enlace a la página n.
+    """
+    pages = Pages(events, page_rows, max_messages)
+    number = 1
+    while True:
+        href = page_href(number + 1) if page_href is not None else ''
+        yield template().generate(secciones=pages.sections(), mensajes=pages.final_messages(),
+                                  siguiente=pages.next_link(href), pagina=number)
+        if pages.done:
+            return
+        number += 1
+
+
+class HtmlGenerator:
+    def generate_html(self, resultados, mensajes, filename='salida.html'):
         """Genera un archivo HTML con los resultados de SQL y mensajes de éxito."""
-        template_str = """
-        <!DOCTYPE html>
-        <html lang="es">
-        <head>
-            <meta charset="UTF-8">
-            <title>Resultados SQL</title>
-            <style>
-                table { width: 100%; border-collapse: collapse; }
-                th, td { border: 1px solid black; padding: 8px; text-align: left; }
-                th { background-color: #f2f2f2; }
-                .mensaje { margin-bottom: 10px; font-weight: bold; }
-            </style>
-        </head>
-        <body>
-            <h2>Resultados SQL</h2>
-
-            {% for mensaje in mensajes %}
-                <p class="mensaje">{{ mensaje }}</p>
-            {% endfor %}
-
-            <table>
-                <thead>
-                    <tr>
-                        {% for col in columnas %}
-                            <th>{{ col }}</th>
-                        {% endfor %}
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for fila in datos %}
-                    <tr>
-                        {% for valor in fila %}
-                            <td>{{ valor }}</td>
-                        {% endfor %}
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-        </body>
-        </html>
-        """
-
-        template = self.env.from_string(template_str)
-        columnas, datos = resultados[0]
-
-        html_generado = template.render(columnas=columnas, datos=datos, mensajes=mensajes)
-
-        with open("salida.html", "w", encoding="utf-8") as archivo:
-            archivo.write(html_generado)
-
-        print("Archivo HTML generado correctamente como 'salida.html'.")
+        from sinks import HtmlSink
+
+        events = [('RESULTADO', resultado) for resultado in resultados]
+        events += [('MENSAJE', mensaje) for mensaje in mensajes]
+        HtmlSink(filename).write(events)
+
+        print(f"Archivo HTML generado correctamente como '{filename}'.")
@@ -0,0 +1,343 @@
+"""
+Agregación por hash para COUNT, SUM, MIN, MAX y AVG con GROUP BY.
+
+Se recorre el resultado una sola vez manteniendo un acumulador por grupo en un
+dict, así que la memoria depende del número de grupos y no del de filas.
+specs es una lista de (función, índice de columna o None para COUNT(*)). Como
+en SQL, los None (columnas de un LEFT JOIN sin pareja) no cuentan en COUNT(col)
+ni en SUM, AVG, MIN y MAX.
+
+group_states trabaja fila a fila (almacenamiento ROW). vector_states trabaja
+sobre las columnas de una ColumnarTable por bloques: sin GROUP BY usa
+sum/min/max sobre el array del bloque; con GROUP BY agrupa con np.unique y
+operaciones ufunc.at si hay numpy, o con un bucle corto por agregado si no.
+
+Ambos devuelven los acumuladores sin terminar; finish_groups y
+finish_vector_states calculan los valores finales. Entre medias, merge_states
+suma los acumuladores de tramos distintos de la tabla (los recorridos en
+paralelo de parallel.py).
+"""
+from array import array
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él se agrupa con un bucle sobre los arrays
+    np = None
+
+# Filas que vector_states procesa de una vez
+AGGREGATE_BLOCK = 1 << 16
+
+if np is not None:
+    _NUMPY_TYPES = {'q': np.int64, 'i': np.int32}
+
+
+def new_state(specs):
+    return [0 if func == 'COUNT' else [0, 0] if func == 'AVG' else None for func, _ in specs]
+
+
+def finish(state, specs, decoders=None):
+    """Valores finales de un grupo (AVG como división, MIN/MAX decodificados)."""
+    values = []
+    for j, (func, _) in enumerate(specs):
+        val = state[j]
+        if func == 'AVG':
+            val = val[0] / val[1] if val[1] else None
+        elif decoders is not None and val is not None and func in ('MIN', 'MAX'):
+            val = decoders[j](val)
+        values.append(val)
+    return values
+
+
+def update(state, specs, row):
+    """Acumula una fila (o tupla de valores indexada como en specs) en el estado del grupo."""
+    for j, (func, i) in enumerate(specs):
+        if i is None:
+            # COUNT(*)
+            state[j] += 1
+            continue
+        val = row[i]
+        if val is None:
+            continue
+        if func == 'COUNT':
+            state[j] += 1
+        elif func == 'SUM':
+            state[j] = val if state[j] is None else state[j] + val
+        elif func == 'AVG':
+            acc = state[j]
+            acc[0] += val
+            acc[1] += 1
+        elif func == 'MIN':
+            if state[j] is None or val < state[j]:
+                state[j] = val
+        elif state[j] is None or val > state[j]:
+            state[j] = val
+
+
+def _key_func(group_idx):
+    if not group_idx:
+        return lambda row: ()
+    if len(group_idx) == 1:
+        i = group_idx[0]
+        return lambda row: (row[i],)
+    return itemgetter(*group_idx)
+
+
+def aggregate_rows(rows, group_idx, specs):
+    """Dict clave de grupo (tupla) -> valores de los agregados, en una sola pasada."""
+    return finish_groups(group_states(rows, group_idx, specs), specs)
+
+
+def group_states(rows, group_idx, specs):
+    """Dict clave de grupo -> acumuladores sin terminar, por orden de aparición."""
+    groups = {}
+    if not group_idx:
+        groups[()] = new_state(specs)
+    key_of = _key_func(group_idx)
+    for row in rows:
+        key = key_of(row)
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = new_state(specs)
+        update(state, specs, row)
+    return groups
+
+
+def finish_groups(groups, specs):
+    return {key: finish(state, specs) for key, state in groups.items()}
+
+
+def merge_states(groups, partial, specs):
+    """Suma a groups los acumuladores de otro tramo; los grupos nuevos van al final."""
+    for key, other in partial.items():
+        state = groups.get(key)
+        if state is None:
+            groups[key] = other
+            continue
+        for j, (func, _) in enumerate(specs):
+            val = other[j]
+            if func == 'COUNT':
+                state[j] += val
+            elif func == 'AVG':
+                state[j][0] += val[0]
+                state[j][1] += val[1]
+            elif val is None:
+                continue
+            elif func == 'SUM':
+                state[j] = val if state[j] is None else state[j] + val
+            elif func == 'MIN':
+                if state[j] is None or val < state[j]:
+                    state[j] = val
+            elif state[j] is None or val > state[j]:
+                state[j] = val
+    return groups
+
+
+class _Input:
+    """
+    Columna de entrada de la agregación: da los valores internos (códigos, enteros
+    u ordinales) de un bloque de posiciones, ordenados igual que los valores reales,
+    y decode() recupera el valor real.
+    """
+
+    def __init__(self, vector, ordered=False):
+        self.vector = vector
+        self.raw = vector.raw()
+        self.decode = vector.decode
+        if ordered and not vector.raw_is_ordered:
+            # Códigos de diccionario: se traducen a su rango en el diccionario ordenado
+            dictionary = vector.dictionary
+            by_rank = sorted(range(len(dictionary)), key=dictionary.__getitem__)
+            rank_of = [0] * len(dictionary)
+            for rank, code in enumerate(by_rank):
+                rank_of[code] = rank
+            self.translate = array('i', rank_of)
+            self.decode = lambda rank: dictionary[by_rank[rank]]
+        else:
+            self.translate = None
+
+    def block(self, positions):
+        raw = self.raw
+        if isinstance(positions, range):
+            values = raw[positions.start:positions.stop]
+        elif np is not None:
+            values = np.frombuffer(raw, dtype=_NUMPY_TYPES[raw.typecode])[positions]
+        else:
+            values = array(raw.typecode, map(raw.__getitem__, positions))
+        if self.translate is not None:
+            if np is not None:
+                return np.frombuffer(self.translate, dtype=np.int32)[np.asarray(values, dtype=np.int64)]
+            return array('i', map(self.translate.__getitem__, values))
+        return values
+
+
+def _inputs(vectors, specs):
+    return [None if i is None else _Input(vectors[i], ordered=func in ('MIN', 'MAX'))
+            for func, i in specs]
+
+
+def vector_states(vectors, blocks, group_idx, specs):
+    """
+    Acumuladores sin terminar, con las claves y los MIN/MAX como valores internos
+    de los vectores. blocks son las posiciones a agregar, por bloques de como
+    mucho AGGREGATE_BLOCK.
+    """
+    keys = [_Input(vectors[i]) for i in group_idx]
+    inputs = _inputs(vectors, specs)
+
+    groups = {}
+    if not group_idx:
+        groups[()] = new_state(specs)
+    for block in blocks:
+        if not len(block):
+            continue
+        values = [None if inp is None else inp.block(block) for inp in inputs]
+        if not group_idx:
+            _update_totals(groups[()], specs, values, len(block))
+        elif np is not None:
+            _update_groups_numpy(groups, specs, [key.block(block) for key in keys], values)
+        else:
+            _update_groups_python(groups, specs, [key.block(block) for key in keys], values)
+    return groups
+
+
+def finish_vector_states(vectors, groups, group_idx, specs):
+    """Valores finales de vector_states, con claves y MIN/MAX ya decodificados."""
+    key_decoders = [_Input(vectors[i]).decode for i in group_idx]
+    decoders = [None if inp is None else inp.decode for inp in _inputs(vectors, specs)]
+    return {tuple(decode(raw) for decode, raw in zip(key_decoders, key)): finish(state, specs, decoders)
+            for key, state in groups.items()}
+
+
+def position_blocks(positions):
+    """Divide las posiciones en bloques de AGGREGATE_BLOCK (tramos alineados si es un range)."""
+    if isinstance(positions, range):
+        for start in range(positions.start, positions.stop, AGGREGATE_BLOCK):
+            yield range(start, min(start + AGGREGATE_BLOCK, positions.stop))
+        return
+    positions = iter(positions)
+    while True:
+        block = list(islice(positions, AGGREGATE_BLOCK))
+        if not block:
+            return
+        yield block
+
+
+def _reduce(func, block):
+    # Los bloques son array.array (tramos contiguos) o arrays de numpy
+    if isinstance(block, array):
+        return {'SUM': sum, 'MIN': min, 'MAX': max}[func](block)
+    return int({'SUM': block.sum, 'MIN': block.min, 'MAX': block.max}[func]())
+
+
+def _update_totals(state, specs, values, count):
+    """Sin GROUP BY: cada agregado se calcula sobre el bloque entero con sum/min/max."""
+    if not count:
+        return
+    for j, (func, _) in enumerate(specs):
+        block = values[j]
+        if func == 'COUNT':
+            state[j] += count
+        elif func == 'SUM':
+            total = _reduce('SUM', block)
+            state[j] = total if state[j] is None else state[j] + total
+        elif func == 'AVG':
+            state[j][0] += _reduce('SUM', block)
+            state[j][1] += count
+        else:
+            best = _reduce(func, block)
+            if state[j] is None or (best < state[j] if func == 'MIN' else best > state[j]):
+                state[j] = best
+
+
+def _update_groups_numpy(groups, specs, key_blocks, values):
+    """Con GROUP BY y numpy: np.unique da el grupo de cada fila y ufunc.at acumula."""
+    if len(key_blocks) == 1:
+        uniques, inverse = np.unique(np.asarray(key_blocks[0]), return_inverse=True)
+        group_keys = [(int(k),) for k in uniques]
+    else:
+        stacked = np.stack([np.asarray(k, dtype=np.int64) for k in key_blocks], axis=1)
+        uniques, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        group_keys = [tuple(int(v) for v in row) for row in uniques]
+    inverse = inverse.reshape(-1)
+    n = len(group_keys)
+    counts = np.bincount(inverse, minlength=n)
+
+    partials = []
+    for j, (func, _) in enumerate(specs):
+        if func == 'COUNT':
+            partials.append(counts.tolist())
+            continue
+        block = np.asarray(values[j], dtype=np.int64)
+        if func in ('SUM', 'AVG'):
+            acc = np.zeros(n, dtype=np.int64)
+            np.add.at(acc, inverse, block)
+        elif func == 'MIN':
+            acc = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(acc, inverse, block)
+        else:
+            acc = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+            np.maximum.at(acc, inverse, block)
+        partials.append(acc.tolist())
+
+    _merge(groups, specs, group_keys, partials, counts.tolist())
+
+
+def _update_groups_python(groups, specs, key_blocks, values):
+    """
+    Con GROUP BY y sin numpy: un bucle corto por agregado sobre (clave, valor) del
+    bloque, en lugar de actualizar todos los acumuladores fila a fila.
+    """
+    keys = key_blocks[0] if len(key_blocks) == 1 else list(zip(*key_blocks))
+    counter = Counter(keys)
+    group_keys = list(counter)
+    counts = [counter[key] for key in group_keys]
+
+    # Los valores internos son siempre enteros, así que val ± 1 sirve de valor inicial
+    partials = []
+    for j, (func, _) in enumerate(specs):
+        if func == 'COUNT':
+            partials.append(counts)
+            continue
+        acc = {}
+        if func in ('SUM', 'AVG'):
+            acc = dict.fromkeys(group_keys, 0)
+            for key, val in zip(keys, values[j]):
+                acc[key] += val
+        elif func == 'MIN':
+            for key, val in zip(keys, values[j]):
+                if val < acc.get(key, val + 1):
+                    acc[key] = val
+        else:
+            for key, val in zip(keys, values[j]):
+                if val > acc.get(key, val - 1):
+                    acc[key] = val
+        partials.append([acc[key] for key in group_keys])
+
+    if len(key_blocks) == 1:
+        group_keys = [(key,) for key in group_keys]
+    _merge(groups, specs, group_keys, partials, counts)
+
+
+def _merge(groups, specs, group_keys, partials, counts):
+    """Suma los resultados parciales de un bloque (uno por grupo y agregado) a los estados globales."""
+    for g, key in enumerate(group_keys):
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = new_state(specs)
+        for j, (func, _) in enumerate(specs):
+            val = partials[j][g]
+            if func == 'COUNT':
+                state[j] += val
+            elif func == 'SUM':
+                state[j] = val if state[j] is None else state[j] + val
+            elif func == 'AVG':
+                state[j][0] += val
+                state[j][1] += counts[g]
+            elif func == 'MIN':
+                if state[j] is None or val < state[j]:
+                    state[j] = val
+            elif state[j] is None or val > state[j]:
+                state[j] = val
@@ -0,0 +1 @@
+"""Benchmarks del proyecto; se ejecutan desde la raíz con ``python -m benchmarks.<modulo>``."""
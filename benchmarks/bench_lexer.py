@@ -0,0 +1,100 @@
+"""
+Compara el tokenizador de expresión única (lexer.iter_tokens) con la
+implementación anterior, que probaba cada patrón por separado línea a línea.
+
+    python -m benchmarks.bench_lexer --rows 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import lexer
+
+_legacy_regex = [(name, lexer.re.compile(lexer.TOKEN_TYPES[name])) for name in lexer.TOKEN_ORDER]
+
+
+def legacy_tokenize(line, line_num=1):
+    """Tokenizador original: prueba los patrones uno tras otro en cada posición."""
+    pos = 0
+    tokens = []
+    while pos < len(line):
+        match_found = False
+        for token_name, pattern in _legacy_regex:
+            match = pattern.match(line, pos)
+            if match:
+                value = match.group()
+                if token_name == 'WHITESPACE':
+                    pass
+                elif token_name == 'IDENTIFIER' and value.upper() in lexer.KEYWORDS:
+                    tokens.append(('KEYWORD', value.upper(), line_num, pos))
+                else:
+                    tokens.append((token_name, value, line_num, pos))
+                pos = match.end()
+                match_found = True
+                break
+        if not match_found:
+            pos += 1
+    return tokens
+
+
+def legacy_tokenize_file(filename):
+    tokens = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, start=1):
+            tokens.extend(legacy_tokenize(line, line_num))
+    return tokens
+
+
+def generate_script(rows, seed=0):
+    rnd = random.Random(seed)
+    lines = ["CREATE TABLE usuarios (\n    id INT PRIMARY KEY,\n    nombre VARCHAR(50),\n"
+             "    edad INT,\n    fecha DATE\n);\n"]
+    for i in range(rows):
+        nombre = ''.join(rnd.choice('abcdefghij') for _ in range(8))
+        lines.append(f"INSERT INTO usuarios (id, nombre, edad, fecha) VALUES "
+                     f"({i}, '{nombre}', {rnd.randint(18, 90)}, '19{rnd.randint(10, 99)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}');\n")
+        if i % 50 == 0:
+            lines.append(f"SELECT nombre, edad FROM usuarios WHERE edad >= {rnd.randint(18, 90)};\n")
+    return ''.join(lines)
+
+
+def _measure(label, func, repeat):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {count:>10} tokens  {best:8.3f} s  {count / best:>12,.0f} tokens/s")
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--rows', type=int, default=100000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.sql')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(generate_script(args.rows))
+
+        expected = legacy_tokenize_file(path)
+        if list(lexer.iter_tokens_file(path)) != expected or list(lexer.iter_tokens_file(path, use_mmap=True)) != expected:
+            raise SystemExit("Los tokens del nuevo lexer no coinciden con la implementación anterior")
+
+        base = _measure("legacy tokenize_file", lambda: len(legacy_tokenize_file(path)), args.repeat)
+        new = _measure("iter_tokens_file", lambda: sum(1 for _ in lexer.iter_tokens_file(path)), args.repeat)
+        mapped = _measure("iter_tokens_file (mmap)",
+                          lambda: sum(1 for _ in lexer.iter_tokens_file(path, use_mmap=True)), args.repeat)
+        print(f"Aceleración: {base / new:.2f}x (archivo), {base / mapped:.2f}x (mmap)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Coste por fila del filtro WHERE: la función condicional anterior (que convertía
+celda y literal en cada fila y despachaba el operador por texto) frente al
+predicado compilado por predicates.compile_condition sobre valores tipados.
+
+    python -m benchmarks.bench_predicates --rows 500000
+"""
+import argparse
+import random
+import time
+
+from predicates import compile_condition
+from table import Table
+
+CONDITIONS = [('edad', '>', '50'), ('edad', '=', '42'), ('nombre', '=', "'n17'"), ('fecha', '<', '1980-01-01')]
+
+
+def legacy_condition(table, condition):
+    """Condición tal como la construía Executor.build_condition_func antes del compilador."""
+    col, op, val = condition
+    col_idx = table.get_column_index(col)
+
+    def cond_func(row):
+        cell = row[col_idx]
+        try:
+            if isinstance(cell, str) and cell.isdigit():
+                cell_val = int(cell)
+            else:
+                cell_val = cell
+        except:
+            cell_val = cell
+
+        try:
+            if isinstance(val, str) and val.isdigit():
+                val_cmp = int(val)
+            else:
+                val_cmp = val
+        except:
+            val_cmp = val
+
+        if op == '=':
+            return cell_val == val_cmp
+        elif op == '!=':
+            return cell_val != val_cmp
+        elif op == '<':
+            return cell_val < val_cmp
+        elif op == '>':
+            return cell_val > val_cmp
+        elif op == '<=':
+            return cell_val <= val_cmp
+        elif op == '>=':
+            return cell_val >= val_cmp
+        else:
+            raise ValueError(f"Operador desconocido '{op}' en condición")
+
+    return cond_func
+
+
+def _per_row(func, rows):
+    start = time.perf_counter()
+    for row in rows:
+        func(row)
+    return (time.perf_counter() - start) / len(rows) * 1e9
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--rows', type=int, default=300000)
+    args = arg_parser.parse_args()
+
+    rnd = random.Random(0)
+    columns = [('id', 'INT', []), ('nombre', 'VARCHAR(20)', []), ('edad', 'INT', []), ('fecha', 'DATE', [])]
+    table = Table('personas', columns)
+    raw_rows = []
+    for i in range(args.rows):
+        raw = [str(i), f"n{rnd.randint(0, 99)}", str(rnd.randint(0, 99)),
+               f"19{rnd.randint(50, 99)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"]
+        raw_rows.append(raw)
+        table.insert(raw)
+    typed_rows = table.data
+
+    print(f"{'condición':<26} {'antes ns/fila':>14} {'después ns/fila':>16} {'mejora':>8}")
+    for condition in CONDITIONS:
+        before = _per_row(legacy_condition(table, condition), raw_rows)
+        after = _per_row(compile_condition(table, condition), typed_rows)
+        print(f"{' '.join(condition):<26} {before:>14.1f} {after:>16.1f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
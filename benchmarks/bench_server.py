@@ -0,0 +1,113 @@
+"""
+Generador de carga para server.py: varios clientes concurrentes lanzan consultas
+durante un tiempo fijo y se informa de las consultas por segundo y de los
+percentiles de latencia.
+
+Sin --port ni --socket arranca un servidor en el mismo proceso (y comparte la
+CPU con los clientes); con ellos se conecta a un servidor ya en marcha.
+
+    python -m benchmarks.bench_server --clients 32 --duration 10 --write-ratio 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from client import Client
+from executor import Executor
+from server import Server
+
+TABLE = 'carga'
+GROUPS = 100
+
+
+async def prepare(client, rows, batch=1000):
+    await client.execute(f"CREATE TABLE {TABLE} (id INT PRIMARY KEY, grupo INT, valor INT);")
+    for start in range(0, rows, batch):
+        values = ', '.join(f"({i}, {i % GROUPS}, {i})" for i in range(start, min(start + batch, rows)))
+        await client.execute(f"INSERT INTO {TABLE} VALUES {values};")
+
+
+def next_query(rnd, rows, write_ratio):
+    if rnd.random() < write_ratio:
+        return f"UPDATE {TABLE} SET valor = ? WHERE id = ?;", [rnd.randrange(rows), rnd.randrange(rows)]
+    if rnd.random() < 0.8:
+        return f"SELECT * FROM {TABLE} WHERE id = ?;", [rnd.randrange(rows)]
+    return f"SELECT COUNT(*), SUM(valor) FROM {TABLE} WHERE grupo = ?;", [rnd.randrange(GROUPS)]
+
+
+async def run_client(connect, seed, rows, write_ratio, deadline, latencies):
+    rnd = random.Random(seed)
+    client = await connect()
+    errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            sql, params = next_query(rnd, rows, write_ratio)
+            start = time.perf_counter()
+            response = await client.request(sql, params)
+            latencies.append(time.perf_counter() - start)
+            errors += not response['ok']
+    finally:
+        await client.close()
+    return errors
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def bench(args):
+    server = listener = None
+    host, port, path = args.host, args.port, args.socket
+    if port is None and path is None:
+        server = Server(Executor(args.storage), args.threads)
+        listener = await server.start(host, 0)
+        port = listener.sockets[0].getsockname()[1]
+
+    def connect():
+        return Client.connect(host, port, path)
+
+    try:
+        setup = await connect()
+        await prepare(setup, args.rows)
+        await setup.close()
+
+        latencies = []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        errors = await asyncio.gather(*[run_client(connect, seed, args.rows, args.write_ratio, deadline, latencies)
+                                        for seed in range(args.clients)])
+        elapsed = time.perf_counter() - start
+    finally:
+        if listener is not None:
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+
+    latencies.sort()
+    print(f"{args.clients} clientes, {elapsed:.1f} s, {len(latencies)} consultas, {sum(errors)} errores")
+    print(f"  QPS   {len(latencies) / elapsed:10.1f}")
+    for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+        print(f"  {name}   {percentile(latencies, fraction) * 1000:10.2f} ms")
+    print(f"  max   {latencies[-1] * 1000 if latencies else 0.0:10.2f} ms")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=None)
+    arg_parser.add_argument('--socket', default=None)
+    arg_parser.add_argument('--clients', type=int, default=16)
+    arg_parser.add_argument('--duration', type=float, default=5.0)
+    arg_parser.add_argument('--rows', type=int, default=100000)
+    arg_parser.add_argument('--write-ratio', type=float, default=0.05)
+    arg_parser.add_argument('--storage', default='ROW')
+    arg_parser.add_argument('--threads', type=int, default=8)
+    args = arg_parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compara memoria y tiempo de filtrado entre el almacenamiento por filas y el
+columnar (STORAGE COLUMNAR).
+
+    python -m benchmarks.bench_storage --rows 500000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from executor import Executor
+
+QUERIES = [
+    ('edad', '>', '80'),
+    ('edad', '=', '42'),
+    ('fecha', '<', '1960-01-01'),
+    ('ciudad', '=', 'c7'),
+]
+
+
+def build(storage, rows, seed=0):
+    rnd = random.Random(seed)
+    executor = Executor(storage=storage)
+    columns = [('id', 'INT', ['PRIMARY', 'KEY']), ('ciudad', 'VARCHAR(20)', []),
+               ('edad', 'INT', []), ('fecha', 'DATE', [])]
+    executor.execute_instruction(('CREATE_TABLE', 'personas', columns, None))
+    table = executor.tables['personas']
+    for i in range(rows):
+        table.insert([str(i), f"c{rnd.randint(0, 50)}", str(rnd.randint(0, 99)),
+                      f"19{rnd.randint(10, 99)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"])
+    return executor
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--rows', type=int, default=200000)
+    args = arg_parser.parse_args()
+
+    for storage in ('ROW', 'COLUMNAR'):
+        tracemalloc.start()
+        executor = build(storage, args.rows)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{storage:<9} memoria {memory / 2**20:8.1f} MiB")
+
+        for condition in QUERIES:
+            start = time.perf_counter()
+            cond_func = executor.build_condition_func('personas', condition)
+            count = len(executor.tables['personas'].select(['id'], cond_func)[1])
+            elapsed = time.perf_counter() - start
+            print(f"    WHERE {' '.join(condition):<26} {count:>8} filas  {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
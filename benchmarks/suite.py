@@ -0,0 +1,301 @@
+"""
+Batería de benchmarks reproducible sobre una carga de benchmarks.workload:
+
+* lexer.tokenize_file y lexer.iter_tokens_file: tokens por segundo.
+* parser.parse: instrucciones por segundo (sobre los tokens ya generados).
+* frontend.parse_text: lexer y parser juntos repartidos en --parser-workers
+  procesos (ver frontend.py), instrucciones por segundo.
+* executor.<TIPO>: cada tipo de instrucción (CREATE_TABLE, INSERT, SELECT,
+  UPDATE, DELETE, ...) por separado, con la latencia de cada instrucción;
+  executor es el script completo.
+* html: HtmlGenerator con todas las filas de la tabla, filas por segundo.
+
+De cada uno se guardan en JSON el rendimiento de la mejor repetición, los
+percentiles de latencia de todas y la memoria máxima (medida aparte con
+tracemalloc, que ralentiza la ejecución). Con --baseline se comparan los
+resultados con otros guardados y se señala como regresión lo que empeore más
+que --tolerance; en ese caso el programa termina con código 1.
+
+    python -m benchmarks.suite --rows 100000 --output actual.json
+    python -m benchmarks.suite --rows 100000 --baseline base.json
+    python -m benchmarks.suite --compare actual.json --baseline base.json
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import workload
+from executor import Executor, materialize
+import frontend
+import lexer
+from parser import Parser
+
+# Diferencias por debajo de estos mínimos se consideran ruido al comparar
+MIN_LATENCY_MS = 0.05
+MIN_MEMORY_MB = 1.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Recorder:
+    """Acumula las repeticiones de un benchmark y produce su entrada del informe."""
+
+    def __init__(self, unit):
+        self.unit = unit
+        self.units = 0
+        self.best = None
+        self.latencies = []
+        self.peak_mb = None
+
+    def add(self, units, seconds, latencies):
+        if self.best is None or seconds < self.best:
+            self.best = seconds
+            self.units = units
+        self.latencies.extend(latencies)
+
+    def report(self):
+        latencies = sorted(self.latencies)
+        ms = {name: round(percentile(latencies, fraction) * 1000, 4)
+              for name, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99))}
+        return {
+            'unit': self.unit,
+            'units': self.units,
+            'seconds': round(self.best, 6),
+            'throughput': round(self.units / self.best, 2) if self.best else 0.0,
+            **ms,
+            'max_ms': round(latencies[-1] * 1000, 4) if latencies else 0.0,
+            'peak_mb': self.peak_mb,
+        }
+
+
+def peak_memory(func):
+    """MiB de memoria máxima asignada por func (medida con tracemalloc)."""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_lexer(path, repeat, memory):
+    results = {}
+    for name, func in (('lexer.tokenize_file', lambda: len(lexer.tokenize_file(path))),
+                       ('lexer.iter_tokens_file', lambda: sum(1 for _ in lexer.iter_tokens_file(path)))):
+        recorder = Recorder('tokens')
+        for _ in range(repeat):
+            count, seconds = timed(func)
+            recorder.add(count, seconds, [seconds])
+        if memory:
+            recorder.peak_mb = peak_memory(func)
+        results[name] = recorder
+    return results
+
+
+def bench_parser(tokens, repeat, memory):
+    recorder = Recorder('instrucciones')
+    for _ in range(repeat):
+        instructions, seconds = timed(lambda: Parser(tokens).parse())
+        recorder.add(len(instructions), seconds, [seconds])
+    if memory:
+        recorder.peak_mb = peak_memory(lambda: Parser(tokens).parse())
+    return {'parser.parse': recorder}
+
+
+def bench_frontend(path, workers, repeat, memory):
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    recorder = Recorder('instrucciones')
+    for _ in range(repeat):
+        count, seconds = timed(lambda: sum(1 for _ in frontend.parse_text(text, workers)))
+        recorder.add(count, seconds, [seconds])
+    if memory:
+        recorder.peak_mb = peak_memory(lambda: sum(1 for _ in frontend.parse_text(text, workers)))
+    return {'frontend.parse_text': recorder}
+
+
+def run_script(instructions, storage, latencies=None):
+    """Ejecuta las instrucciones en un Executor nuevo; anota la latencia de cada una por tipo."""
+    executor = Executor(storage)
+    for instr in instructions:
+        start = time.perf_counter()
+        resultado, _ = executor.execute_instruction(instr)
+        if resultado is not None:
+            materialize(resultado)
+        if latencies is not None:
+            latencies[instr[0]].append(time.perf_counter() - start)
+    return executor
+
+
+def bench_executor(instructions, storage, repeat, memory):
+    recorders = defaultdict(lambda: Recorder('instrucciones'))
+    executor = None
+    for _ in range(repeat):
+        latencies = defaultdict(list)
+        executor, seconds = timed(lambda: run_script(instructions, storage, latencies))
+        recorders['executor'].add(len(instructions), seconds, [seconds])
+        for kind, values in latencies.items():
+            recorders[f'executor.{kind}'].add(len(values), sum(values), values)
+    if memory:
+        recorders['executor'].peak_mb = peak_memory(lambda: run_script(instructions, storage))
+    return dict(recorders), executor
+
+
+def bench_html(executor, repeat, memory):
+    from JinjaPy import HtmlGenerator
+
+    select = Parser(lexer.iter_tokens(f"SELECT * FROM {workload.TABLE};")).parse()[0]
+    resultado = materialize(executor.dispatch(select)[0])
+    generator = HtmlGenerator()
+    recorder = Recorder('filas')
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'salida.html')
+
+        def render():
+            generator.generate_html([resultado], [], filename)
+
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            for _ in range(repeat):
+                _, seconds = timed(render)
+                recorder.add(len(resultado[1]), seconds, [seconds])
+            if memory:
+                recorder.peak_mb = peak_memory(render)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return {'html': recorder}
+
+
+def run_suite(args):
+    options = workload.workload_options(args)
+    recorders = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'carga.sql')
+        workload.write_script(path, workload.generate(**options))
+        recorders.update(bench_lexer(path, args.repeat, args.memory))
+        recorders.update(bench_frontend(path, args.parser_workers, args.repeat, args.memory))
+        tokens = lexer.tokenize_file(path)
+    recorders.update(bench_parser(tokens, args.repeat, args.memory))
+    instructions = Parser(tokens).parse()
+    del tokens
+    executor_recorders, executor = bench_executor(instructions, args.storage, args.repeat, args.memory)
+    recorders.update(executor_recorders)
+    recorders.update(bench_html(executor, args.repeat, args.memory))
+
+    meta = {key: value for key, value in options.items() if key != 'mix'}
+    meta.update(mix=options['mix'] or workload.DEFAULT_MIX, storage=args.storage, repeat=args.repeat,
+                parser_workers=args.parser_workers,
+                python=platform.python_version(), platform=platform.platform(),
+                cpus=os.cpu_count(), date=datetime.now().isoformat(timespec='seconds'))
+    return {'meta': meta, 'benchmarks': {name: recorders[name].report() for name in sorted(recorders)}}
+
+
+def print_report(report):
+    print(f"{'benchmark':<24} {'unidades':>10} {'por segundo':>14} {'p50 ms':>10} {'p95 ms':>10} "
+          f"{'p99 ms':>10} {'MiB':>8}")
+    for name, entry in report['benchmarks'].items():
+        peak = '' if entry['peak_mb'] is None else f"{entry['peak_mb']:.1f}"
+        print(f"{name:<24} {entry['units']:>10} {entry['throughput']:>14,.1f} {entry['p50_ms']:>10.3f} "
+              f"{entry['p95_ms']:>10.3f} {entry['p99_ms']:>10.3f} {peak:>8}")
+
+
+def compare(current, baseline, tolerance):
+    """
+    Lista de (benchmark, métrica, base, actual, cambio relativo) que empeoran más
+    que tolerance: menos rendimiento, más latencia p95 o más memoria.
+    """
+    regressions = []
+    for name, entry in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        if base['throughput'] and entry['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append((name, 'throughput', base['throughput'], entry['throughput'],
+                                entry['throughput'] / base['throughput'] - 1))
+        if (max(base['p95_ms'], entry['p95_ms']) >= MIN_LATENCY_MS
+                and entry['p95_ms'] > base['p95_ms'] * (1 + tolerance)):
+            change = entry['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else float('inf')
+            regressions.append((name, 'p95_ms', base['p95_ms'], entry['p95_ms'], change))
+        if (base['peak_mb'] is not None and entry['peak_mb'] is not None
+                and entry['peak_mb'] - base['peak_mb'] >= MIN_MEMORY_MB
+                and entry['peak_mb'] > base['peak_mb'] * (1 + tolerance)):
+            change = entry['peak_mb'] / base['peak_mb'] - 1 if base['peak_mb'] else float('inf')
+            regressions.append((name, 'peak_mb', base['peak_mb'], entry['peak_mb'], change))
+    return regressions
+
+
+def print_comparison(current, baseline, tolerance):
+    """Muestra la comparación; devuelve True si hay regresiones."""
+    different = [key for key in ('rows', 'seed', 'distribution', 'storage', 'mix')
+                 if current['meta'].get(key) != baseline['meta'].get(key)]
+    if different:
+        print(f"Aviso: la referencia usa otra carga ({', '.join(different)}); la comparación puede no ser válida")
+    missing = sorted(set(baseline['benchmarks']) - set(current['benchmarks']))
+    if missing:
+        print(f"Aviso: faltan benchmarks de la referencia: {', '.join(missing)}")
+    regressions = compare(current, baseline, tolerance)
+    if not regressions:
+        print(f"Sin regresiones (tolerancia {tolerance:.0%})")
+        return False
+    print(f"Regresiones (tolerancia {tolerance:.0%}):")
+    for name, metric, base, value, change in regressions:
+        print(f"  {name:<24} {metric:<11} {base:>12} -> {value:<12} ({change:+.1%})")
+    return True
+
+
+def load_report(filename):
+    with open(filename, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    workload.add_arguments(arg_parser)
+    arg_parser.add_argument('--storage', default='ROW', help="motor de la tabla de la carga")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--parser-workers', type=int, default=0,
+                            help="procesos de frontend.parse_text (0: uno por CPU)")
+    arg_parser.add_argument('--no-memory', dest='memory', action='store_false',
+                            help="no medir la memoria (evita la pasada extra con tracemalloc)")
+    arg_parser.add_argument('--output', default='benchmark.json', help="fichero JSON con los resultados")
+    arg_parser.add_argument('--baseline', help="resultados de referencia con los que comparar")
+    arg_parser.add_argument('--compare', help="compara este fichero con --baseline sin ejecutar nada")
+    arg_parser.add_argument('--tolerance', type=float, default=0.20,
+                            help="empeoramiento relativo que se admite antes de marcar regresión")
+    args = arg_parser.parse_args()
+
+    if args.compare is not None:
+        if args.baseline is None:
+            arg_parser.error("--compare necesita --baseline")
+        current = load_report(args.compare)
+    else:
+        current = run_suite(args)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2, default=str)
+        print_report(current)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.baseline is not None and print_comparison(current, load_report(args.baseline), args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Generador determinista de cargas SQL para los benchmarks: un CREATE TABLE, las
+filas en INSERT de varios VALUES y una mezcla de SELECT, UPDATE y DELETE. Con
+la misma semilla y los mismos parámetros el script es idéntico byte a byte.
+
+Las columnas grupo y valor siguen la distribución elegida:
+
+* uniform: cualquier valor del dominio con la misma probabilidad.
+* zipf: pocos valores muy frecuentes (exponente ZIPF_EXPONENT).
+* normal: concentrados alrededor del centro del dominio.
+* sequential: crecen con el número de fila (datos ya ordenados).
+
+    python -m benchmarks.workload --rows 1000000 --distribution zipf --output carga.sql
+"""
+import argparse
+from bisect import bisect_left
+from datetime import date, timedelta
+from itertools import accumulate
+import random
+
+DISTRIBUTIONS = ('uniform', 'zipf', 'normal', 'sequential')
+
+ZIPF_EXPONENT = 1.1
+
+# El zipf se muestrea con una tabla acumulada; dominios mayores se recortan a este tamaño
+ZIPF_MAX_DOMAIN = 100000
+
+TABLE = 'bench'
+
+# Proporción de cada tipo de consulta tras la carga
+DEFAULT_MIX = {'point': 0.4, 'range': 0.2, 'aggregate': 0.1, 'update': 0.2, 'delete': 0.1}
+
+_FIRST_DATE = date(1990, 1, 1)
+DATE_DAYS = 365 * 30
+
+
+def sampler(distribution, domain, rnd, rows=1):
+    """Función (número de fila) -> entero de [0, domain) con la distribución pedida."""
+    if distribution == 'uniform':
+        return lambda i: rnd.randrange(domain)
+    if distribution == 'zipf':
+        size = min(domain, ZIPF_MAX_DOMAIN)
+        cumulative = list(accumulate(1 / (k + 1) ** ZIPF_EXPONENT for k in range(size)))
+        total = cumulative[-1]
+        return lambda i: min(bisect_left(cumulative, rnd.random() * total), size - 1)
+    if distribution == 'normal':
+        center, spread = domain / 2, domain / 6
+
+        def normal(i):
+            return min(domain - 1, max(0, int(rnd.gauss(center, spread))))
+        return normal
+    if distribution == 'sequential':
+        return lambda i: i * domain // max(rows, 1)
+    raise ValueError(f"Distribución desconocida '{distribution}'")
+
+
+def parse_mix(text):
+    """'point=0.5,update=0.5' -> dict; los tipos que no aparecen quedan en 0."""
+    mix = dict.fromkeys(DEFAULT_MIX, 0.0)
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in mix:
+            raise ValueError(f"Tipo de consulta desconocido '{name.strip()}'")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def generate(rows, seed=0, distribution='uniform', groups=100, queries=1000, batch=1000, mix=None):
+    """
+    Genera las instrucciones del script una a una (como texto terminado en ';'),
+    sin construirlo entero: sirve para 10M de filas.
+    """
+    rnd = random.Random(seed)
+    mix = DEFAULT_MIX if mix is None else mix
+    group_of = sampler(distribution, groups, rnd, rows)
+    value_of = sampler(distribution, max(rows, 1), rnd, rows)
+    day_of = sampler(distribution, DATE_DAYS, rnd, rows)
+
+    yield (f"CREATE TABLE {TABLE} (id INT PRIMARY KEY, grupo INT, valor INT, "
+           f"nombre VARCHAR(20), fecha DATE);")
+    for start in range(0, rows, batch):
+        values = []
+        for i in range(start, min(start + batch, rows)):
+            # Un solo sorteo por fila: el nombre corresponde a su grupo
+            group = group_of(i)
+            day = _FIRST_DATE + timedelta(days=day_of(i))
+            values.append(f"({i}, {group}, {value_of(i)}, 'n{group}', '{day.isoformat()}')")
+        yield f"INSERT INTO {TABLE} VALUES {', '.join(values)};"
+    yield f"CREATE INDEX idx_{TABLE}_valor ON {TABLE} (valor);"
+
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    for _ in range(queries if rows else 0):
+        kind = rnd.choices(kinds, weights)[0]
+        key = rnd.randrange(rows)
+        if kind == 'point':
+            yield f"SELECT * FROM {TABLE} WHERE id = {key};"
+        elif kind == 'range':
+            low = value_of(key)
+            yield f"SELECT id, valor FROM {TABLE} WHERE valor >= {low} AND valor < {low + max(rows // 1000, 1)};"
+        elif kind == 'aggregate':
+            yield f"SELECT grupo, COUNT(*), SUM(valor) FROM {TABLE} WHERE grupo < {group_of(key) + 1} GROUP BY grupo;"
+        elif kind == 'update':
+            yield f"UPDATE {TABLE} SET valor = {value_of(key)} WHERE id = {key};"
+        else:
+            yield f"DELETE FROM {TABLE} WHERE id = {key};"
+
+
+def write_script(filename, statements):
+    with open(filename, 'w', encoding='utf-8') as f:
+        for statement in statements:
+            f.write(statement)
+            f.write('\n')
+
+
+def add_arguments(arg_parser):
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform')
+    arg_parser.add_argument('--groups', type=int, default=100, help="valores distintos de la columna grupo")
+    arg_parser.add_argument('--queries', type=int, default=1000, help="consultas tras la carga")
+    arg_parser.add_argument('--batch', type=int, default=1000, help="filas por INSERT")
+    arg_parser.add_argument('--mix', type=parse_mix, default=None,
+                            help="proporciones, p. ej. point=0.5,range=0.2,update=0.3")
+
+
+def workload_options(args):
+    return {'rows': args.rows, 'seed': args.seed, 'distribution': args.distribution, 'groups': args.groups,
+            'queries': args.queries, 'batch': args.batch, 'mix': args.mix}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(arg_parser)
+    arg_parser.add_argument('--output', default='carga.sql')
+    args = arg_parser.parse_args()
+    write_script(args.output, generate(**workload_options(args)))
+    print(f"Script escrito en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Cliente asíncrono del servidor SQL (ver server.py para el protocolo).
+
+    client = await Client.connect('127.0.0.1', 5433)
+    results = await client.execute("SELECT * FROM t WHERE id = ?;", [7])
+    await client.close()
+"""
+import asyncio
+
+from server import encode_message, read_message
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        # Una conexión atiende una petición cada vez; las concurrentes esperan turno
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=5433, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, sql, params=()):
+        """Envía el SQL y devuelve la respuesta completa del servidor (dict)."""
+        async with self.lock:
+            self.writer.write(encode_message({'sql': sql, 'params': list(params)}))
+            await self.writer.drain()
+            response = await read_message(self.reader)
+        if response is None:
+            raise ConnectionError("El servidor cerró la conexión")
+        return response
+
+    async def execute(self, sql, params=()):
+        """Resultados de cada instrucción; lanza ValueError si el servidor informa de un error."""
+        response = await self.request(sql, params)
+        if not response['ok']:
+            raise ValueError(response['error'])
+        return response['results']
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
@@ -0,0 +1,76 @@
+"""
+Estadísticas por columna que recoge ANALYZE y estimación de selectividad.
+
+Para cada columna se guardan el número de filas, de nulos y de valores
+distintos, el mínimo, el máximo y un histograma de igual frecuencia: los
+límites de HISTOGRAM_BUCKETS tramos con el mismo número de valores. Con ellas se
+estima qué fracción de las filas cumple `columna op valor`; sin estadísticas se
+usan las fracciones fijas de DEFAULT_SELECTIVITY.
+"""
+from bisect import bisect_left, bisect_right
+
+HISTOGRAM_BUCKETS = 32
+
+# Fracción de filas que se supone que cumple una comparación sin estadísticas
+DEFAULT_SELECTIVITY = {'=': 0.1, '!=': 0.9, '<': 1 / 3, '<=': 1 / 3, '>': 1 / 3, '>=': 1 / 3}
+
+
+class ColumnStats:
+    def __init__(self, values):
+        present = sorted(val for val in values if val is not None)
+        self.rows = len(values)
+        self.nulls = self.rows - len(present)
+        self.distinct = 0
+        previous = object()
+        for val in present:
+            if val != previous:
+                self.distinct += 1
+                previous = val
+        self.min = present[0] if present else None
+        self.max = present[-1] if present else None
+        n = len(present)
+        self.bounds = [present[i * (n - 1) // HISTOGRAM_BUCKETS] for i in range(HISTOGRAM_BUCKETS + 1)] if n else []
+
+    def fraction_below(self, value, inclusive=False):
+        """Fracción estimada de los valores no nulos < value (<= con inclusive)."""
+        bounds = self.bounds
+        if value < bounds[0] or (value == bounds[0] and not inclusive):
+            return 0.0
+        if value > bounds[-1] or (value == bounds[-1] and inclusive):
+            return 1.0
+        k = (bisect_right if inclusive else bisect_left)(bounds, value)
+        lo, hi = bounds[k - 1], bounds[k]
+        within = 0.5
+        if isinstance(value, int) and hi != lo:
+            # Dentro del tramo se interpola linealmente para los enteros
+            within = (value - lo) / (hi - lo)
+        return min(1.0, (k - 1 + within) / HISTOGRAM_BUCKETS)
+
+    def selectivity(self, op, value):
+        """Fracción estimada de filas que cumplen `columna op value`."""
+        if self.rows == 0 or not self.bounds:
+            return 0.0
+        present = (self.rows - self.nulls) / self.rows
+        if op in ('=', '!='):
+            equal = 0.0 if value < self.min or value > self.max else present / self.distinct
+            return equal if op == '=' else present - equal
+        if op == '<':
+            return present * self.fraction_below(value)
+        if op == '<=':
+            return present * self.fraction_below(value, inclusive=True)
+        if op == '>':
+            return present * (1 - self.fraction_below(value, inclusive=True))
+        return present * (1 - self.fraction_below(value))
+
+    def summary(self):
+        return [self.rows, self.nulls, self.distinct, self.min, self.max]
+
+
+def estimate_selectivity(stats, op, value):
+    """Selectividad de una comparación con las estadísticas de la columna (o None)."""
+    if stats is None:
+        return DEFAULT_SELECTIVITY[op]
+    try:
+        return stats.selectivity(op, value)
+    except TypeError:
+        return DEFAULT_SELECTIVITY[op]
@@ -0,0 +1,399 @@
+from array import array
+from datetime import date
+from itertools import compress, islice, repeat
+
+from aggregates import finish_vector_states, position_blocks, vector_states
+import parallel
+from predicates import OPERATORS
+from table import Table
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él los filtros usan array + itertools
+    np = None
+
+# Filas que iter_select filtra de una vez con un predicado vectorizado
+SCAN_BLOCK = 1 << 14
+# Filas que iter_select materializa de una vez al generar el resultado
+ROW_BATCH = 1024
+
+
+class IntColumn:
+    """Columna INT guardada en un array contiguo de enteros de 64 bits."""
+    typecode = 'q'
+    # Rango de los enteros de 64 bits con signo
+    MIN, MAX = -(1 << 63), (1 << 63) - 1
+
+    def __init__(self):
+        self.values = array(self.typecode)
+
+    def copy(self):
+        column = type(self)()
+        column.values = self.values[:]
+        return column
+
+    def encode(self, val):
+        return int(val)
+
+    def decode(self, raw):
+        return raw
+
+    def append(self, val):
+        self.values.append(self.encode(val))
+
+    def extend(self, values):
+        self.values.extend(values)
+
+    def get(self, i):
+        return self.decode(self.values[i])
+
+    def set(self, i, val):
+        self.values[i] = self.encode(val)
+
+    def take(self, positions):
+        values = self.values
+        return [self.decode(values[i]) for i in positions]
+
+    def decoded(self):
+        return self.values.tolist()
+
+    def tobytes(self):
+        return self.values.tobytes()
+
+    def frombytes(self, buffer):
+        """Añade valores ya codificados leídos de un buffer (p. ej. de una instantánea)."""
+        self.values.frombytes(buffer)
+
+    def keep(self, selectors):
+        """Conserva solo las posiciones cuyo selector es verdadero."""
+        self.values = array(self.typecode, compress(self.values, selectors))
+
+    def accepts(self, values):
+        """Si todos los valores (ya convertidos) caben en la columna."""
+        return not values or (self.MIN <= min(values) and max(values) <= self.MAX)
+
+    def literal(self, val):
+        """Literal del WHERE (ya convertido) en la representación interna, o None si no es comparable."""
+        return val if isinstance(val, int) else None
+
+    def positions(self, op, val, start=0, stop=None):
+        """
+        Posiciones en [start, stop) que cumplen `columna op val`, evaluadas sobre ese
+        tramo de la columna de una vez, o None si el literal no es comparable.
+        """
+        lit = self.literal(val)
+        if lit is None:
+            return None
+        compare = OPERATORS[op]
+        stop = len(self.values) if stop is None else stop
+        if np is not None and stop > start:
+            block = np.frombuffer(self.values, dtype=np.int64)[start:stop]
+            return (np.flatnonzero(compare(block, lit)) + start).tolist()
+        return list(compress(range(start, stop), map(compare, self.values[start:stop], repeat(lit))))
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+    # Valores internos para agregar: enteros u ordinales, con el mismo orden que los reales
+    raw_is_ordered = True
+
+    def raw(self):
+        return self.values
+
+
+class DateColumn(IntColumn):
+    """Columna DATE guardada como ordinales (días desde el 1 de enero del año 1)."""
+
+    def encode(self, val):
+        return val.toordinal()
+
+    def decode(self, raw):
+        return date.fromordinal(raw)
+
+    def extend(self, values):
+        self.values.extend(map(date.toordinal, values))
+
+    def decoded(self):
+        return list(map(date.fromordinal, self.values))
+
+    def accepts(self, values):
+        return True
+
+    def literal(self, val):
+        return val.toordinal() if isinstance(val, date) else None
+
+
+class DictColumn:
+    """Columna de texto codificada con diccionario: cada fila guarda un código entero."""
+
+    def __init__(self):
+        self.codes = array('i')
+        self.dictionary = []
+        self.code_of = {}
+
+    def copy(self):
+        column = DictColumn()
+        column.codes = self.codes[:]
+        column.dictionary = list(self.dictionary)
+        column.code_of = dict(self.code_of)
+        return column
+
+    def encode(self, val):
+        code = self.code_of.get(val)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary.append(val)
+            self.code_of[val] = code
+        return code
+
+    def decode(self, code):
+        return self.dictionary[code]
+
+    def append(self, val):
+        self.codes.append(self.encode(val))
+
+    def extend(self, values):
+        self.codes.extend(map(self.encode, values))
+
+    def get(self, i):
+        return self.dictionary[self.codes[i]]
+
+    def set(self, i, val):
+        self.codes[i] = self.encode(val)
+
+    def take(self, positions):
+        codes, dictionary = self.codes, self.dictionary
+        return [dictionary[codes[i]] for i in positions]
+
+    def decoded(self):
+        return list(map(self.dictionary.__getitem__, self.codes))
+
+    def tobytes(self):
+        return self.codes.tobytes()
+
+    def frombytes(self, buffer, dictionary):
+        """Carga códigos y diccionario ya codificados (p. ej. de una instantánea) en una columna vacía."""
+        self.codes.frombytes(buffer)
+        self.dictionary = list(dictionary)
+        self.code_of = dict(zip(self.dictionary, range(len(self.dictionary))))
+
+    def keep(self, selectors):
+        self.codes = array('i', compress(self.codes, selectors))
+
+    def accepts(self, values):
+        return True
+
+    def positions(self, op, val, start=0, stop=None):
+        # El predicado se evalúa una vez por valor distinto y luego se traduce cada código
+        if not isinstance(val, str):
+            return None
+        compare = OPERATORS[op]
+        lut = bytes(bool(compare(entry, val)) for entry in self.dictionary)
+        stop = len(self.codes) if stop is None else stop
+        if np is not None and stop > start:
+            codes = np.frombuffer(self.codes, dtype=np.int32)[start:stop]
+            return (np.flatnonzero(np.frombuffer(lut, dtype=np.uint8)[codes]) + start).tolist()
+        return list(compress(range(start, stop), map(lut.__getitem__, self.codes[start:stop])))
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + sum(len(entry) for entry in self.dictionary)
+
+    # Los códigos identifican el valor pero no respetan su orden
+    raw_is_ordered = False
+
+    def raw(self):
+        return self.codes
+
+
+def vector_scan(condition):
+    """
+    (comparación, resto): la parte de la condición que se resuelve con positions()
+    sobre un vector y lo que queda por comprobar fila a fila en las candidatas.
+    En un AND es su comparación más selectiva (ver predicates._compile_and).
+    """
+    if getattr(condition, 'op', None) is not None:
+        return condition, None
+    driver = getattr(condition, 'driver', None)
+    if driver is not None:
+        return driver, condition.residual
+    return None, None
+
+
+def column_vector(col_type):
+    if col_type in ('INT', 'NUMBER'):
+        return IntColumn()
+    if col_type == 'DATE':
+        return DateColumn()
+    return DictColumn()
+
+
+class ColumnarTable(Table):
+    """
+    Tabla con almacenamiento por columnas: INT en arrays de enteros, DATE como
+    ordinales y VARCHAR codificado con diccionario. Los WHERE simples se evalúan
+    sobre la columna completa en lugar de fila a fila.
+    """
+    storage = 'COLUMNAR'
+
+    def init_storage(self):
+        self.vectors = [column_vector(col[1]) for col in self.columns]
+        self.size = 0
+
+    def copy_storage(self):
+        self.vectors = [vector.copy() for vector in self.vectors]
+
+    @property
+    def data(self):
+        """Filas materializadas (copia); solo para compatibilidad con el almacenamiento por filas."""
+        return [self.row_at(i) for i in self.live_positions()]
+
+    def row_at(self, position):
+        return [vector.get(position) for vector in self.vectors]
+
+    def iter_rows(self):
+        return self._iter_rows(iter(self.live_positions()), self.vectors)
+
+    def select(self, columns, condition=None):
+        cols, col_indices = self.resolve_columns(columns)
+        positions = self.matching_positions(condition)
+        taken = [self.vectors[i].take(positions) for i in col_indices]
+        return cols, [list(row) for row in zip(*taken)]
+
+    def matching_positions(self, condition=None):
+        if condition is None:
+            return self.live_positions()
+        row_ids = getattr(condition, 'row_ids', None)
+        if row_ids is None:
+            positions = parallel.scan(self, condition)
+            if positions is not None:
+                return list(positions)
+            return self.scan_range(condition, 0, self.size)
+        return [i for i in row_ids if condition(self.row_at(i))]
+
+    def matching_rows(self, condition=None):
+        for i in self.matching_positions(condition):
+            yield i, self.row_at(i)
+
+    def count_matching(self, condition=None):
+        return sum(1 for _ in self.iter_positions(condition))
+
+    def aggregate(self, condition, group_idx, specs):
+        groups = parallel.aggregate(self, condition, group_idx, specs)
+        if groups is None:
+            if getattr(condition, 'row_ids', None) is not None:
+                groups = vector_states(self.vectors, position_blocks(self.iter_positions(condition)),
+                                       group_idx, specs)
+            else:
+                groups = self.aggregate_range(condition, group_idx, specs, 0, self.size)
+        return finish_vector_states(self.vectors, groups, group_idx, specs)
+
+    def aggregate_range(self, condition, group_idx, specs, start, stop):
+        # Sin WHERE se agregan tramos contiguos; con WHERE, cada tramo se filtra antes
+        blocks = position_blocks(range(start, stop))
+        if condition is not None:
+            blocks = (self.scan_range(condition, block.start, block.stop) for block in blocks)
+        elif self.live is not None:
+            blocks = (self.live_positions(block.start, block.stop) for block in blocks)
+        return vector_states(self.vectors, blocks, group_idx, specs)
+
+    def iter_positions(self, condition=None):
+        """Como matching_positions, pero filtrando por tramos de SCAN_BLOCK filas bajo demanda."""
+        if condition is None:
+            yield from self.live_positions()
+            return
+        row_ids = getattr(condition, 'row_ids', None)
+        if row_ids is not None:
+            yield from (i for i in row_ids if condition(self.row_at(i)))
+            return
+        positions = parallel.scan(self, condition)
+        if positions is not None:
+            yield from positions
+            return
+        for start in range(0, self.size, SCAN_BLOCK):
+            yield from self.scan_range(condition, start, min(start + SCAN_BLOCK, self.size))
+
+    def scan_range(self, condition, start, stop):
+        """Posiciones de [start, stop) que cumplen la condición, resolviendo lo posible sobre los vectores."""
+        leaf, residual = vector_scan(condition)
+        positions = None
+        if leaf is not None:
+            positions = self.vectors[leaf.col_idx].positions(leaf.op, leaf.value, start, stop)
+        if positions is None:
+            return [i for i in self.live_positions(start, stop) if condition(self.row_at(i))]
+        if self.live is not None:
+            live = self.live
+            positions = [i for i in positions if live[i]]
+        if residual is not None:
+            return [i for i in positions if residual(self.row_at(i))]
+        return positions
+
+    def iter_select(self, columns, condition=None, limit=None, offset=0):
+        cols, col_indices = self.resolve_columns(columns)
+        stop = None if limit is None else offset + limit
+        positions = islice(self.iter_positions(condition), offset, stop)
+        return cols, self._iter_rows(positions, [self.vectors[i] for i in col_indices])
+
+    def _iter_rows(self, positions, vectors):
+        while True:
+            batch = list(islice(positions, ROW_BATCH))
+            if not batch:
+                return
+            yield from map(list, zip(*[vector.take(batch) for vector in vectors]))
+
+    def clean_column(self, col_idx, values, quoted=True):
+        values = super().clean_column(col_idx, values, quoted)
+        self.check_values(col_idx, values)
+        return values
+
+    def clean_value(self, col_idx, val):
+        val = super().clean_value(col_idx, val)
+        self.check_values(col_idx, [val])
+        return val
+
+    def check_values(self, col_idx, values):
+        """
+        Comprueba que los valores caben en el vector de su columna antes de añadir
+        nada: un fallo a mitad de fila dejaría los vectores con longitudes distintas.
+        """
+        if not self.vectors[col_idx].accepts(values):
+            raise ValueError(f"Error: valor fuera de rango para columna '{self.columns[col_idx][0]}' en tabla '{self.name}'")
+
+    def append_row(self, row):
+        for vector, val in zip(self.vectors, row):
+            vector.append(val)
+        self.size += 1
+        return self.size - 1
+
+    def append_columns(self, columns):
+        start = self.size
+        for vector, values in zip(self.vectors, columns):
+            vector.extend(values)
+        self.size += len(columns[0])
+        return start
+
+    def set_values(self, position, row, assignments):
+        for idx, new_val in assignments:
+            self.vectors[idx].set(position, new_val)
+
+    def keep_rows(self, selectors):
+        for vector in self.vectors:
+            vector.keep(selectors)
+        self.size = selectors.count(1)
+
+    def column_values(self, col_idx):
+        return self.vectors[col_idx].decoded()
+
+    def load_vectors(self, vectors, size):
+        """Sustituye el contenido por columnas ya codificadas y reconstruye los índices."""
+        self.vectors = vectors
+        self.size = size
+        self.clear_tombstones()
+        self.rebuild_indexes()
+        self.version += 1
+
+    def slot_count(self):
+        return self.size
+
+    def nbytes(self):
+        """Bytes ocupados por los datos de las columnas."""
+        return sum(vector.nbytes() for vector in self.vectors)
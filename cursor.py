@@ -0,0 +1,49 @@
+class Cursor:
+    """
+    Filas de un SELECT que se generan a medida que se recorren. Queda invalidado
+    si la tabla cambia antes de terminar de leerlo. Si se recorre completo y el
+    resultado tiene como mucho max_rows filas, se entregan a on_complete (p. ej.
+    para guardarlas en la caché de resultados).
+    """
+
+    def __init__(self, table, columns, rows, on_complete=None, max_rows=0):
+        self.table = table
+        self.columns = columns
+        self.rows = rows
+        self.version = table.version
+        self.rowcount = 0
+        self.on_complete = on_complete
+        self.max_rows = max_rows
+        self.collected = [] if on_complete is not None else None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.table.version != self.version:
+            raise ValueError(f"Cursor invalidado: la tabla '{self.table.name}' cambió durante la lectura")
+        try:
+            row = next(self.rows)
+        except StopIteration:
+            if self.collected is not None:
+                self.on_complete(self.collected)
+                self.collected = None
+            raise
+        self.rowcount += 1
+        if self.collected is not None:
+            if len(self.collected) < self.max_rows:
+                self.collected.append(row)
+            else:
+                self.collected = None
+        return row
+
+    def fetchmany(self, size):
+        rows = []
+        for row in self:
+            rows.append(row)
+            if len(rows) == size:
+                break
+        return rows
+
+    def fetchall(self):
+        return list(self)
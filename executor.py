@@ -1,218 +1,560 @@
-from datetime import datetime
-import re
-from JinjaPy import HtmlGenerator
-
-class Table:
-    def __init__(self, name, columns):
-        self.name = name
-        self.columns = self.validate_columns(columns)
-        self.data = []
-
-    def validate_columns(self, columns):
-        if not isinstance(columns, list) or not all(isinstance(col, tuple) and len(col) >= 2 for col in columns):
-            raise ValueError(f"Error en la definición de columnas para '{self.name}'. Se esperaba lista de tuplas (nombre, tipo[, restricciones])")
-        return columns
-
-    def insert(self, values):
-        if len(values) != len(self.columns):
-            raise ValueError(f"Error: número de valores incorrecto para tabla '{self.name}'. Esperado {len(self.columns)}, recibido {len(values)}")
-
-        cleaned_values = []
-        for i, col in enumerate(self.columns):
-            col_name = col[0]
-            col_type = col[1]
-            val = values[i]
-
-            # Limpiar comillas si es string con comillas externas
-            if isinstance(val, str):
-                if (val.startswith("'") and val.endswith("'")) or (val.startswith('"') and val.endswith('"')):
-                    val = val[1:-1]
-
-            if not self.validate_type(val, col_type):
-                raise ValueError(f"Error: tipo de dato incorrecto para columna '{col_name}' en tabla '{self.name}'")
-
-            cleaned_values.append(val)
-
-        self.data.append(cleaned_values)
-
-    def validate_type(self, val, col_type):
-        if col_type.startswith('VARCHAR'):
-            return isinstance(val, str)
-        elif col_type in ('INT', 'NUMBER'):
-            try:
-                int(val)
-                return True
-            except:
-                return False
-        elif col_type == 'STRING':
-            return isinstance(val, str)
-        elif col_type == 'DATE':
-            try:
-                datetime.strptime(val, '%Y-%m-%d')
-                return True
-            except:
-                return False
-        else:
-            return False
-
-    def select(self, columns, condition=None):
-        if columns == ['*']:
-            cols = [col[0] for col in self.columns]
-        else:
-            cols = columns
-
-        col_indices = [self.get_column_index(c) for c in cols]
-
-        filtered_rows = [row for row in self.data if (condition is None or condition(row))]
-
-        result_rows = [[row[i] for i in col_indices] for row in filtered_rows]
-        return cols, result_rows
-
-    def update(self, updates, condition=None):
-        for i, row in enumerate(self.data):
-            if condition is None or condition(row):
-                new_row = list(row)
-                for col_name, new_val in updates.items():
-                    idx = self.get_column_index(col_name)
-                    col_type = self.columns[idx][1]
-                    if not self.validate_type(new_val, col_type):
-                        raise ValueError(f"Error: tipo de dato incorrecto para columna '{col_name}' en tabla '{self.name}'")
-                    new_row[idx] = new_val
-                self.data[i] = new_row
-
-    def delete(self, condition=None):
-        self.data = [row for row in self.data if not (condition is None or condition(row))]
-
-    def get_column_index(self, col_name):
-        for i, col in enumerate(self.columns):
-            if col[0] == col_name:
-                return i
-        raise ValueError(f"Columna '{col_name}' no existe en tabla '{self.name}'")
-
-    def __repr__(self):
-        return f"<Table {self.name} columnas={self.columns} filas={len(self.data)}>"
+import csv
+from itertools import islice
+from table import Table
+from columnar import ColumnarTable
+from predicates import compile_condition
+from persistence import Database
+import snapshot
+from statement_cache import PreparedStatement, StatementCache, bind
+from result_cache import ResultCache, freeze
+from cursor import Cursor
+from joins import JoinedRelation, join
+from instrumentation import Instrumentation
+import parallel
+from sorting import SORT_MEMORY_BYTES, apply_limit, external_sort, sort_key, top_k
+
+# Motores de almacenamiento disponibles para CREATE TABLE ... STORAGE <motor>
+STORAGE_ENGINES = {'ROW': Table, 'COLUMNAR': ColumnarTable}
+
+# Filas que COPY convierte e inserta de una vez
+COPY_BATCH_SIZE = 50000
+
+# Formas de sentencia distintas que conserva la caché de instrucciones
+STATEMENT_CACHE_SIZE = 1024
+
+# Límites de la caché de resultados de SELECT (entradas y memoria estimada)
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_BYTES = 64 << 20
+# Un SELECT recorrido por completo se guarda en la caché si no supera estas filas
+RESULT_CACHE_MAX_ROWS = 10000
 
 class Executor:
-    def __init__(self):
+    def __init__(self, storage='ROW', path=None, sync=False, workers=None):
+        """
+        storage: motor por defecto de las tablas nuevas ('ROW' o 'COLUMNAR').
+        path: directorio de la base de datos; si se indica, las tablas se cargan de
+        disco y cada modificación se registra en el WAL (sync=True hace fsync en
+        cada instrucción). Sin path las tablas viven solo en memoria.
+        workers: procesos con los que se recorren en paralelo las tablas grandes
+        (0: uno por CPU, 1: en serie); si no se indica se mantiene la configuración
+        de parallel.py. Con varios hilos vivos (server.py) se recorre en serie.
+        """
+        if storage.upper() not in STORAGE_ENGINES:
+            raise ValueError(f"Motor de almacenamiento desconocido '{storage}'")
+        if workers is not None:
+            parallel.configure(workers)
         self.tables = {}
-        self.html_generator = HtmlGenerator()
+        self.storage = storage.upper()
+        self._html_generator = None
+        self.statement_cache = StatementCache(STATEMENT_CACHE_SIZE)
+        self.result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_BYTES)
+        # Memoria para un ORDER BY sin LIMIT antes de ordenar por tramos en disco
+        self.sort_memory = SORT_MEMORY_BYTES
+        # Hooks que miden cada instrucción (ver instrumentation.py); sin hooks no se mide nada
+        self.instrumentation = Instrumentation()
+        self.database = None
+        if path is not None:
+            self.database = Database(path, sync)
+            self.database.open(self)
+
+    @property
+    def html_generator(self):
+        """Generador de HTML; jinja2 se importa la primera vez que se usa."""
+        if self._html_generator is None:
+            from JinjaPy import HtmlGenerator
+            self._html_generator = HtmlGenerator()
+        return self._html_generator
+
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+
+    def checkpoint(self):
+        """Vuelca el estado actual a disco y vacía el WAL."""
+        if self.database is not None:
+            self.database.checkpoint(self)
 
     def execute(self, instrucciones):
         resultados = []
         mensajes = []
-        errores = []
 
+        for tipo, valor in self.execute_stream(instrucciones):
+            if tipo == 'RESULTADO':
+                resultados.append(materialize(valor))
+            else:
+                mensajes.append(valor)
+
+        if resultados:
+            self.html_generator.generate_html(resultados, mensajes)
+
+        return resultados, mensajes
+
+    def execute_stream(self, instrucciones):
+        """
+        Ejecuta cada instrucción en cuanto llega (instrucciones puede ser un generador,
+        p. ej. Parser.iter_parse) y genera los eventos ('RESULTADO', (cols, filas))
+        y ('MENSAJE', texto) sin acumularlos. filas puede ser un Cursor: hay que
+        recorrerlo antes de pedir el siguiente evento.
+        """
         for instr in instrucciones:
-            tipo = instr[0]
-
-            if tipo == 'CREATE_TABLE':
-                _, table_name, columns = instr
-                if table_name in self.tables:
-                    raise ValueError(f"Tabla '{table_name}' ya existe")
-                self.tables[table_name] = Table(table_name, columns)
-                mensajes.append(f"Tabla '{table_name}' creada exitosamente.")
-
-            elif tipo == 'INSERT':
-                # Ahora desempacamos columnas y valores
-                _, table_name, columns, values = instr
-                if table_name not in self.tables:
-                    raise ValueError(f"Tabla '{table_name}' no existe")
-
-                # Si columns es None, asumimos orden según tabla
-                if columns is None:
-                    self.tables[table_name].insert(values)
-                else:
-                    # Insert con columnas específicas
-                    # Crear fila con valores en el orden de las columnas de la tabla
-                    row = [None] * len(self.tables[table_name].columns)
-                    for col_name, val in zip(columns, values):
-                        idx = self.tables[table_name].get_column_index(col_name)
-                        row[idx] = val
-                    # Rellenar valores faltantes con None o valor por defecto
-                    for i in range(len(row)):
-                        if row[i] is None:
-                            row[i] = None  # O puedes definir otro valor por defecto
-                    self.tables[table_name].insert(row)
-                mensajes.append(f"Datos insertados en '{table_name}' exitosamente.")
-
-            elif tipo == 'SELECT':
-                _, columns, table_name, condition = instr
-                if table_name not in self.tables:
-                    raise ValueError(f"Tabla '{table_name}' no existe")
-
-                # condition puede ser una tupla (left, op, right) o None
-                condition_func = self.build_condition_func(table_name, condition)
-                cols, rows = self.tables[table_name].select(columns, condition_func)
-                resultados.append((cols, rows))
-                mensajes.append(f"Consulta SELECT ejecutada en '{table_name}'.")
-
-            elif tipo == 'UPDATE':
-                _, table_name, updates, condition = instr
-                if table_name not in self.tables:
-                    raise ValueError(f"Tabla '{table_name}' no existe")
-                condition_func = self.build_condition_func(table_name, condition)
-                self.tables[table_name].update(updates, condition_func)
-                mensajes.append(f"Tabla '{table_name}' actualizada correctamente.")
+            resultado, mensaje = self.execute_instruction(instr)
+            if resultado is not None:
+                yield ('RESULTADO', resultado)
+            yield ('MENSAJE', mensaje)
 
-            elif tipo == 'DELETE':
-                _, table_name, condition = instr
-                if table_name not in self.tables:
-                    raise ValueError(f"Tabla '{table_name}' no existe")
+    def execute_sql(self, sql, params=()):
+        """
+        Ejecuta texto SQL (una o varias instrucciones) pasando por la caché de
+        instrucciones; params da valor a los '?' en orden. Devuelve una lista de
+        (resultado o None, mensaje), una por instrucción.
+        """
+        templates, slots = self.statement_cache.lookup(sql)
+        salidas = []
+        for instr in bind(templates, slots, params):
+            resultado, mensaje = self.execute_instruction(instr)
+            salidas.append((materialize(resultado) if resultado is not None else None, mensaje))
+        return salidas
+
+    def prepare(self, sql):
+        """Analiza una instrucción con '?' una sola vez; se ejecuta con .execute(params)."""
+        return PreparedStatement(self, sql)
+
+    def execute_instruction(self, instr):
+        """Ejecuta una instrucción y devuelve (resultado o None, mensaje)."""
+        if self.instrumentation.hooks:
+            return self.instrumentation.statement(self.run_instruction, instr)
+        return self.run_instruction(instr)
+
+    def execute_read(self, instr):
+        """Como execute_instruction para instrucciones que no modifican nada: no pasa por el WAL."""
+        if self.instrumentation.hooks:
+            return self.instrumentation.statement(self.dispatch, instr)
+        return self.dispatch(instr)
+
+    def run_instruction(self, instr):
+        try:
+            return self.dispatch(instr)
+        finally:
+            if self.database is not None:
+                self.database.commit(self)
+
+    def dispatch(self, instr):
+        tipo = instr[0]
+
+        if tipo == 'CREATE_TABLE':
+            _, table_name, columns, storage = instr
+            if table_name in self.tables:
+                raise ValueError(f"Tabla '{table_name}' ya existe")
+            table = self.create_table(table_name, columns, storage)
+            if self.database is not None:
+                self.database.table_created(table)
+            return None, f"Tabla '{table_name}' creada exitosamente."
+
+        elif tipo == 'INSERT':
+            # Ahora desempacamos columnas y valores
+            _, table_name, columns, values = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+
+            # Si columns es None, asumimos orden según tabla
+            if columns is None:
+                self.tables[table_name].insert(values)
+            else:
+                # Insert con columnas específicas
+                # Crear fila con valores en el orden de las columnas de la tabla
+                row = [None] * len(self.tables[table_name].columns)
+                for col_name, val in zip(columns, values):
+                    idx = self.tables[table_name].get_column_index(col_name)
+                    row[idx] = val
+                # Rellenar valores faltantes con None o valor por defecto
+                for i in range(len(row)):
+                    if row[i] is None:
+                        row[i] = None  # O puedes definir otro valor por defecto
+                self.tables[table_name].insert(row)
+            return None, f"Datos insertados en '{table_name}' exitosamente."
+
+        elif tipo == 'INSERT_MANY':
+            _, table_name, columns, filas = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            count = self.tables[table_name].insert_many(filas, columns)
+            return None, f"{count} filas insertadas en '{table_name}' exitosamente."
+
+        elif tipo == 'COPY':
+            _, table_name, columns, filename, header = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            count = self.copy_from_csv(table_name, columns, filename, header)
+            return None, f"{count} filas copiadas en '{table_name}' desde '{filename}'."
+
+        elif tipo == 'SELECT':
+            _, columns, table_name, condition, clausulas = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            limit = self.row_count_clause(clausulas, 'limit')
+            offset = self.row_count_clause(clausulas, 'offset') or 0
+
+            # Mientras la tabla no cambie (misma versión) se reutiliza el resultado.
+            # Las filas devueltas se comparten entre ejecuciones: no deben modificarse.
+            key = freeze(instr)
+            result = self.result_cache.get(key, self.tables)
+            if result is not None:
+                return result, f"Consulta SELECT ejecutada en '{table_name}'."
+
+            # condition puede ser una tupla (left, op, right) o None
+            table = self.tables[table_name]
+            if clausulas.get('joins') or clausulas.get('alias'):
+                # Con JOIN o alias se lee de la relación unida, que se usa como una tabla
+                table = self.join_relation(table, clausulas)
+                condition_func = compile_condition(table, condition) if condition else None
+                depends_on = table.tables
+            else:
                 condition_func = self.build_condition_func(table_name, condition)
-                self.tables[table_name].delete(condition_func)
-                mensajes.append(f"Registros eliminados en '{table_name}'.")
+                depends_on = [table]
+            cols, rows = self.select_rows(table, columns, condition_func, clausulas, limit, offset)
+
+            def cache_result(all_rows):
+                self.result_cache.put(key, (cols, all_rows), depends_on)
+
+            cursor = Cursor(table, cols, rows, cache_result, RESULT_CACHE_MAX_ROWS)
+            return (cols, cursor), f"Consulta SELECT ejecutada en '{table_name}'."
+
+        elif tipo == 'UPDATE':
+            _, table_name, updates, condition = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            condition_func = self.build_condition_func(table_name, condition)
+            self.tables[table_name].update(updates, condition_func)
+            return None, f"Tabla '{table_name}' actualizada correctamente."
+
+        elif tipo == 'DELETE':
+            _, table_name, condition = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            condition_func = self.build_condition_func(table_name, condition)
+            self.tables[table_name].delete(condition_func)
+            return None, f"Registros eliminados en '{table_name}'."
+
+        elif tipo == 'CREATE_INDEX':
+            _, index_name, table_name, column = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            if self.find_index_table(index_name) is not None:
+                raise ValueError(f"Índice '{index_name}' ya existe")
+            self.tables[table_name].create_index(index_name, column)
+            if self.database is not None:
+                self.database.log('CREATE_INDEX', table_name, index_name, column)
+            return None, f"Índice '{index_name}' creado en '{table_name}' ({column})."
+
+        elif tipo == 'DROP_INDEX':
+            _, index_name = instr
+            table = self.find_index_table(index_name)
+            if table is None:
+                raise ValueError(f"Índice '{index_name}' no existe")
+            table.drop_index(index_name)
+            if self.database is not None:
+                self.database.log('DROP_INDEX', table.name, index_name)
+            return None, f"Índice '{index_name}' eliminado de '{table.name}'."
+
+        elif tipo == 'SHOW_INDEX':
+            _, table_name = instr
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            cols = ['indice', 'columna', 'tipo', 'entradas']
+            return (cols, self.tables[table_name].list_indexes()), f"Índices de '{table_name}' listados."
+
+        elif tipo == 'EXPLAIN':
+            # explain importa este módulo: se importa al usarse
+            from explain import explain
+            _, analyze, inner = instr
+            return explain(self, inner, analyze), f"Plan de la instrucción {inner[0]}{' (ejecutada)' if analyze else ''}."
+
+        elif tipo == 'ANALYZE':
+            _, table_name = instr
+            if table_name is not None and table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            names = list(self.tables) if table_name is None else [table_name]
+            cols = ['tabla', 'columna', 'filas', 'nulos', 'distintos', 'minimo', 'maximo']
+            rows = []
+            for name in names:
+                for col_name, stats in self.tables[name].analyze().items():
+                    rows.append([name, col_name] + stats.summary())
+            return (cols, rows), f"Estadísticas actualizadas de {len(names)} tabla(s)."
 
-            else:
-                raise ValueError(f"Instrucción desconocida '{tipo}'")
+        else:
+            raise ValueError(f"Instrucción desconocida '{tipo}'")
 
-        if not errores and resultados:
-            self.html_generator.generate_html(resultados, mensajes)
+    def save_snapshot(self, filename):
+        """Guarda todas las tablas en una instantánea binaria (ver snapshot.py)."""
+        snapshot.save_snapshot(self.tables, filename)
 
-        return resultados, mensajes
+    def load_snapshot(self, filename):
+        """
+        Reemplaza las tablas por las de una instantánea. Si falla, las tablas
+        anteriores quedan intactas. Con base de datos en disco se hace un checkpoint
+        para que el contenido cargado quede persistido.
+        """
+        previous = self.tables
+        self.tables = {}
+        try:
+            snapshot.load_snapshot(self, filename)
+        except Exception:
+            self.tables = previous
+            raise
+        if self.database is not None:
+            self.database.checkpoint(self)
+
+    def create_table(self, table_name, columns, storage=None):
+        storage = storage or self.storage
+        if storage not in STORAGE_ENGINES:
+            raise ValueError(f"Motor de almacenamiento desconocido '{storage}'")
+        table = STORAGE_ENGINES[storage](table_name, columns)
+        self.tables[table_name] = table
+        return table
+
+    def copy_from_csv(self, table_name, columns, filename, header=False):
+        """
+        Carga un CSV en la tabla por lotes de COPY_BATCH_SIZE filas, sin pasar por
+        el lexer ni el parser. Con header=True la primera línea indica las columnas
+        (salvo que se den explícitamente). Devuelve el número de filas insertadas.
+        """
+        table = self.tables[table_name]
+        try:
+            f = open(filename, 'r', encoding='utf-8', newline='')
+        except OSError as e:
+            raise ValueError(f"No se pudo abrir '{filename}': {e.strerror}")
+
+        with f:
+            reader = csv.reader(f)
+            if header:
+                names = next(reader, None)
+                if columns is None and names is not None:
+                    columns = [name.strip() for name in names]
+
+            count = 0
+            while True:
+                batch = list(islice(reader, COPY_BATCH_SIZE))
+                if not batch:
+                    break
+                count += table.insert_many(batch, columns, quoted=False)
+        return count
+
+    def join_relation(self, table, clausulas, meter=None):
+        """
+        Relación del FROM: la tabla con su alias seguida de cada JOIN, unida al
+        resultado de los anteriores. Las filas se generan al recorrerla. Si se da,
+        meter(operador, filas) recibe las filas de la tabla y las de cada JOIN y
+        devuelve las que se usan (lo usa EXPLAIN).
+        """
+        sources = [(clausulas.get('alias') or table.name, table)]
+        rows = table.iter_rows()
+        if meter is not None:
+            rows = meter(f"Recorrido {sources[0][0]}", rows)
+        plan = []
+        nullable = False
+        for kind, table_name, alias, condition in clausulas.get('joins') or []:
+            if table_name not in self.tables:
+                raise ValueError(f"Tabla '{table_name}' no existe")
+            qualifier = alias or table_name
+            if any(qualifier == name for name, _ in sources):
+                raise ValueError(f"Tabla '{qualifier}' repetida en el FROM; use un alias distinto")
+            right = JoinedRelation([(qualifier, self.tables[table_name])])
+            method, rows = join(JoinedRelation(sources), rows, right, condition, outer=kind == 'LEFT')
+            if meter is not None:
+                rows = meter(method, rows)
+            plan.append(method)
+            nullable = nullable or kind == 'LEFT'
+            sources = sources + right.sources
+        return JoinedRelation(sources, rows, plan, nullable)
+
+    def select_rows(self, table, columns, condition, clausulas, limit, offset):
+        """(columnas, filas) de un SELECT sobre la tabla o relación ya resuelta."""
+        if clausulas.get('group_by') or any(isinstance(col, tuple) for col in columns):
+            return self.aggregate_select(table, columns, condition, clausulas, limit, offset)
+        if clausulas.get('order_by'):
+            return self.ordered_select(table, columns, condition, clausulas['order_by'], limit, offset)
+        return table.iter_select(columns, condition, limit, offset)
+
+    def aggregate_select(self, table, columns, condition, clausulas, limit, offset):
+        """
+        SELECT con agregados y/o GROUP BY: una pasada con un acumulador por grupo.
+        ORDER BY se aplica después sobre las filas agregadas (una por grupo).
+        """
+        group_by = clausulas.get('group_by') or []
+        if columns == ['*']:
+            raise ValueError("SELECT * no se puede usar con GROUP BY")
+        group_idx = [table.get_column_index(col) for col in group_by]
+
+        specs = []
+        for item in columns:
+            if not isinstance(item, tuple):
+                if item not in group_by:
+                    raise ValueError(f"La columna '{item}' debe aparecer en GROUP BY o dentro de una función de agregado")
+                continue
+            func, arg = item
+            if arg == '*':
+                specs.append((func, None))
+                continue
+            col_idx = table.get_column_index(arg)
+            col_type = table.columns[col_idx][1]
+            if func in ('SUM', 'AVG') and col_type not in ('INT', 'NUMBER'):
+                raise ValueError(f"{func} requiere una columna numérica; '{arg}' es {col_type}")
+            specs.append((func, col_idx))
+
+        groups = table.aggregate(condition, group_idx, specs)
+
+        cols = [column_label(item) for item in columns]
+        rows = []
+        for key, values in groups.items():
+            values = iter(values)
+            rows.append([next(values) if isinstance(item, tuple) else key[group_by.index(item)]
+                         for item in columns])
+
+        order_by = clausulas.get('order_by')
+        if order_by:
+            key_indices = []
+            for item, _ in order_by:
+                label = column_label(item)
+                if label not in cols:
+                    raise ValueError(f"ORDER BY '{label}' debe ser una columna del resultado")
+                key_indices.append(cols.index(label))
+            # Los agregados de un grupo sin valores (MIN, AVG, ...) son None
+            key, reverse = sort_key(key_indices, [direction == 'DESC' for _, direction in order_by], nullable=True)
+            rows.sort(key=key, reverse=reverse)
+        return cols, apply_limit(rows, limit, offset)
+
+    def ordered_select(self, table, columns, condition, order_by, limit, offset):
+        """
+        SELECT con ORDER BY. Con un índice ordenado sobre la única columna de orden
+        se recorre el índice sin ordenar (y se para al llegar a LIMIT); si no, se usa
+        un montículo de LIMIT + OFFSET filas o, sin LIMIT, una ordenación externa.
+        """
+        cols, col_indices = table.resolve_columns(columns)
+        key_indices = [table.get_column_index(col) for col, _ in order_by]
+        descending = [direction == 'DESC' for _, direction in order_by]
+
+        index = None
+        if len(order_by) == 1 and getattr(condition, 'row_ids', None) is None:
+            index = table.ordered_index(order_by[0][0])
+
+        if index is not None:
+            matches = (row for _, row in table.iter_ordered(index, descending[0], condition))
+            rows = apply_limit(matches, limit, offset)
+        else:
+            matches = (row for _, row in table.matching_rows(condition))
+            key, reverse = sort_key(key_indices, descending, getattr(table, 'nullable', False))
+            if limit is not None:
+                rows = iter(top_k(matches, offset + limit, key, reverse)[offset:])
+            else:
+                rows = apply_limit(external_sort(matches, key, reverse, self.sort_memory), None, offset)
+        return cols, ([row[i] for i in col_indices] for row in rows)
+
+    def row_count_clause(self, clausulas, name):
+        """Valor entero no negativo de LIMIT / OFFSET, o None si no se indicó."""
+        val = clausulas.get(name)
+        if val is None:
+            return None
+        try:
+            count = int(val)
+        except (TypeError, ValueError):
+            count = -1
+        if count < 0:
+            raise ValueError(f"{name.upper()} debe ser un entero no negativo, se recibió {val!r}")
+        return count
+
+    def instruction_tables(self, instr):
+        """(nombres de las tablas que usa la instrucción, True si las modifica)."""
+        tipo = instr[0]
+        if tipo == 'SELECT':
+            joins = instr[4].get('joins') or []
+            return {instr[2]} | {join[1] for join in joins}, False
+        if tipo == 'SHOW_INDEX':
+            return {instr[1]}, False
+        if tipo == 'EXPLAIN':
+            # Sin ANALYZE no se ejecuta nada: basta con leer
+            names, write = self.instruction_tables(instr[2])
+            return names, write and instr[1]
+        if tipo == 'CREATE_INDEX':
+            return {instr[2]}, True
+        if tipo == 'DROP_INDEX':
+            table = self.find_index_table(instr[1])
+            return ({table.name} if table is not None else set()), True
+        if tipo == 'ANALYZE':
+            return ({instr[1]} if instr[1] is not None else set(self.tables)), True
+        return {instr[1]}, True
+
+    def find_index_table(self, index_name):
+        for table in self.tables.values():
+            if index_name in table.indexes:
+                return table
+        return None
 
     def build_condition_func(self, table_name, condition):
         """
         Construye una función condicional para filtrar filas según la condición
-        condition: tupla (columna, operador, valor) o None
+        condition: tupla (columna, operador, valor), combinación AND / OR / NOT
+        (ver predicates.compile_condition) o None
         """
         if not condition:
             return None
-        col, op, val = condition
         table = self.tables[table_name]
-        col_idx = table.get_column_index(col)
-
-        def cond_func(row):
-            cell = row[col_idx]
-            # Convertir tipos para comparación (si es número, convertir a int)
-            try:
-                if isinstance(cell, str) and cell.isdigit():
-                    cell_val = int(cell)
-                else:
-                    cell_val = cell
-            except:
-                cell_val = cell
-
-            try:
-                if isinstance(val, str) and val.isdigit():
-                    val_cmp = int(val)
-                else:
-                    val_cmp = val
-            except:
-                val_cmp = val
-
-            if op == '=':
-                return cell_val == val_cmp
-            elif op == '!=':
-                return cell_val != val_cmp
-            elif op == '<':
-                return cell_val < val_cmp
-            elif op == '>':
-                return cell_val > val_cmp
-            elif op == '<=':
-                return cell_val <= val_cmp
-            elif op == '>=':
-                return cell_val >= val_cmp
-            else:
-                raise ValueError(f"Operador desconocido '{op}' en condición")
+        cond_func = compile_condition(table, condition)
+
+        used = []
+        row_ids = self.index_rows(table, cond_func, used)
+        if row_ids is not None:
+            # Solo se revisan las filas candidatas; la condición completa se sigue comprobando
+            cond_func.row_ids = row_ids
+            # (índice, comparación) con que se obtuvieron; lo muestra EXPLAIN
+            cond_func.indexes = used
 
         return cond_func
+
+    def index_rows(self, table, cond_func, used=None):
+        """
+        Posiciones candidatas obtenidas con índices, o None si hay que recorrer la
+        tabla. Una comparación usa el índice de su columna (igualdad sobre PRIMARY
+        KEY / UNIQUE en O(1), rango por búsqueda binaria en un índice ordenado); un
+        AND, el de su parte más selectiva que tenga índice; un OR, la unión de las
+        de todas sus partes si todas tienen. used recibe los (índice, comparación) usados.
+        """
+        op = getattr(cond_func, 'op', None)
+        if op is not None:
+            index = table.index_for(table.columns[cond_func.col_idx][0], op)
+            if index is None:
+                return None
+            if used is not None:
+                used.append((index, cond_func))
+            return index.lookup(op, cond_func.value)
+
+        conjuncts = getattr(cond_func, 'conjuncts', None)
+        if conjuncts is not None:
+            for part in sorted(conjuncts, key=lambda part: part.selectivity):
+                row_ids = self.index_rows(table, part, used)
+                if row_ids is not None:
+                    return row_ids
+            return None
+
+        disjuncts = getattr(cond_func, 'disjuncts', None)
+        if disjuncts is not None:
+            found = set()
+            for part in disjuncts:
+                row_ids = self.index_rows(table, part, used)
+                if row_ids is None:
+                    return None
+                found.update(row_ids)
+            return sorted(found)
+        return None
+
+
+def materialize(resultado):
+    """(columnas, filas) con las filas en una lista (recorre el cursor si lo hay)."""
+    cols, rows = resultado
+    return cols, rows if isinstance(rows, list) else list(rows)
+
+
+def column_label(item):
+    """Nombre de una columna del resultado: la propia columna o p. ej. 'COUNT(*)'."""
+    if isinstance(item, tuple):
+        return f"{item[0]}({item[1]})"
+    return item
@@ -0,0 +1,291 @@
+"""
+EXPLAIN y EXPLAIN ANALYZE.
+
+EXPLAIN devuelve el plan de una instrucción como un resultado más: una fila por
+operador, sangrada según su profundidad, con las filas estimadas a partir de la
+selectividad de la condición (con las estadísticas de ANALYZE si las hay, ver
+predicates). No ejecuta nada.
+
+EXPLAIN ANALYZE además ejecuta la instrucción y completa las filas leídas, las
+devueltas y el tiempo de cada operador. En una tabla sin JOIN el acceso (índice
+o recorrido con la condición) se mide en una pasada aparte y completa: en el
+SELECT real puede cortarse antes por LIMIT, y su tiempo va incluido en el del
+operador de arriba. EXPLAIN ANALYZE de un INSERT, UPDATE, DELETE, ... modifica
+la tabla como la instrucción sin EXPLAIN.
+"""
+from time import perf_counter
+
+from columnar import ColumnarTable, vector_scan
+from executor import column_label, materialize
+from predicates import compile_condition
+import parallel
+
+COLUMNS = ['operador', 'detalle', 'filas_estimadas', 'filas_leidas', 'filas', 'tiempo_ms']
+
+
+class Operator:
+    def __init__(self, name, detail='', estimated=None, depth=0):
+        self.name = name
+        self.detail = detail
+        self.estimated = estimated
+        self.depth = depth
+        # Solo con ANALYZE
+        self.read = None
+        self.rows = None
+        self.seconds = None
+
+    def to_row(self):
+        ms = None if self.seconds is None else round(self.seconds * 1000, 3)
+        return ['  ' * self.depth + self.name, self.detail, self.estimated, self.read, self.rows, ms]
+
+
+class Meter:
+    """
+    meter(operador, filas) para Executor.join_relation: anota el operador y, con
+    ANALYZE, devuelve las filas envueltas para contarlas y medir el tiempo de
+    producirlas (incluye el de los operadores de debajo).
+    """
+
+    def __init__(self, analyze):
+        self.analyze = analyze
+        self.operators = []
+
+    def __call__(self, name, rows):
+        operator = Operator(name)
+        self.operators.append(operator)
+        return self.counted(operator, rows) if self.analyze else rows
+
+    def counted(self, operator, rows):
+        # Si nadie pide las filas (p. ej. un MERGE JOIN lee de los índices) quedan en None
+        rows = iter(rows)
+        operator.rows, operator.seconds = 0, 0.0
+        while True:
+            start = perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                operator.seconds += perf_counter() - start
+                return
+            operator.seconds += perf_counter() - start
+            operator.rows += 1
+            yield row
+
+
+def explain(executor, instr, analyze):
+    """(columnas, filas) con el plan de instr; con analyze la ejecuta y la mide."""
+    tipo = instr[0]
+    if tipo == 'SELECT':
+        operators = select_plan(executor, instr, analyze)
+    elif tipo in ('UPDATE', 'DELETE'):
+        operators = modify_plan(executor, instr, analyze)
+    else:
+        operator = Operator('Instrucción', tipo)
+        if analyze:
+            resultado, seconds = timed(lambda: executor.dispatch(instr)[0])
+            operator.seconds = seconds
+            if resultado is not None:
+                operator.rows = len(resultado[1])
+        operators = [operator]
+    return list(COLUMNS), [operator.to_row() for operator in operators]
+
+
+def timed(func):
+    start = perf_counter()
+    result = func()
+    return result, perf_counter() - start
+
+
+def literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return f"'{value}'"
+
+
+def describe(table, cond):
+    """Texto de una condición compilada (ver predicates.compile_condition)."""
+    if hasattr(cond, 'op'):
+        return f"{table.columns[cond.col_idx][0]} {cond.op} {literal(cond.value)}"
+    if hasattr(cond, 'negated'):
+        return f"NOT ({describe(table, cond.negated)})"
+    parts, glue = (cond.conjuncts, ' AND ') if hasattr(cond, 'conjuncts') else (cond.disjuncts, ' OR ')
+    return glue.join(f"({describe(table, part)})" if hasattr(part, 'conjuncts') or hasattr(part, 'disjuncts')
+                     else describe(table, part) for part in parts)
+
+
+def estimate(table, cond):
+    rows = table.row_count()
+    return rows if cond is None else round(cond.selectivity * rows)
+
+
+def limit_text(limit, offset):
+    text = '' if limit is None else f" LIMIT {limit}"
+    return text + (f" OFFSET {offset}" if offset else '')
+
+
+def limited(estimated, limit, offset):
+    if estimated is None:
+        return None
+    estimated = max(estimated - offset, 0)
+    return estimated if limit is None else min(estimated, limit)
+
+
+def select_plan(executor, instr, analyze):
+    _, columns, table_name, condition, clausulas = instr
+    if table_name not in executor.tables:
+        raise ValueError(f"Tabla '{table_name}' no existe")
+    limit = executor.row_count_clause(clausulas, 'limit')
+    offset = executor.row_count_clause(clausulas, 'offset') or 0
+    table = executor.tables[table_name]
+    if clausulas.get('joins') or clausulas.get('alias'):
+        return join_plan(executor, table, columns, condition, clausulas, limit, offset, analyze)
+
+    cond = executor.build_condition_func(table_name, condition)
+    matched = estimate(table, cond)
+    order_by = clausulas.get('order_by')
+    aggregate = bool(clausulas.get('group_by')) or any(isinstance(col, tuple) for col in columns)
+    index = None
+    if aggregate:
+        group_by = clausulas.get('group_by') or []
+        groups = 1
+        for col in group_by:
+            stats = table.stats.get(col)
+            groups = None if stats is None or groups is None else groups * max(stats.distinct, 1)
+        if groups is not None:
+            groups = min(groups, matched) if group_by else 1
+        detail = ', '.join(column_label(item) for item in columns if isinstance(item, tuple))
+        if group_by:
+            detail = f"GROUP BY {', '.join(group_by)}" + (f"; {detail}" if detail else '')
+        top = Operator('Agregación', detail, groups)
+    elif order_by:
+        if len(order_by) == 1 and getattr(cond, 'row_ids', None) is None:
+            index = table.ordered_index(order_by[0][0])
+        order_text = ', '.join(f"{col} {direction}" for col, direction in order_by)
+        if index is not None:
+            top = Operator('Proyección', f"ORDER BY {order_text} por el índice", matched)
+        elif limit is not None:
+            top = Operator('Top-K', f"{offset + limit} filas por {order_text}", matched)
+        else:
+            top = Operator('Ordenación externa', f"ORDER BY {order_text}", matched)
+    else:
+        top = Operator('Proyección', ', '.join(column_label(item) for item in columns), matched)
+    top.detail += limit_text(limit, offset)
+    top.estimated = limited(top.estimated, limit, offset)
+
+    access = access_operator(table, cond, index, aggregate, depth=1)
+    if analyze:
+        if index is not None:
+            descending = order_by[0][1] == 'DESC'
+            access.read = table.row_count()
+            access.rows, access.seconds = timed(
+                lambda: sum(1 for _ in table.iter_ordered(index, descending, cond)))
+        else:
+            measure_access(table, cond, access)
+        resultado, top.seconds = timed(
+            lambda: materialize(executor.select_rows(table, columns, cond, clausulas, limit, offset)))
+        top.read, top.rows = access.rows, len(resultado[1])
+    return [top, access]
+
+
+def access_operator(table, cond, index=None, aggregate=False, depth=0):
+    """Operador que lee la tabla: por un índice, un recorrido vectorial o uno secuencial."""
+    detail = table.name if cond is None else f"{table.name} WHERE {describe(table, cond)}"
+    lookups = getattr(cond, 'indexes', None)
+    if index is not None:
+        name = f"Índice {index.kind} {index.name}"
+    elif lookups:
+        name = 'Índice ' + ', '.join(f"{used.kind} {used.name}" for used, _ in lookups)
+        detail += f"; búsqueda: {' OR '.join(describe(table, part) for _, part in lookups)}"
+    elif isinstance(table, ColumnarTable) and vector_scan(cond)[0] is not None:
+        name = 'Recorrido vectorial'
+    else:
+        name = 'Recorrido secuencial'
+    # Los recorridos en paralelo necesitan una condición, salvo en las agregaciones
+    if index is None and (cond is not None or aggregate):
+        workers = parallel.workers_for(table, cond)
+        if workers:
+            detail += f"; en {workers} procesos"
+    return Operator(name, detail, estimate(table, cond), depth)
+
+
+def measure_access(table, cond, operator):
+    row_ids = getattr(cond, 'row_ids', None)
+    operator.read = len(row_ids) if row_ids is not None else table.row_count()
+    operator.rows, operator.seconds = timed(lambda: table.count_matching(cond))
+
+
+def join_plan(executor, table, columns, condition, clausulas, limit, offset, analyze):
+    meter = Meter(analyze)
+    relation = executor.join_relation(table, clausulas, meter)
+    cond = compile_condition(relation, condition) if condition else None
+
+    if clausulas.get('group_by') or any(isinstance(col, tuple) for col in columns):
+        top = Operator('Agregación', ', '.join(column_label(item) for item in columns))
+    elif clausulas.get('order_by'):
+        order_text = ', '.join(f"{col} {direction}" for col, direction in clausulas['order_by'])
+        top = Operator('Top-K' if limit is not None else 'Ordenación externa', f"ORDER BY {order_text}")
+    else:
+        top = Operator('Proyección', ', '.join(column_label(item) for item in columns))
+    top.detail += limit_text(limit, offset)
+    operators = [top]
+
+    if cond is not None:
+        filter_operator = Operator('Filtro', describe(relation, cond), depth=1)
+        operators.append(filter_operator)
+        if analyze:
+            cond = counted_condition(filter_operator, cond)
+
+    # Los JOIN se anidan: el último recibe el resultado de los anteriores y lee su tabla
+    base, joins = meter.operators[0], meter.operators[1:]
+    base.name, base.detail = 'Recorrido secuencial', relation.sources[0][0]
+    depth = len(operators)
+    right_scans = []
+    for operator, (qualifier, right) in zip(reversed(joins), reversed(relation.sources[1:])):
+        operator.depth = depth
+        operators.append(operator)
+        right_scans.append(Operator('Recorrido secuencial', qualifier, right.row_count(), depth + 1))
+        depth += 1
+    base.depth, base.estimated = depth, table.row_count()
+    operators.append(base)
+    operators.extend(reversed(right_scans))
+
+    if analyze:
+        resultado, top.seconds = timed(
+            lambda: materialize(executor.select_rows(relation, columns, cond, clausulas, limit, offset)))
+        top.rows = len(resultado[1])
+    return operators
+
+
+def counted_condition(operator, cond):
+    """La condición, contando en operator las filas que comprueba y las que la cumplen."""
+    operator.read, operator.rows = 0, 0
+
+    def predicate(row):
+        operator.read += 1
+        if cond(row):
+            operator.rows += 1
+            return True
+        return False
+    return predicate
+
+
+def modify_plan(executor, instr, analyze):
+    tipo, table_name = instr[0], instr[1]
+    condition = instr[3] if tipo == 'UPDATE' else instr[2]
+    if table_name not in executor.tables:
+        raise ValueError(f"Tabla '{table_name}' no existe")
+    table = executor.tables[table_name]
+    cond = executor.build_condition_func(table_name, condition)
+    if tipo == 'UPDATE':
+        top = Operator('Actualización', ', '.join(f"{col} = {val}" for col, val in instr[2].items()))
+    else:
+        top = Operator('Borrado', table_name)
+    access = access_operator(table, cond, depth=1)
+    top.estimated = access.estimated
+    if analyze:
+        measure_access(table, cond, access)
+        _, top.seconds = timed(lambda: executor.dispatch(instr))
+        top.read = top.rows = access.rows
+    return [top, access]
+
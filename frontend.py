@@ -0,0 +1,222 @@
+"""
+Lexer y parser en paralelo para scripts grandes.
+
+El script se recorre una vez buscando los ';' que no están dentro de un literal
+de texto (se reconocen con la misma expresión que lexer.TOKEN_TYPES['STRING'],
+así que un ';' entre comillas nunca corta). Con esos cortes se hacen tramos de
+unos SHARD_CHARS caracteres que tokenizan y analizan procesos hijos. Cada tramo
+empieza con la línea, la columna y el número de '?' del texto anterior, de modo
+que los tokens, los Param y los mensajes de error son los mismos que con Parser
+en serie.
+
+Las instrucciones se devuelven en el orden del script, tramo a tramo, con como
+mucho IN_FLIGHT tramos pendientes por proceso: la memoria está acotada aunque el
+executor vaya más lento que el parser. Si un tramo falla, el resto del script
+se analiza en serie desde el principio de ese tramo, que da exactamente las
+instrucciones y el error del parser en serie. Los avisos del lexer (caracteres
+no reconocidos) los imprimen los hijos y pueden salir desordenados.
+
+parse_text recibe el texto entero y los hijos lo heredan sin copiarlo (fork).
+parse_file no lo carga: busca los cortes sobre el archivo proyectado con mmap y
+cada hijo lee del archivo solo los bytes de su tramo, así que un volcado de
+varios GB se analiza con la misma memoria acotada que en serie.
+
+Como parallel.py necesita fork y no lo hace con más de un hilo vivo. Sin fork,
+con un solo proceso, con otros hilos, con scripts de menos de
+PARALLEL_MIN_CHARS o con instrumentación (que mide cada fase en el proceso
+principal) todo va en serie.
+
+    for instr in parse_file('migracion.sql', workers=0):
+        executor.execute_instruction(instr)
+"""
+from collections import deque
+from functools import partial
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+
+import lexer
+from parser import Parser
+
+# Caracteres por tramo: cada uno se analiza entero en un hijo
+SHARD_CHARS = 1 << 18
+
+# Scripts más pequeños se analizan en serie
+PARALLEL_MIN_CHARS = 1 << 20
+
+# Tramos enviados y aún no devueltos, por proceso
+IN_FLIGHT = 2
+
+_CONTEXT = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+
+# Literales de texto, ';' y '?': lo único que hay que ver para cortar el script
+_BOUNDARY = re.compile(f"{lexer.TOKEN_TYPES['STRING']}|[;?]")
+_BOUNDARY_BYTES = re.compile(_BOUNDARY.pattern.encode('ascii'))
+
+# Texto del script en curso; los hijos lo heredan al crearse el pool
+_text = None
+
+
+def shards(text, size=SHARD_CHARS, start=0, line=1, column=0, params=0):
+    """
+    (inicio, fin, línea, columna, parámetros) de cada tramo: los tramos terminan
+    tras un ';' de fin de instrucción y parámetros es el número de '?' anteriores.
+    Para seguir desde un tramo ya conocido se pasan su inicio, línea, columna y
+    parámetros.
+    """
+    shard_params = params
+    for match in _BOUNDARY.finditer(text, start):
+        char = text[match.start()]
+        if char == '?':
+            params += 1
+        elif char == ';' and match.end() - start >= size:
+            end = match.end()
+            yield start, end, line, column, shard_params
+            newline = text.rfind('\n', start, end)
+            if newline < 0:
+                column += end - start
+            else:
+                line += text.count('\n', start, end)
+                column = end - newline - 1
+            start, shard_params = end, params
+    if start < len(text):
+        yield start, len(text), line, column, shard_params
+
+
+def file_shards(filename, size=SHARD_CHARS):
+    """
+    Como shards, pero sobre los bytes del archivo proyectado con mmap: inicio y
+    fin son posiciones en bytes, y línea y columna las que verá el lexer tras
+    decodificar y traducir los saltos de línea.
+    """
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = params = shard_params = column = 0
+        line = 1
+        for match in _BOUNDARY_BYTES.finditer(mm):
+            char = mm[match.start()]
+            if char == ord('?'):
+                params += 1
+            elif char == ord(';') and match.end() - start >= size:
+                end = match.end()
+                yield start, end, line, column, shard_params
+                # Los tramos empiezan y terminan junto a un ';': se decodifican enteros
+                text = mm[start:end].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                newline = text.rfind('\n')
+                if newline < 0:
+                    column += len(text)
+                else:
+                    line += text.count('\n')
+                    column = len(text) - newline - 1
+                start, shard_params = end, params
+        if start < len(mm):
+            yield start, len(mm), line, column, shard_params
+
+
+def shard_parser(text, shard, to_end=False):
+    """Parser del tramo o, con to_end=True, del texto desde el inicio del tramo."""
+    start, end, line, column, params = shard
+    source = text[start:None if to_end else end]
+    parser = Parser(lexer.iter_tokens(source, line=line, column=column))
+    parser.param_count = params
+    return parser
+
+
+def file_shard_parser(f, shard, to_end=False):
+    """Parser del tramo del archivo binario f o, con to_end=True, de f desde el inicio del tramo."""
+    start, end, line, column, params = shard
+    f.seek(start)
+    parser = Parser(lexer.iter_tokens(f if to_end else f.read(end - start), line=line, column=column))
+    parser.param_count = params
+    return parser
+
+
+def _parse_shard(shard):
+    return shard_parser(_text, shard).parse()
+
+
+def _parse_file_shard(filename, shard):
+    with open(filename, 'rb') as f:
+        return file_shard_parser(f, shard).parse()
+
+
+def _parse_file_rest(filename, shard):
+    with open(filename, 'rb') as f:
+        yield from file_shard_parser(f, shard, to_end=True).iter_parse()
+
+
+def parallel_workers(workers):
+    """Procesos para analizar en paralelo (0: uno por CPU), o 0 si hay que hacerlo en serie."""
+    workers = workers or os.cpu_count() or 1
+    # fork con otros hilos vivos puede bloquear al hijo (ver parallel.py)
+    if workers <= 1 or _CONTEXT is None or threading.active_count() > 1:
+        return 0
+    return workers
+
+
+def parse_text(text, workers=0):
+    """
+    Genera las instrucciones del texto analizándolo por tramos en workers procesos
+    (0: uno por CPU); con un solo proceso, sin fork o con otros hilos, en serie.
+    """
+    workers = parallel_workers(workers)
+    if not workers:
+        return Parser(lexer.iter_tokens(text)).iter_parse()
+    return _parse_text_parallel(text, workers)
+
+
+def _parse_text_parallel(text, workers):
+    global _text
+    _text = text
+    try:
+        pool = _CONTEXT.Pool(workers)
+    finally:
+        _text = None
+    yield from _parse_parallel(pool, workers, shards(text), _parse_shard,
+                               lambda shard: shard_parser(text, shard, to_end=True).iter_parse())
+
+
+def _parse_parallel(pool, workers, remaining, parse_shard, parse_rest):
+    """
+    Instrucciones de los tramos de remaining analizados con parse_shard en el
+    pool; si uno falla, parse_rest(tramo) da las de ese tramo hasta el final.
+    """
+    with pool:
+        pending = deque()
+
+        def submit():
+            shard = next(remaining, None)
+            if shard is not None:
+                pending.append((shard, pool.apply_async(parse_shard, (shard,))))
+
+        for _ in range(workers * IN_FLIGHT):
+            submit()
+        while pending:
+            shard, result = pending.popleft()
+            try:
+                instructions = result.get()
+            except Exception:
+                # El parser en serie desde este tramo da las mismas instrucciones y el mismo error
+                yield from parse_rest(shard)
+                return
+            submit()
+            yield from instructions
+
+
+def parse_file(filename, workers=0, instrumentation=None):
+    """
+    Genera las instrucciones de un archivo: si es grande, en paralelo y sin
+    cargarlo (ver file_shards); si no, en serie leyéndolo bajo demanda como
+    lexer.iter_tokens_file.
+    """
+    workers = parallel_workers(workers)
+    serial = not workers or (instrumentation is not None and instrumentation.hooks)
+    if serial or os.path.getsize(filename) < PARALLEL_MIN_CHARS:
+        return Parser(lexer.iter_tokens_file(filename), instrumentation).iter_parse()
+    return _parse_file_parallel(filename, workers)
+
+
+def _parse_file_parallel(filename, workers):
+    yield from _parse_parallel(_CONTEXT.Pool(workers), workers, file_shards(filename),
+                               partial(_parse_file_shard, filename), partial(_parse_file_rest, filename))
@@ -0,0 +1,264 @@
+"""
+Reejecución incremental de un script que se va editando.
+
+Session ejecuta el texto de un script y recuerda, por instrucción, su huella (un
+digest de la instrucción ya analizada; en COPY / LOAD también el tamaño y la
+fecha del fichero que lee) y los eventos que produjo. Al ejecutar el texto
+editado:
+
+* Solo se analiza lo que cambió: el texto igual al de la vez anterior hasta la
+  primera diferencia conserva sus cortes por ';' (frontend.shards) y sus
+  instrucciones; desde ahí se vuelve a cortar y cada instrucción cuyo texto ya
+  se había visto (p. ej. desplazada por una línea nueva) se toma del análisis
+  anterior.
+* Hasta la primera instrucción cuya huella difiere se repiten los eventos
+  guardados sin ejecutar nada. Desde ahí se ejecuta: sobre el estado actual si
+  el script solo ha crecido, o sobre el del último checkpoint anterior, desde
+  el que se reaplican en silencio las pocas instrucciones que modifican tablas.
+
+Un checkpoint es el diccionario de tablas en el límite entre dos instrucciones.
+Las tablas no se copian al tomarlo sino la primera vez que una instrucción
+posterior va a modificarlas (copia al escribir por tabla, con Table.clone). Se
+toma uno cuando lo ejecutado desde el anterior supera CHECKPOINT_FACTOR veces
+lo que han costado esas copias (y al menos CHECKPOINT_SECONDS): las copias
+cuestan como mucho una fracción fija de la ejecución. Se conservan como mucho
+MAX_CHECKPOINTS, más densos cerca del final del script.
+
+Los resultados de los SELECT se guardan ya materializados para repetirlos, hasta
+RESULT_ROWS filas en total; una instrucción cuyo resultado no se guardó se
+vuelve a ejecutar. Solo sirve para executors en memoria (sin path).
+
+    session = Session(Executor())
+    watch('entrada.sql', lambda texto: mostrar(session.run(texto)))
+"""
+import hashlib
+import os
+from time import perf_counter, sleep
+
+from executor import materialize
+from frontend import shard_parser, shards
+
+# Tiempo mínimo de ejecución entre dos checkpoints
+CHECKPOINT_SECONDS = 0.05
+
+# Ejecución entre checkpoints respecto a lo que costó copiar tablas por el anterior
+CHECKPOINT_FACTOR = 8
+
+MAX_CHECKPOINTS = 32
+
+# Filas de resultados que se guardan para repetirlos sin ejecutar
+RESULT_ROWS = 1000000
+
+# Segundos entre comprobaciones del archivo en watch
+WATCH_INTERVAL = 0.5
+
+# Caracteres que se comparan de una vez al buscar el prefijo común de dos textos
+_PREFIX_BLOCK = 1 << 16
+
+
+def digest(instr):
+    return hashlib.blake2b(repr(instr).encode('utf-8'), digest_size=16).digest()
+
+
+def common_prefix(a, b):
+    """Longitud del prefijo común de dos textos."""
+    size = min(len(a), len(b))
+    start = 0
+    while start < size and a[start:start + _PREFIX_BLOCK] == b[start:start + _PREFIX_BLOCK]:
+        start += _PREFIX_BLOCK
+    stop = min(start + _PREFIX_BLOCK, size)
+    while start < stop and a[start] == b[start]:
+        start += 1
+    return min(start, size)
+
+
+def file_state(instr):
+    """(tamaño, fecha) del fichero que lee un COPY / LOAD; None en el resto."""
+    if instr[0] != 'COPY':
+        return None
+    try:
+        stat = os.stat(instr[3])
+    except OSError:
+        return 'ausente'
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Session:
+    def __init__(self, executor):
+        if executor.database is not None:
+            raise ValueError("La ejecución incremental solo funciona con tablas en memoria")
+        self.executor = executor
+        # Texto analizado la última vez y (tramo, [(digest, instrucción)]) de cada
+        # una de sus instrucciones (ver frontend.shards)
+        self.text = ''
+        self.statements = []
+        # (texto de la instrucción, '?' anteriores) -> [(digest, instrucción)] ya analizadas
+        self.parsed = {}
+        # (huella, eventos o None si no se guardaron, filas guardadas) por instrucción ejecutada
+        self.history = []
+        # Instrucciones de history aplicadas a las tablas actuales; None si el
+        # estado no corresponde a ningún límite (falló una instrucción)
+        self.position = 0
+        # (instrucciones aplicadas, tablas) en orden; el primero es el estado inicial
+        self.checkpoints = [(0, dict(executor.tables))]
+        # Tablas actuales que comparten con algún checkpoint: se copian antes de modificarlas
+        self.shared = set(executor.tables)
+        self.elapsed = 0.0
+        self.clone_seconds = 0.0
+        self.retained = 0
+        # De la última ejecución: instrucciones repetidas sin ejecutar y ejecutadas
+        self.reused = 0
+        self.executed = 0
+
+    def parse(self, text):
+        """Genera (huella, instrucción) de cada instrucción del texto."""
+        # Se conservan los tramos que terminan dentro del prefijo común y se sigue
+        # cortando desde el primero que no: su inicio, línea, columna y parámetros
+        # son los mismos en el texto nuevo
+        prefix = common_prefix(self.text, text)
+        kept = 0
+        while kept + 1 < len(self.statements) and self.statements[kept + 1][0][0] <= prefix:
+            kept += 1
+        resume = self.statements[kept][0] if self.statements else (0, None, 1, 0, 0)
+        statements = self.statements[:kept]
+        if len(self.parsed) > 2 * len(self.statements) + 64:
+            # Se olvidan las instrucciones que ya no están en el script
+            self.parsed = {(self.text[shard[0]:shard[1]], shard[4]): entries for shard, entries in self.statements}
+        try:
+            for _, entries in statements:
+                for fingerprint, instr in entries:
+                    yield (fingerprint, file_state(instr)), instr
+            start, _, line, column, params = resume
+            for shard in shards(text, 1, start, line, column, params):
+                key = (text[shard[0]:shard[1]], shard[4])
+                entries = self.parsed.get(key)
+                if entries is None:
+                    try:
+                        entries = [(digest(instr), instr) for instr in shard_parser(text, shard).parse()]
+                    except SyntaxError:
+                        # Desde aquí en serie, que da las mismas instrucciones y el mismo error
+                        for instr in shard_parser(text, shard, to_end=True).iter_parse():
+                            yield (digest(instr), file_state(instr)), instr
+                        return
+                    self.parsed[key] = entries
+                statements.append((shard, entries))
+                for fingerprint, instr in entries:
+                    yield (fingerprint, file_state(instr)), instr
+        finally:
+            # Aunque se interrumpa, lo analizado hasta aquí vale para la próxima vez
+            self.text, self.statements = text, statements
+
+    def run(self, text):
+        """
+        Ejecuta el texto completo y genera sus eventos como Executor.execute_stream,
+        repitiendo los de las instrucciones que no cambiaron desde la última vez.
+        """
+        self.reused = self.executed = 0
+        matched = []
+        statements = self.parse(text)
+        for fingerprint, instr in statements:
+            index = len(matched)
+            if index < len(self.history) and self.history[index][0] == fingerprint \
+                    and self.history[index][1] is not None:
+                matched.append(instr)
+                self.reused += 1
+                yield from self.history[index][1]
+                continue
+            self.resume(matched)
+            yield from self.execute(fingerprint, instr)
+            for fingerprint, instr in statements:
+                yield from self.execute(fingerprint, instr)
+            return
+        if len(matched) < len(self.history):
+            # El script se acortó: las tablas siguen con las instrucciones que ya no están
+            self.truncate(len(matched))
+            self.position = None
+
+    def truncate(self, count):
+        del self.history[count:]
+        self.checkpoints = [checkpoint for checkpoint in self.checkpoints if checkpoint[0] <= count]
+        self.retained = sum(entry[2] for entry in self.history)
+
+    def resume(self, matched):
+        """Deja las tablas en el estado tras las instrucciones matched."""
+        count = len(matched)
+        self.truncate(count)
+        if self.position != count:
+            start, tables = self.checkpoints[-1]
+            self.executor.tables = dict(tables)
+            self.shared = set(tables)
+            # Las lecturas no cambian el estado: solo se reaplican las escrituras
+            for instr in matched[start:]:
+                if self.executor.instruction_tables(instr)[1]:
+                    self.unshare(instr)
+                    self.executor.execute_instruction(instr)
+            self.position = count
+        self.elapsed = self.clone_seconds = 0.0
+
+    def unshare(self, instr):
+        """Copia las tablas compartidas con un checkpoint que la instrucción va a modificar."""
+        names, write = self.executor.instruction_tables(instr)
+        if not write:
+            return
+        for name in names & self.shared:
+            start = perf_counter()
+            self.executor.tables[name] = self.executor.tables[name].clone()
+            self.clone_seconds += perf_counter() - start
+            self.shared.discard(name)
+
+    def execute(self, fingerprint, instr):
+        self.unshare(instr)
+        start = perf_counter()
+        try:
+            resultado, mensaje = self.executor.execute_instruction(instr)
+            if resultado is not None:
+                resultado = materialize(resultado)
+        except BaseException:
+            self.position = None
+            raise
+        self.elapsed += perf_counter() - start
+        self.executed += 1
+
+        events = [('MENSAJE', mensaje)] if resultado is None else [('RESULTADO', resultado), ('MENSAJE', mensaje)]
+        rows = 0 if resultado is None else len(resultado[1])
+        if self.retained + rows <= RESULT_ROWS:
+            self.retained += rows
+            self.history.append((fingerprint, events, rows))
+        else:
+            self.history.append((fingerprint, None, 0))
+        self.position = len(self.history)
+        if self.elapsed >= max(CHECKPOINT_SECONDS, CHECKPOINT_FACTOR * self.clone_seconds):
+            self.checkpoint()
+        return events
+
+    def checkpoint(self):
+        self.checkpoints.append((self.position, dict(self.executor.tables)))
+        self.shared = set(self.executor.tables)
+        self.elapsed = self.clone_seconds = 0.0
+        if len(self.checkpoints) > MAX_CHECKPOINTS:
+            # Se descarta uno de cada dos de la mitad más antigua, salvo el estado inicial
+            half = len(self.checkpoints) // 2
+            older = self.checkpoints[:half]
+            self.checkpoints = older[:1] + older[2::2] + self.checkpoints[half:]
+
+
+def watch(filename, callback, interval=WATCH_INTERVAL):
+    """
+    Llama a callback(texto) con el contenido del archivo al empezar y cada vez que
+    cambia; termina con Ctrl+C.
+    """
+    last = None
+    try:
+        while True:
+            try:
+                stat = os.stat(filename)
+                state = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                state = None
+            if state is not None and state != last:
+                last = state
+                with open(filename, 'r', encoding='utf-8') as f:
+                    callback(f.read())
+            sleep(interval)
+    except KeyboardInterrupt:
+        pass
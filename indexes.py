@@ -0,0 +1,154 @@
+from bisect import bisect_left, bisect_right, insort
+
+RANGE_OPERATORS = ('<', '<=', '>', '>=')
+
+# Mayor que cualquier posición de fila; sirve para acotar búsquedas por clave
+_LAST = float('inf')
+
+# Borrados con más filas filtran las entradas del índice ordenado de una pasada
+ORDERED_REMOVE_LIMIT = 64
+
+
+class HashIndex:
+    """
+    Índice hash sobre una columna PRIMARY KEY o UNIQUE.
+    Asocia cada valor (ya convertido al tipo de la columna) con la posición de su fila.
+    """
+    kind = 'HASH'
+    unique = True
+
+    def __init__(self, name, column, col_idx):
+        self.name = name
+        self.column = column
+        self.col_idx = col_idx
+        self.entries = {}
+
+    def copy(self):
+        index = HashIndex(self.name, self.column, self.col_idx)
+        index.entries = dict(self.entries)
+        return index
+
+    def get(self, val):
+        return self.entries.get(val)
+
+    def contains(self, val, position=None):
+        """Indica si el valor ya existe en una fila distinta de `position`."""
+        found = self.entries.get(val)
+        return found is not None and found != position
+
+    def lookup(self, op, val):
+        """Posiciones de las filas con columna = val."""
+        position = self.entries.get(val)
+        return [] if position is None else [position]
+
+    def add(self, val, position):
+        self.entries[val] = position
+
+    def add_many(self, values, start):
+        self.entries.update(zip(values, range(start, start + len(values))))
+
+    def find_duplicate(self, values):
+        """Primer valor de `values` repetido en el lote o ya presente en el índice, o None."""
+        if len(set(values)) == len(values) and self.entries.keys().isdisjoint(values):
+            return None
+        seen = set()
+        for val in values:
+            if val in seen or val in self.entries:
+                return val
+            seen.add(val)
+        return None
+
+    def remove(self, val, position):
+        self.entries.pop(val, None)
+
+    def remove_many(self, pairs, live):
+        """Quita las entradas (valor, posición) de filas ya marcadas como borradas en `live`."""
+        for val, position in pairs:
+            self.entries.pop(val, None)
+
+    def rebuild(self, values, positions):
+        """Reconstruye el índice a partir de los valores de la columna y sus posiciones."""
+        self.entries = dict(zip(values, positions))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"<HashIndex {self.name} ({self.column}) claves={len(self.entries)}>"
+
+
+class OrderedIndex:
+    """
+    Índice ordenado creado con CREATE INDEX: lista de (valor, posición) ordenada
+    que responde rangos (<, <=, >, >=) e igualdades con búsqueda binaria.
+    """
+    kind = 'ORDERED'
+    unique = False
+
+    def __init__(self, name, column, col_idx):
+        self.name = name
+        self.column = column
+        self.col_idx = col_idx
+        self.entries = []
+
+    def copy(self):
+        index = OrderedIndex(self.name, self.column, self.col_idx)
+        index.entries = list(self.entries)
+        return index
+
+    def lookup(self, op, val):
+        """Posiciones (en orden de tabla) de las filas que cumplen `columna op val`."""
+        entries = self.entries
+        if op == '=':
+            lo, hi = bisect_left(entries, (val,)), bisect_right(entries, (val, _LAST))
+        elif op == '>':
+            lo, hi = bisect_right(entries, (val, _LAST)), len(entries)
+        elif op == '>=':
+            lo, hi = bisect_left(entries, (val,)), len(entries)
+        elif op == '<':
+            lo, hi = 0, bisect_left(entries, (val,))
+        elif op == '<=':
+            lo, hi = 0, bisect_right(entries, (val, _LAST))
+        else:
+            raise ValueError(f"Operador '{op}' no soportado por el índice '{self.name}'")
+        return sorted(entry[1] for entry in entries[lo:hi])
+
+    def add(self, val, position):
+        insort(self.entries, (val, position))
+
+    def add_many(self, values, start):
+        self.entries.extend(zip(values, range(start, start + len(values))))
+        self.entries.sort()
+
+    def remove(self, val, position):
+        entry = (val, position)
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def remove_many(self, pairs, live):
+        """Quita las entradas (valor, posición) de filas ya marcadas como borradas en `live`."""
+        if len(pairs) <= ORDERED_REMOVE_LIMIT:
+            for val, position in pairs:
+                self.remove(val, position)
+        else:
+            # Cada remove desplaza la lista entera: con muchas es mejor filtrarla una vez
+            self.entries = [entry for entry in self.entries if live[entry[1]]]
+
+    def rebuild(self, values, positions):
+        """Reconstruye el índice a partir de los valores de la columna y sus posiciones."""
+        self.entries = sorted(zip(values, positions))
+
+    def order(self):
+        """Posiciones de las filas en el orden del índice."""
+        return [entry[1] for entry in self.entries]
+
+    def load_order(self, values, order):
+        """Reconstruye el índice con un orden ya conocido (p. ej. de una instantánea), sin ordenar."""
+        self.entries = list(zip(map(values.__getitem__, order), order))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"<OrderedIndex {self.name} ({self.column}) entradas={len(self.entries)}>"
@@ -0,0 +1,248 @@
+"""
+Instrumentación del lexer, el parser y el executor.
+
+Una Instrumentation tiene una lista de hooks; cada fase que se mide llama a
+hook.begin(fase, info) al empezar y a hook.end(fase, info, segundos) al
+terminar, en el orden en que se añadieron los hooks (un hook puede completar
+info para los siguientes, como hace MemoryTracer con peak_mb). Las fases son:
+
+* 'lexer': todos los tokens de la entrada; info['tokens']. Solo se cuenta el
+  tiempo de producir los tokens, no el del parser que los consume.
+* 'parser': cada instrucción; info['statement'].
+* 'statement': cada instrucción ejecutada; info['statement'], info['table'],
+  info['rows'] (filas del resultado) e info['error'] si falló. Si el resultado
+  es un cursor la fase termina al agotarlo y el tiempo incluye el de producir
+  sus filas, no el de quien las consume.
+
+Sin hooks no se mide nada: el executor y el parser solo comprueban si la lista
+está vacía.
+
+    executor.instrumentation.add(JsonlExporter('metricas.jsonl'))
+"""
+import cProfile
+from collections import Counter as _Tally
+from datetime import datetime
+import json
+import pstats
+from time import perf_counter
+import tracemalloc
+
+# Posición del nombre de la tabla en cada tipo de instrucción (por defecto la 1)
+_TABLE_FIELD = {'SELECT': 2, 'CREATE_INDEX': 2, 'DROP_INDEX': None}
+
+
+def statement_table(instr):
+    """Tabla principal de una instrucción, o None."""
+    if instr[0] == 'EXPLAIN':
+        return statement_table(instr[2])
+    field = _TABLE_FIELD.get(instr[0], 1)
+    return instr[field] if field is not None and len(instr) > field else None
+
+
+class Instrumentation:
+    def __init__(self):
+        self.hooks = []
+
+    def add(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove(self, hook):
+        self.hooks.remove(hook)
+
+    def begin(self, phase, info):
+        for hook in self.hooks:
+            hook.begin(phase, info)
+
+    def end(self, phase, info, seconds):
+        for hook in self.hooks:
+            hook.end(phase, info, seconds)
+
+    def tokens(self, tokens):
+        """Envuelve los tokens del lexer para medir la fase 'lexer'."""
+        return TokenMeter(self, tokens)
+
+    def statement(self, func, instr):
+        """Ejecuta func(instr) -> (resultado, mensaje) midiendo la fase 'statement'."""
+        info = {'statement': instr[0], 'table': statement_table(instr)}
+        self.begin('statement', info)
+        start = perf_counter()
+        try:
+            resultado, mensaje = func(instr)
+        except Exception as e:
+            info['error'] = str(e)
+            self.end('statement', info, perf_counter() - start)
+            raise
+        seconds = perf_counter() - start
+        if resultado is not None and not isinstance(resultado[1], list):
+            cursor = resultado[1]
+            cursor.rows = self.metered_rows(cursor.rows, info, seconds)
+            return resultado, mensaje
+        info['rows'] = len(resultado[1]) if resultado is not None else None
+        self.end('statement', info, seconds)
+        return resultado, mensaje
+
+    def metered_rows(self, rows, info, seconds):
+        # La fase termina al agotar las filas o al abandonar el cursor
+        count = 0
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    seconds += perf_counter() - start
+                    return
+                seconds += perf_counter() - start
+                count += 1
+                yield row
+        finally:
+            info['rows'] = count
+            self.end('statement', info, seconds)
+
+
+class TokenMeter:
+    """Iterador sobre los tokens que acumula su número y el tiempo de producirlos."""
+
+    def __init__(self, instrumentation, tokens):
+        self.instrumentation = instrumentation
+        self.tokens = iter(tokens)
+        self.count = 0
+        self.seconds = 0.0
+        self.finished = False
+        instrumentation.begin('lexer', {})
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            token = next(self.tokens)
+        except StopIteration:
+            self.seconds += perf_counter() - start
+            if not self.finished:
+                self.finished = True
+                self.instrumentation.end('lexer', {'tokens': self.count}, self.seconds)
+            raise
+        self.seconds += perf_counter() - start
+        self.count += 1
+        return token
+
+
+class Hook:
+    """Hook que no hace nada; las subclases redefinen begin y/o end."""
+
+    def begin(self, phase, info):
+        pass
+
+    def end(self, phase, info, seconds):
+        pass
+
+
+class Timer(Hook):
+    """Veces y segundos acumulados por fase."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def end(self, phase, info, seconds):
+        total = self.totals.setdefault(phase, [0, 0.0])
+        total[0] += 1
+        total[1] += seconds
+
+    def report(self):
+        return {phase: {'count': count, 'seconds': round(seconds, 6)}
+                for phase, (count, seconds) in self.totals.items()}
+
+
+class Counter(Hook):
+    """Instrucciones ejecutadas, errores y filas devueltas por tipo de instrucción."""
+
+    def __init__(self):
+        self.statements = _Tally()
+        self.errors = _Tally()
+        self.rows = _Tally()
+        self.tokens = 0
+
+    def end(self, phase, info, seconds):
+        if phase == 'statement':
+            self.statements[info['statement']] += 1
+            if 'error' in info:
+                self.errors[info['statement']] += 1
+            self.rows[info['statement']] += info.get('rows') or 0
+        elif phase == 'lexer':
+            self.tokens += info['tokens']
+
+
+class Profiler(Hook):
+    """Perfil de cProfile de las fases indicadas (por defecto, la ejecución)."""
+
+    def __init__(self, phases=('statement',)):
+        self.phases = phases
+        self.profile = cProfile.Profile()
+        self.depth = 0
+
+    def begin(self, phase, info):
+        if phase in self.phases:
+            if self.depth == 0:
+                self.profile.enable()
+            self.depth += 1
+
+    def end(self, phase, info, seconds):
+        if phase in self.phases and self.depth:
+            self.depth -= 1
+            if self.depth == 0:
+                self.profile.disable()
+
+    def stats(self, sort='cumulative'):
+        return pstats.Stats(self.profile).sort_stats(sort)
+
+    def dump(self, filename):
+        self.profile.dump_stats(filename)
+
+
+class MemoryTracer(Hook):
+    """
+    Memoria máxima de cada fase medida con tracemalloc; la deja en info['peak_mb'].
+    tracemalloc ralentiza mucho la ejecución mientras está activo.
+    """
+
+    def __init__(self, phases=('statement',)):
+        self.phases = phases
+        self.started = False
+
+    def begin(self, phase, info):
+        if phase in self.phases:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started = True
+            tracemalloc.reset_peak()
+
+    def end(self, phase, info, seconds):
+        if phase in self.phases and tracemalloc.is_tracing():
+            info['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+            if self.started:
+                tracemalloc.stop()
+                self.started = False
+
+
+class JsonlExporter(Hook):
+    """Escribe una línea JSON por cada fase terminada (por defecto, por instrucción)."""
+
+    def __init__(self, target, phases=('statement',)):
+        self.phases = phases
+        self.owned = isinstance(target, str)
+        self.file = open(target, 'a', encoding='utf-8') if self.owned else target
+
+    def end(self, phase, info, seconds):
+        if phase in self.phases:
+            record = {'time': datetime.now().isoformat(timespec='milliseconds'), 'phase': phase,
+                      'seconds': round(seconds, 6), **info}
+            self.file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
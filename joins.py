@@ -0,0 +1,229 @@
+"""
+Operadores de JOIN.
+
+Cada fila de un JOIN es la concatenación de una fila de cada tabla (primero las
+columnas de la izquierda). Con LEFT JOIN, una fila de la izquierda sin pareja
+sale una vez con None en las columnas de la derecha. Un valor None nunca
+coincide con nada, tampoco en el WHERE; ORDER BY lo pone antes que cualquier
+valor y los agregados lo ignoran (ver predicates, sorting y aggregates).
+
+* hash_join: ON con '='. Se construye un dict clave -> filas con un lado y se
+  recorre el otro consultándolo; O(n + m).
+* merge_join: ON con '=' cuando las dos tablas tienen un índice ordenado sobre
+  su columna del ON: se avanza por ambos índices a la vez sin construir nada.
+* nested_loop_join: resto de operadores (<, >, !=, ...); compara cada fila de la
+  izquierda con todas las de la derecha.
+
+JoinedRelation envuelve el resultado con la interfaz de lectura de Table
+(columns, get_column_index, matching_rows, aggregate, ...) para que el executor
+aplique WHERE, GROUP BY, ORDER BY y LIMIT igual que sobre una tabla.
+"""
+from itertools import islice
+
+from aggregates import aggregate_rows
+from predicates import OPERATORS
+
+# Operador equivalente al intercambiar los lados de la comparación
+_FLIPPED = {'=': '=', '!=': '!=', '<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+
+class JoinedRelation:
+    """
+    Filas de una o varias tablas unidas. sources es una lista de (calificador,
+    tabla); las columnas se llaman 'calificador.columna' y pueden pedirse sin
+    calificar si el nombre no se repite. rows se recorre una sola vez.
+    """
+
+    def __init__(self, sources, rows=None, plan=None, nullable=False):
+        self.sources = sources
+        self.tables = [table for _, table in sources]
+        self.name = ' JOIN '.join(table.name for table in self.tables)
+        self.columns = [(f"{qualifier}.{col[0]}",) + tuple(col[1:])
+                        for qualifier, table in sources for col in table.columns]
+        self.rows = rows
+        # Algoritmo usado en cada JOIN, p. ej. 'HASH JOIN b'
+        self.plan = plan or []
+        # Con algún LEFT JOIN las filas pueden tener None (ver sorting.sort_key)
+        self.nullable = nullable
+
+    @property
+    def version(self):
+        return tuple(table.version for table in self.tables)
+
+    @property
+    def stats(self):
+        return {f"{qualifier}.{col}": stats
+                for qualifier, table in self.sources for col, stats in table.stats.items()}
+
+    def get_column_index(self, col_name):
+        if '.' in col_name:
+            for i, col in enumerate(self.columns):
+                if col[0] == col_name:
+                    return i
+        else:
+            found = [i for i, col in enumerate(self.columns) if col[0].split('.', 1)[1] == col_name]
+            if len(found) > 1:
+                raise ValueError(f"Columna '{col_name}' ambigua en '{self.name}'; use tabla.columna")
+            if found:
+                return found[0]
+        raise ValueError(f"Columna '{col_name}' no existe en '{self.name}'")
+
+    def resolve_columns(self, columns):
+        if columns == ['*']:
+            cols = [col[0] for col in self.columns]
+        else:
+            cols = columns
+        return cols, [self.get_column_index(c) for c in cols]
+
+    def matching_rows(self, condition=None):
+        rows = self.rows if condition is None else filter(condition, self.rows)
+        return enumerate(rows)
+
+    def iter_select(self, columns, condition=None, limit=None, offset=0):
+        cols, col_indices = self.resolve_columns(columns)
+        stop = None if limit is None else offset + limit
+        matches = islice(self.matching_rows(condition), offset, stop)
+        return cols, ([row[i] for i in col_indices] for _, row in matches)
+
+    def aggregate(self, condition, group_idx, specs):
+        return aggregate_rows((row for _, row in self.matching_rows(condition)), group_idx, specs)
+
+    def ordered_index(self, col_name):
+        # El resultado de un JOIN no tiene índices
+        return None
+
+
+def _type_family(col_type):
+    if col_type in ('INT', 'NUMBER'):
+        return 'INT'
+    if col_type.startswith('VARCHAR') or col_type == 'STRING':
+        return 'VARCHAR'
+    return col_type
+
+
+def join(left, left_rows, right, condition, outer=False):
+    """
+    Devuelve (algoritmo, filas) de `left JOIN right ON condition`. left es la
+    JoinedRelation con lo unido hasta ahora y left_rows sus filas; right es una
+    JoinedRelation de una sola tabla. condition es (columna, operador, columna) y
+    cada columna puede ser de cualquiera de los dos lados.
+    """
+    a, op, b = condition
+    if op not in OPERATORS:
+        raise ValueError(f"Operador desconocido '{op}' en JOIN")
+    try:
+        left_key, right_key = left.get_column_index(a), right.get_column_index(b)
+    except ValueError:
+        left_key, right_key = left.get_column_index(b), right.get_column_index(a)
+        op = _FLIPPED[op]
+
+    left_col, right_col = left.columns[left_key], right.columns[right_key]
+    if _type_family(left_col[1]) != _type_family(right_col[1]):
+        raise ValueError(f"JOIN compara columnas de tipos distintos: "
+                         f"'{left_col[0]}' ({left_col[1]}) y '{right_col[0]}' ({right_col[1]})")
+
+    right_table = right.tables[0]
+    right_name = right.sources[0][0]
+    right_width = len(right.columns)
+    right_rows = right_table.iter_rows()
+    if op != '=':
+        return (f"NESTED LOOP {right_name}",
+                nested_loop_join(left_rows, right_rows, left_key, right_key, op, outer, right_width))
+
+    # El merge join necesita las filas de una tabla base a la izquierda, no de otro JOIN
+    left_table = left.tables[0] if len(left.tables) == 1 else None
+    if left_table is not None:
+        left_index = left_table.ordered_index(left_table.columns[left_key][0])
+        right_index = right_table.ordered_index(right_table.columns[right_key][0])
+        if left_index is not None and right_index is not None:
+            return (f"MERGE JOIN {right_name}",
+                    merge_join(left_table, left_index, right_table, right_index, outer, right_width))
+
+    # Se construye el dict con la tabla más pequeña; con LEFT JOIN siempre con la derecha
+    build_left = (not outer and left_table is not None
+                  and left_table.row_count() < right_table.row_count())
+    return (f"HASH JOIN {right_name}",
+            hash_join(left_rows, right_rows, left_key, right_key, outer, right_width, build_left))
+
+
+def _build(rows, key):
+    """dict valor de la clave -> filas con ese valor (sin las claves None)."""
+    table = {}
+    for row in rows:
+        val = row[key]
+        if val is None:
+            continue
+        bucket = table.get(val)
+        if bucket is None:
+            table[val] = [row]
+        else:
+            bucket.append(row)
+    return table
+
+
+def hash_join(left_rows, right_rows, left_key, right_key, outer=False, right_width=0, build_left=False):
+    if build_left:
+        built = _build(left_rows, left_key)
+        for rrow in right_rows:
+            for lrow in built.get(rrow[right_key], ()):
+                yield lrow + rrow
+        return
+
+    built = _build(right_rows, right_key)
+    padding = [None] * right_width
+    for lrow in left_rows:
+        matches = built.get(lrow[left_key])
+        if matches is not None:
+            for rrow in matches:
+                yield lrow + rrow
+        elif outer:
+            yield lrow + padding
+
+
+def merge_join(left_table, left_index, right_table, right_index, outer=False, right_width=0):
+    """
+    Recorre los dos índices ordenados a la vez; por cada valor común combina el
+    tramo de filas de la izquierda con el de la derecha. Las filas salen en el
+    orden de la clave.
+    """
+    lentries, rentries = left_index.entries, right_index.entries
+    n, m = len(lentries), len(rentries)
+    padding = [None] * right_width
+    i = j = 0
+    while i < n:
+        val = lentries[i][0]
+        i_end = i + 1
+        while i_end < n and lentries[i_end][0] == val:
+            i_end += 1
+        while j < m and rentries[j][0] < val:
+            j += 1
+        j_end = j
+        while j_end < m and rentries[j_end][0] == val:
+            j_end += 1
+
+        if j_end > j:
+            rrows = [right_table.row_at(pos) for _, pos in rentries[j:j_end]]
+            for _, pos in lentries[i:i_end]:
+                lrow = left_table.row_at(pos)
+                for rrow in rrows:
+                    yield lrow + rrow
+        elif outer:
+            for _, pos in lentries[i:i_end]:
+                yield left_table.row_at(pos) + padding
+        i = i_end
+
+
+def nested_loop_join(left_rows, right_rows, left_key, right_key, op, outer=False, right_width=0):
+    compare = OPERATORS[op]
+    right_rows = [row for row in right_rows if row[right_key] is not None]
+    padding = [None] * right_width
+    for lrow in left_rows:
+        val = lrow[left_key]
+        matched = False
+        if val is not None:
+            for rrow in right_rows:
+                if compare(val, rrow[right_key]):
+                    matched = True
+                    yield lrow + rrow
+        if outer and not matched:
+            yield lrow + padding
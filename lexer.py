@@ -1,60 +1,170 @@
+import codecs
+import io
+import mmap
 import re
 
 KEYWORDS = {
     'CREATE', 'TABLE', 'INSERT', 'INTO', 'VALUES', 'SELECT', 'FROM', 'WHERE',
-    'UPDATE', 'SET', 'DELETE', 'PRIMARY', 'KEY', 'NOT', 'NULL', 'UNIQUE'
+    'UPDATE', 'SET', 'DELETE', 'PRIMARY', 'KEY', 'NOT', 'NULL', 'UNIQUE',
+    'INDEX', 'ON', 'DROP', 'SHOW', 'COPY', 'LOAD', 'LIMIT', 'OFFSET',
+    'ORDER', 'BY', 'ASC', 'DESC', 'GROUP', 'JOIN', 'INNER', 'LEFT', 'OUTER',
+    'AND', 'OR', 'ANALYZE', 'EXPLAIN'
 }
 
 TOKEN_TYPES = {
     'DATE': r'\d{4}-\d{2}-\d{2}',
-    'KEYWORD': r'\b(?:CREATE|TABLE|INSERT|INTO|VALUES|SELECT|FROM|WHERE|PRIMARY|KEY|NOT|NULL|UNIQUE|UPDATE|SET|DELETE)\b',
+    'KEYWORD': r'\b(?:CREATE|TABLE|INSERT|INTO|VALUES|SELECT|FROM|WHERE|PRIMARY|KEY|NOT|NULL|UNIQUE|UPDATE|SET|DELETE|INDEX|ON|DROP|SHOW|COPY|LOAD|LIMIT|OFFSET|ORDER|BY|ASC|DESC|GROUP|JOIN|INNER|LEFT|OUTER|AND|OR|ANALYZE|EXPLAIN)\b',
     'IDENTIFIER': r'[a-zA-Z_][a-zA-Z0-9_]*',
-    'STRING': r"'(?:[^'\\]|\\.)*'",
+    # Un literal no cruza saltos de línea, como en el lexer original que tokenizaba línea a línea
+    'STRING': r"'(?:[^'\\\n]|\\.)*'",
     'NUMBER': r'\d+',
     'OPERATOR': r'!=|<=|>=|=|<|>',
-    'SYMBOL': r'[(),;*]',
+    'SYMBOL': r'[(),;*.]',
+    'PARAM': r'\?',
     'WHITESPACE': r'\s+',
 }
 
-TOKEN_ORDER = ['DATE', 'KEYWORD', 'IDENTIFIER', 'STRING', 'NUMBER', 'OPERATOR', 'SYMBOL', 'WHITESPACE']
+TOKEN_ORDER = ['DATE', 'KEYWORD', 'IDENTIFIER', 'STRING', 'NUMBER', 'OPERATOR', 'SYMBOL', 'PARAM', 'WHITESPACE']
 
-token_regex = [(name, re.compile(TOKEN_TYPES[name])) for name in TOKEN_ORDER]
+# Una sola expresión con un grupo nombrado por tipo de token. Las alternativas
+# se prueban en el orden de TOKEN_ORDER, igual que el antiguo bucle por patrón,
+# y ERROR captura cualquier carácter no reconocido para que los matches sean
+# contiguos.
+master_regex = re.compile(
+    '|'.join(f'(?P<{name}>{TOKEN_TYPES[name]})' for name in TOKEN_ORDER) + r'|(?P<ERROR>.)'
+)
 
-def tokenize(line, line_num=1):
+# Tamaño de bloque (en caracteres o bytes) con el que se lee la entrada.
+CHUNK_SIZE = 1 << 16
+
+# Caracteres que hay que ver por delante del inicio de un token para saber qué
+# alternativa gana (el patrón DATE es el más largo de longitud fija).
+LOOKAHEAD = 10
+
+
+def _scan(chunks, line_num=1, column=0):
+    """
+    Genera los tokens de una secuencia de bloques de texto consecutivos; el texto
+    empieza en la línea line_num, columna column.
+    """
+    buf = ''
     pos = 0
-    tokens = []
-    while pos < len(line):
-        match_found = False
-        for token_name, pattern in token_regex:
-            match = pattern.match(line, pos)
-            if match:
+    line_start = -column
+    eof = False
+    chunks = iter(chunks)
+
+    while True:
+        if not eof:
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                # Se conserva un carácter ya consumido para que \b vea el contexto real
+                keep = pos - 1 if pos > 0 else 0
+                buf = buf[keep:] + chunk
+                line_start -= keep
+                pos -= keep
+        size = len(buf)
+        if pos >= size:
+            if eof:
+                return
+            continue
+
+        # Sin EOF, un token que toca el final del bloque podría continuar en el
+        # siguiente, y una comilla sin cerrar puede cerrarse más adelante en su línea.
+        start_limit = size if eof else size - LOOKAHEAD
+        end_limit = size + 1 if eof else size
+        for match in master_regex.finditer(buf, pos):
+            start, end = match.span()
+            if start >= start_limit or end >= end_limit:
+                break
+            kind = match.lastgroup
+
+            if kind == 'WHITESPACE':
+                # Ignorar espacios en blanco
+                if '\n' in buf[start:end]:
+                    value = match.group()
+                    line_num += value.count('\n')
+                    line_start = start + value.rindex('\n') + 1
+            elif kind == 'IDENTIFIER':
                 value = match.group()
-                if token_name == 'WHITESPACE':
-                    # Ignorar espacios en blanco
-                    pass
-                elif token_name == 'IDENTIFIER' and value.upper() in KEYWORDS:
-                    tokens.append(('KEYWORD', value.upper(), line_num, pos))
+                upper = value.upper()
+                if upper in KEYWORDS:
+                    yield ('KEYWORD', upper, line_num, start - line_start)
                 else:
-                    tokens.append((token_name, value, line_num, pos))
-                pos = match.end()
-                match_found = True
-                break
-        if not match_found:
-            print(f"Error léxico en línea {line_num}, posición {pos}: carácter no reconocido '{line[pos]}'")
-            pos += 1
-    return tokens
+                    yield ('IDENTIFIER', value, line_num, start - line_start)
+            elif kind == 'ERROR':
+                value = match.group()
+                # Solo se espera más texto hasta el salto de línea: más allá ya no
+                # puede cerrarse, y esperar al resto del archivo lo releería entero
+                if value == "'" and not eof and buf.find('\n', start) < 0:
+                    break
+                print(f"Error léxico en línea {line_num}, posición {start - line_start}: carácter no reconocido '{value}'")
+            else:
+                value = match.group()
+                yield (kind, value, line_num, start - line_start)
+            pos = end
+
+        if eof and pos >= size:
+            return
+
+
+def _iter_chunks(source, chunk_size):
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        for start in range(0, len(source), chunk_size):
+            yield decoder.decode(source[start:start + chunk_size])
+        yield decoder.decode(b'', final=True)
+        return
+
+    # Archivo abierto en modo texto o binario
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+    yield decoder.decode(b'', final=True)
+
+
+def iter_tokens(source, chunk_size=CHUNK_SIZE, line=1, column=0):
+    """
+    Genera tokens (tipo, valor, línea, posición) sin cargar toda la entrada.
+    source: str, bytes, mmap o archivo abierto; se lee en bloques de chunk_size.
+    line y column: dónde empieza source si es un fragmento de un texto mayor.
+    """
+    return _scan(_iter_chunks(source, chunk_size), line, column)
+
+
+def iter_tokens_file(filename, chunk_size=CHUNK_SIZE, use_mmap=False):
+    """Genera los tokens de un archivo; con use_mmap=True se lee mediante mmap."""
+    if not use_mmap:
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from iter_tokens(f, chunk_size)
+        return
+
+    with open(filename, 'rb') as f:
+        f.seek(0, io.SEEK_END)
+        if f.tell() == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter_tokens(mm, chunk_size)
+
+
+def tokenize(line, line_num=1):
+    return list(_scan([line], line_num))
+
 
 def tokenize_file(filename):
-    tokens = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, start=1):
-            tokens.extend(tokenize(line, line_num))
-    return tokens
+    return list(iter_tokens_file(filename))
+
 
 if __name__ == '__main__':
     ejemplo = "SELECT nombre, edad FROM empleados WHERE fecha_nac = '1990-05-20';"
     tokens = tokenize(ejemplo, 1)
     for t in tokens:
         print(t)
-
-
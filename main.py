@@ -1,29 +1,104 @@
-from lexer import tokenize_file
-from parser import Parser
 from executor import Executor
+from frontend import parse_file
+from incremental import Session, watch
+from instrumentation import JsonlExporter
+from sinks import open_sink
 
+# Formato de la salida ('html', 'csv' o 'jsonl') y su fichero; CSV y JSONL
+# escriben un fichero por resultado (salida.csv, salida_2.csv, ...).
+FORMATO_SALIDA = 'html'
+ARCHIVO_SALIDA = 'salida.html'
 
-def main():
-    tokens = tokenize_file("entrada.sql")  # Obtiene tokens y errores
-    parser = Parser(tokens)
+# Filas por página del HTML (salida.html, salida_2.html, ...); con None todos
+# los resultados van en un solo fichero.
+FILAS_POR_PAGINA = None
 
-    try:
-        instrucciones = parser.parse()
-        executor = Executor()
-        resultados = executor.execute(instrucciones)
+# Mensajes que se conservan para el HTML; el resto del pipeline no acumula nada,
+# así que un script con millones de INSERT se ejecuta con memoria acotada.
+MAX_MENSAJES_HTML = 1000
+
+# Directorio de la base de datos (p. ej. "datos") para conservar las tablas entre
+# ejecuciones; con None las tablas viven solo en memoria.
+DIRECTORIO_BD = None
+
+# Procesos que analizan los scripts grandes en paralelo (0: uno por CPU, 1: en
+# serie); los scripts pequeños se analizan siempre en serie (ver frontend.py).
+PROCESOS_PARSER = 0
+
+# Fichero donde se añade una línea JSON con el tiempo y las filas de cada
+# instrucción (p. ej. "metricas.jsonl"); con None no se mide nada.
+METRICAS_JSONL = None
+
+# Con True main vigila entrada.sql y, cada vez que se guarda, vuelve a generar la
+# salida ejecutando solo desde la primera instrucción que cambió (ver
+# incremental.py; solo con DIRECTORIO_BD = None). Se termina con Ctrl+C.
+VIGILAR_ENTRADA = False
+
+
+def imprimir(rows):
+    """Imprime cada fila a medida que el destino de salida la consume."""
+    for r in rows:
+        print([str(v) for v in r])
+        yield r
+
+
+def generar_salida(fuente):
+    """Escribe la salida con los eventos de la ejecución; devuelve False si hubo errores."""
+    opciones = {'page_rows': FILAS_POR_PAGINA, 'max_messages': MAX_MENSAJES_HTML} if FORMATO_SALIDA == 'html' else {}
+    sink = open_sink(FORMATO_SALIDA, ARCHIVO_SALIDA, **opciones)
+    ejecutadas = 0
 
-        for cols, rows in resultados:
-            print("Columnas:", cols)
-            for r in rows:
-                print(r)
+    # Los resultados van directamente del cursor al fichero de salida, sin guardarse
+    def eventos():
+        nonlocal ejecutadas
+        for tipo, valor in fuente:
+            if tipo == 'RESULTADO':
+                cols, rows = valor
+                print("Columnas:", cols)
+                valor = (cols, imprimir(rows))
+            else:
+                ejecutadas += 1
+            yield tipo, valor
+
+    try:
+        archivos = sink.write(eventos())
 
     except SyntaxError as e:
         print(f" Error sintáctico detectado: {e}")
-        print(" No se ejecutará el código ni se generará HTML.")
+        print(f" Se detuvo la ejecución tras {ejecutadas} instrucciones; no se generará la salida.")
+        return False
 
     except ValueError as e:
-        print(f" Error de ejecución detectado: {e}")
-        print(" No se generará el archivo HTML debido a errores en la ejecución.")
+        print(f" Error de ejecución detectado en la instrucción {ejecutadas + 1}: {e}")
+        print(" No se generará la salida debido a errores en la ejecución.")
+        return False
+
+    print(f"Salida generada correctamente en {', '.join(archivos)}.")
+    return True
+
+
+def main():
+    executor = Executor(path=DIRECTORIO_BD)
+    metricas = None
+    if METRICAS_JSONL is not None:
+        metricas = executor.instrumentation.add(JsonlExporter(METRICAS_JSONL, phases=('lexer', 'parser', 'statement')))
+    try:
+        if VIGILAR_ENTRADA:
+            session = Session(executor)
+
+            def reejecutar(texto):
+                generar_salida(session.run(texto))
+                print(f" {session.reused} instrucciones sin cambios, {session.executed} ejecutadas. "
+                      f"Esperando cambios en entrada.sql (Ctrl+C para salir)...")
+
+            watch("entrada.sql", reejecutar)
+        else:
+            # Las instrucciones se generan bajo demanda, en el orden del script
+            generar_salida(executor.execute_stream(parse_file("entrada.sql", PROCESOS_PARSER, executor.instrumentation)))
+    finally:
+        executor.close()
+        if metricas is not None:
+            metricas.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+Recorridos de tablas en paralelo con un pool de procesos.
+
+Una tabla de al menos PARALLEL_MIN_ROWS filas se parte en tramos contiguos de
+posiciones y cada tramo lo evalúa un proceso hijo. Los hijos se crean con fork
+al empezar el recorrido y heredan la tabla y la condición ya compilada: no se
+serializa ninguna fila. Las columnas de una ColumnarTable son buffers de
+array.array que los hijos leen directamente de la memoria del padre, compartida
+copy-on-write. Cada hijo devuelve solo las posiciones que cumplen la condición
+(los bytes de un array) o los acumuladores sin terminar de la agregación.
+
+El padre recoge los resultados en el orden de los tramos, así que las filas
+(y el orden de los grupos de GROUP BY) son los mismos que en serie. Donde no
+existe fork (Windows) o con WORKERS = 1 todo se ejecuta en serie.
+
+Tampoco se hace fork si el proceso tiene más de un hilo vivo: el hijo copiaría
+los cerrojos que tuvieran tomados los otros hilos (del allocator, de logging, de
+la E/S, ...) y podría quedarse bloqueado. Por eso bajo server.py, que ejecuta
+las instrucciones en pools de hilos, los recorridos van siempre en serie:
+WORKERS > 1 no sirve con el servidor.
+"""
+from array import array
+import multiprocessing
+import os
+import threading
+
+from aggregates import AGGREGATE_BLOCK, merge_states
+
+# Procesos para los recorridos en paralelo; 1 desactiva el modo paralelo
+WORKERS = 1
+
+# Tablas más pequeñas se recorren siempre en serie
+PARALLEL_MIN_ROWS = 200000
+
+# Tramos por proceso: más de uno reparte mejor la carga si los tramos tardan distinto
+CHUNKS_PER_WORKER = 4
+
+_CONTEXT = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+
+# Tarea del recorrido en curso; los hijos la heredan al crearse el pool
+_task = None
+
+
+def configure(workers=None, min_rows=None):
+    """Fija el número de procesos (None o 0: uno por CPU) y el umbral de filas."""
+    global WORKERS, PARALLEL_MIN_ROWS
+    WORKERS = workers or os.cpu_count() or 1
+    if min_rows is not None:
+        PARALLEL_MIN_ROWS = min_rows
+
+
+def workers_for(table, condition):
+    """Procesos con los que se recorrería la tabla con esa condición (0: en serie)."""
+    if WORKERS <= 1 or _CONTEXT is None or getattr(condition, 'row_ids', None) is not None:
+        return 0
+    # fork con otros hilos vivos puede bloquear al hijo (ver arriba)
+    if threading.active_count() > 1:
+        return 0
+    if table.slot_count() < PARALLEL_MIN_ROWS:
+        return 0
+    return WORKERS
+
+
+def _chunks(size, workers, align=1):
+    chunk = -(-size // (workers * CHUNKS_PER_WORKER))
+    chunk = -(-chunk // align) * align
+    return [(start, min(start + chunk, size)) for start in range(0, size, chunk)]
+
+
+def _run(func, task, chunks, workers):
+    """Genera func(tramo) para cada tramo, en orden, calculados en procesos hijos."""
+    global _task
+    _task = task
+    try:
+        pool = _CONTEXT.Pool(min(workers, len(chunks)))
+    finally:
+        _task = None
+    try:
+        yield from pool.imap(func, chunks)
+    finally:
+        pool.terminate()
+
+
+def scan(table, condition):
+    """
+    Posiciones de las filas que cumplen la condición, en orden de tabla y
+    calculadas en paralelo; None si el recorrido debe hacerse en serie.
+    """
+    workers = workers_for(table, condition)
+    if not workers or condition is None:
+        return None
+    chunks = _chunks(table.slot_count(), workers)
+    return _positions(_run(_scan_chunk, (table, condition), chunks, workers))
+
+
+def _positions(results):
+    for result in results:
+        yield from array('q', result)
+
+
+def _scan_chunk(bounds):
+    table, condition = _task
+    return array('q', table.scan_range(condition, *bounds)).tobytes()
+
+
+def aggregate(table, condition, group_idx, specs):
+    """
+    Acumuladores sin terminar de la agregación, sumando los de cada tramo en
+    orden; None si debe hacerse en serie. Los tramos son múltiplos de
+    AGGREGATE_BLOCK para que los bloques coincidan con los del recorrido en serie.
+    """
+    workers = workers_for(table, condition)
+    if not workers:
+        return None
+    chunks = _chunks(table.slot_count(), workers, AGGREGATE_BLOCK)
+    groups = {}
+    for partial in _run(_aggregate_chunk, (table, condition, group_idx, specs), chunks, workers):
+        merge_states(groups, partial, specs)
+    return groups
+
+
+def _aggregate_chunk(bounds):
+    table, condition, group_idx, specs = _task
+    return table.aggregate_range(condition, group_idx, specs, *bounds)
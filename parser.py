@@ -1,21 +1,78 @@
+from time import perf_counter
+
+# Tokens aceptados como valor en VALUES, SET y WHERE
+VALUE_TOKENS = ('NUMBER', 'STRING', 'DATE', 'PARAM')
+
+# Funciones de agregado; en la lista del SELECT se representan como (función, columna o '*')
+AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'MIN', 'MAX', 'AVG')
+
+
+class Param:
+    """Marcador '?' de una sentencia preparada; index es su posición en el texto (desde 0)."""
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, Param) and other.index == self.index
+
+    def __hash__(self):
+        return hash((Param, self.index))
+
+    def __repr__(self):
+        return f"Param({self.index})"
+
+
+def bind_params(obj, values):
+    """Copia una instrucción sustituyendo cada Param por values[index]."""
+    if isinstance(obj, Param):
+        return values[obj.index]
+    if isinstance(obj, tuple):
+        return tuple(bind_params(item, values) for item in obj)
+    if isinstance(obj, list):
+        return [bind_params(item, values) for item in obj]
+    if isinstance(obj, dict):
+        return {key: bind_params(val, values) for key, val in obj.items()}
+    return obj
+
+
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    def __init__(self, tokens, instrumentation=None):
+        # tokens puede ser una lista o cualquier iterador (p. ej. lexer.iter_tokens);
+        # solo se mantiene en memoria el token actual. Con una Instrumentation con
+        # hooks (ver instrumentation.py) se miden el lexer y cada instrucción.
+        self.instrumentation = instrumentation if instrumentation is not None and instrumentation.hooks else None
+        if self.instrumentation is not None:
+            tokens = self.instrumentation.tokens(tokens)
+        self.tokens = iter(tokens)
         self.pos = 0
+        self._current = next(self.tokens, None)
+        self.param_count = 0
 
     def current_token(self):
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return None
+        return self._current
+
+    def advance(self):
+        self.pos += 1
+        self._current = next(self.tokens, None)
 
     def match(self, expected_type, expected_value=None):
         token = self.current_token()
         if token and token[0] == expected_type:
             if expected_value is None or token[1].upper() == expected_value.upper():
-                self.pos += 1
+                self.advance()
                 return token
         return None
 
+    def value(self, token):
+        """Valor de un token literal; cada '?' se convierte en un Param numerado."""
+        self.advance()
+        if token[0] == 'PARAM':
+            self.param_count += 1
+            return Param(self.param_count - 1)
+        return token[1]
+
     def expect(self, expected_type, expected_value=None):
         token = self.match(expected_type, expected_value)
         if not token:
@@ -27,19 +84,32 @@ class Parser:
         return token
 
     def parse(self):
-        instrucciones = []
-        while self.pos < len(self.tokens):
-            instr = self.parse_instruction()
+        return list(self.iter_parse())
+
+    def iter_parse(self):
+        """Genera las instrucciones una a una, consumiendo los tokens a medida que se necesitan."""
+        while self.current_token() is not None:
+            instr = self.parse_instruction() if self.instrumentation is None else self.measured_instruction()
             if instr:
-                instrucciones.append(instr)
+                yield instr
             else:
                 token = self.current_token()
-                if token:
-                    line, col = token[2], token[3]
-                    raise SyntaxError(f"Error sintáctico en línea {line} posición {col}: token inesperado {token}")
-                else:
-                    break
-        return instrucciones
+                line, col = token[2], token[3]
+                raise SyntaxError(f"Error sintáctico en línea {line} posición {col}: token inesperado {token}")
+
+    def measured_instruction(self):
+        """parse_instruction midiendo la fase 'parser' sin el tiempo del lexer."""
+        info = {}
+        self.instrumentation.begin('parser', info)
+        lexed = self.tokens.seconds
+        start = perf_counter()
+        instr = None
+        try:
+            instr = self.parse_instruction()
+            return instr
+        finally:
+            info['statement'] = instr[0] if instr else None
+            self.instrumentation.end('parser', info, perf_counter() - start - (self.tokens.seconds - lexed))
 
     def parse_instruction(self):
         token = self.current_token()
@@ -58,10 +128,24 @@ class Parser:
                 return self.parse_update()
             elif kw == 'DELETE':
                 return self.parse_delete()
+            elif kw == 'COPY':
+                return self.parse_copy()
+            elif kw == 'LOAD':
+                return self.parse_load()
+            elif kw == 'DROP':
+                return self.parse_drop_index()
+            elif kw == 'SHOW':
+                return self.parse_show_index()
+            elif kw == 'ANALYZE':
+                return self.parse_analyze()
+            elif kw == 'EXPLAIN':
+                return self.parse_explain()
         return None
 
     def parse_create(self):
         self.expect('KEYWORD', 'CREATE')
+        if self.match('KEYWORD', 'INDEX'):
+            return self.parse_create_index()
         self.expect('KEYWORD', 'TABLE')
         table_name = self.expect('IDENTIFIER')[1]
 
@@ -74,7 +158,7 @@ class Parser:
 
             token = self.current_token()
             if token and token[0] == 'SYMBOL' and token[1] == '(':
-                self.pos += 1
+                self.advance()
                 param = self.expect('NUMBER')[1]
                 self.expect('SYMBOL', ')')
                 col_type += f"({param})"
@@ -84,7 +168,7 @@ class Parser:
                 token = self.current_token()
                 if token and token[0] == 'KEYWORD' and token[1].upper() in ('PRIMARY', 'KEY', 'NOT', 'NULL', 'UNIQUE'):
                     constraints.append(token[1].upper())
-                    self.pos += 1
+                    self.advance()
                 else:
                     break
 
@@ -93,7 +177,7 @@ class Parser:
             token = self.current_token()
             if token and token[0] == 'SYMBOL':
                 if token[1] == ',':
-                    self.pos += 1
+                    self.advance()
                     continue
                 elif token[1] == ')':
                     break
@@ -103,48 +187,68 @@ class Parser:
                 raise SyntaxError("Se esperaba ',' o ')' después de la columna")
 
         self.expect('SYMBOL', ')')
+
+        # Motor de almacenamiento opcional: STORAGE ROW | STORAGE COLUMNAR
+        storage = None
+        if self.match('IDENTIFIER', 'STORAGE'):
+            storage = self.expect('IDENTIFIER')[1].upper()
+
         self.expect('SYMBOL', ';')
 
-        return ('CREATE_TABLE', table_name, columns)
+        return ('CREATE_TABLE', table_name, columns, storage)
 
     def parse_insert(self):
         self.expect('KEYWORD', 'INSERT')
         self.expect('KEYWORD', 'INTO')
         table_name = self.expect('IDENTIFIER')[1]
 
+        columns = self.parse_column_list("INSERT")
+
+        self.expect('KEYWORD', 'VALUES')
+        filas = [self.parse_value_tuple()]
+        while self.match('SYMBOL', ','):
+            filas.append(self.parse_value_tuple())
+        self.expect('SYMBOL', ';')
+
+        if len(filas) == 1:
+            return ('INSERT', table_name, columns, filas[0])
+        return ('INSERT_MANY', table_name, columns, filas)
+
+    def parse_column_list(self, statement):
+        """Lista opcional de columnas entre paréntesis; None si no hay."""
         token = self.current_token()
         columns = None
         if token and token[0] == 'SYMBOL' and token[1] == '(':
-            self.pos += 1
+            self.advance()
             columns = []
             while True:
                 col = self.expect('IDENTIFIER')[1]
                 columns.append(col)
                 token = self.current_token()
                 if token and token[0] == 'SYMBOL' and token[1] == ',':
-                    self.pos += 1
+                    self.advance()
                     continue
                 elif token and token[0] == 'SYMBOL' and token[1] == ')':
-                    self.pos += 1
+                    self.advance()
                     break
                 else:
-                    raise SyntaxError("Se esperaba ',' o ')' en lista de columnas del INSERT")
+                    raise SyntaxError(f"Se esperaba ',' o ')' en lista de columnas del {statement}")
+        return columns
 
-        self.expect('KEYWORD', 'VALUES')
+    def parse_value_tuple(self):
         self.expect('SYMBOL', '(')
 
         values = []
         while True:
             token = self.current_token()
-            if token and token[0] in ('NUMBER', 'STRING', 'DATE'):
-                values.append(token[1])
-                self.pos += 1
+            if token and token[0] in VALUE_TOKENS:
+                values.append(self.value(token))
             else:
                 raise SyntaxError(f"Valor inválido en INSERT en línea {token[2]} posición {token[3]}")
 
             token = self.current_token()
             if token and token[0] == 'SYMBOL' and token[1] == ',':
-                self.pos += 1
+                self.advance()
                 continue
             elif token and token[0] == 'SYMBOL' and token[1] == ')':
                 break
@@ -152,9 +256,7 @@ class Parser:
                 raise SyntaxError("Se esperaba ',' o ')' en lista de valores del INSERT")
 
         self.expect('SYMBOL', ')')
-        self.expect('SYMBOL', ';')
-
-        return ('INSERT', table_name, columns, values)
+        return values
 
     def parse_select(self):
         self.expect('KEYWORD', 'SELECT')
@@ -163,38 +265,155 @@ class Parser:
         token = self.current_token()
         if token and token[0] == 'SYMBOL' and token[1] == '*':
             columns = ['*']
-            self.pos += 1
+            self.advance()
         else:
             while True:
-                col = self.expect('IDENTIFIER')[1]
-                columns.append(col)
+                columns.append(self.parse_select_item())
                 token = self.current_token()
                 if token and token[0] == 'SYMBOL' and token[1] == ',':
-                    self.pos += 1
+                    self.advance()
                     continue
                 else:
                     break
 
         self.expect('KEYWORD', 'FROM')
         table_name = self.expect('IDENTIFIER')[1]
+        clausulas = {'alias': self.parse_alias(), 'joins': self.parse_joins(),
+                     'group_by': None, 'order_by': None, 'limit': None, 'offset': None}
 
         condition = None
         token = self.current_token()
         if token and token[0] == 'KEYWORD' and token[1].upper() == 'WHERE':
-            self.pos += 1
+            self.advance()
             condition = self.parse_condition()
 
+        if self.match('KEYWORD', 'GROUP'):
+            self.expect('KEYWORD', 'BY')
+            clausulas['group_by'] = [self.parse_column_ref()]
+            while self.match('SYMBOL', ','):
+                clausulas['group_by'].append(self.parse_column_ref())
+        if self.match('KEYWORD', 'ORDER'):
+            self.expect('KEYWORD', 'BY')
+            clausulas['order_by'] = self.parse_order_by()
+        if self.match('KEYWORD', 'LIMIT'):
+            clausulas['limit'] = self.parse_count('LIMIT')
+        if self.match('KEYWORD', 'OFFSET'):
+            clausulas['offset'] = self.parse_count('OFFSET')
+
         self.expect('SYMBOL', ';')
 
-        return ('SELECT', columns, table_name, condition)
+        return ('SELECT', columns, table_name, condition, clausulas)
+
+    def parse_alias(self):
+        # Alias opcional tras el nombre de una tabla: FROM empleados e
+        token = self.match('IDENTIFIER')
+        return token[1] if token else None
+
+    def parse_joins(self):
+        # {[INNER] JOIN | LEFT [OUTER] JOIN} tabla [alias] ON columna op columna
+        joins = []
+        while True:
+            if self.match('KEYWORD', 'LEFT'):
+                self.match('KEYWORD', 'OUTER')
+                self.expect('KEYWORD', 'JOIN')
+                kind = 'LEFT'
+            elif self.match('KEYWORD', 'INNER'):
+                self.expect('KEYWORD', 'JOIN')
+                kind = 'INNER'
+            elif self.match('KEYWORD', 'JOIN'):
+                kind = 'INNER'
+            else:
+                return joins or None
+            table_name = self.expect('IDENTIFIER')[1]
+            alias = self.parse_alias()
+            self.expect('KEYWORD', 'ON')
+            left = self.parse_column_ref()
+            op = self.expect('OPERATOR')[1]
+            right = self.parse_column_ref()
+            joins.append((kind, table_name, alias, (left, op, right)))
+
+    def parse_column_ref(self):
+        # columna o tabla.columna
+        name = self.expect('IDENTIFIER')[1]
+        if self.match('SYMBOL', '.'):
+            name += '.' + self.expect('IDENTIFIER')[1]
+        return name
+
+    def parse_select_item(self):
+        # columna, tabla.columna o función de agregado: COUNT(*), SUM(col), MIN(col), ...
+        token = self.expect('IDENTIFIER')
+        if self.match('SYMBOL', '.'):
+            return token[1] + '.' + self.expect('IDENTIFIER')[1]
+        if not self.match('SYMBOL', '('):
+            return token[1]
+        func = token[1].upper()
+        if func not in AGGREGATE_FUNCTIONS:
+            raise SyntaxError(f"Función desconocida '{token[1]}' en línea {token[2]} posición {token[3]}")
+        if func == 'COUNT' and self.match('SYMBOL', '*'):
+            arg = '*'
+        else:
+            arg = self.parse_column_ref()
+        self.expect('SYMBOL', ')')
+        return (func, arg)
+
+    def parse_order_by(self):
+        # expr [ASC|DESC] {, expr [ASC|DESC]}; expr es una columna o un agregado
+        order_by = []
+        while True:
+            col = self.parse_select_item()
+            direction = 'ASC'
+            if self.match('KEYWORD', 'DESC'):
+                direction = 'DESC'
+            else:
+                self.match('KEYWORD', 'ASC')
+            order_by.append((col, direction))
+            if not self.match('SYMBOL', ','):
+                return order_by
+
+    def parse_count(self, clause):
+        # Número de filas de LIMIT / OFFSET (o '?' en una sentencia preparada)
+        token = self.current_token()
+        if token and token[0] in ('NUMBER', 'PARAM'):
+            return self.value(token)
+        line = token[2] if token else "EOF"
+        pos = token[3] if token else ""
+        raise SyntaxError(f"Se esperaba un número después de {clause} en línea {line} posición {pos}")
 
     def parse_condition(self):
-        left = self.expect('IDENTIFIER')[1]
+        # condición := término {OR término}; término := factor {AND factor}
+        # factor := NOT factor | '(' condición ')' | columna op valor
+        return self.parse_connective('OR', self.parse_conjunction)
+
+    def parse_conjunction(self):
+        return self.parse_connective('AND', self.parse_factor)
+
+    def parse_connective(self, keyword, parse_operand):
+        # ('AND' | 'OR', [operandos]); los anidados del mismo tipo se aplanan
+        parts = []
+        while True:
+            part = parse_operand()
+            if len(part) == 2 and part[0] == keyword:
+                parts.extend(part[1])
+            else:
+                parts.append(part)
+            if not self.match('KEYWORD', keyword):
+                return parts[0] if len(parts) == 1 else (keyword, parts)
+
+    def parse_factor(self):
+        if self.match('KEYWORD', 'NOT'):
+            return ('NOT', self.parse_factor())
+        if self.match('SYMBOL', '('):
+            condition = self.parse_condition()
+            self.expect('SYMBOL', ')')
+            return condition
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_column_ref()
         op = self.expect('OPERATOR')[1]
         token = self.current_token()
-        if token and token[0] in ('NUMBER', 'STRING', 'DATE'):
-            right = token[1]
-            self.pos += 1
+        if token and token[0] in VALUE_TOKENS:
+            right = self.value(token)
         else:
             raise SyntaxError(f"Valor inválido en condición en línea {token[2]} posición {token[3]}")
         return (left, op, right)
@@ -209,16 +428,15 @@ class Parser:
             col_name = self.expect('IDENTIFIER')[1]
             self.expect('OPERATOR', '=')
             token = self.current_token()
-            if token and token[0] in ('NUMBER', 'STRING', 'DATE'):
-                val = token[1]
-                self.pos += 1
+            if token and token[0] in VALUE_TOKENS:
+                val = self.value(token)
             else:
                 raise SyntaxError(f"Valor inválido en UPDATE en línea {token[2]} posición {token[3]}")
             assignments[col_name] = val
 
             token = self.current_token()
             if token and token[0] == 'SYMBOL' and token[1] == ',':
-                self.pos += 1
+                self.advance()
                 continue
             else:
                 break
@@ -226,7 +444,7 @@ class Parser:
         condition = None
         token = self.current_token()
         if token and token[0] == 'KEYWORD' and token[1].upper() == 'WHERE':
-            self.pos += 1
+            self.advance()
             condition = self.parse_condition()
 
         self.expect('SYMBOL', ';')
@@ -241,9 +459,89 @@ class Parser:
         condition = None
         token = self.current_token()
         if token and token[0] == 'KEYWORD' and token[1].upper() == 'WHERE':
-            self.pos += 1
+            self.advance()
             condition = self.parse_condition()
 
         self.expect('SYMBOL', ';')
 
         return ('DELETE', table_name, condition)
+
+    def parse_create_index(self):
+        # CREATE INDEX nombre ON tabla (columna);
+        index_name = self.expect('IDENTIFIER')[1]
+        self.expect('KEYWORD', 'ON')
+        table_name = self.expect('IDENTIFIER')[1]
+        self.expect('SYMBOL', '(')
+        column = self.expect('IDENTIFIER')[1]
+        self.expect('SYMBOL', ')')
+        self.expect('SYMBOL', ';')
+
+        return ('CREATE_INDEX', index_name, table_name, column)
+
+    def parse_drop_index(self):
+        self.expect('KEYWORD', 'DROP')
+        self.expect('KEYWORD', 'INDEX')
+        index_name = self.expect('IDENTIFIER')[1]
+        self.expect('SYMBOL', ';')
+
+        return ('DROP_INDEX', index_name)
+
+    def parse_show_index(self):
+        self.expect('KEYWORD', 'SHOW')
+        self.expect('KEYWORD', 'INDEX')
+        self.expect('KEYWORD', 'FROM')
+        table_name = self.expect('IDENTIFIER')[1]
+        self.expect('SYMBOL', ';')
+
+        return ('SHOW_INDEX', table_name)
+
+    def parse_analyze(self):
+        # ANALYZE [tabla]; sin tabla se analizan todas
+        self.expect('KEYWORD', 'ANALYZE')
+        token = self.match('IDENTIFIER')
+        self.expect('SYMBOL', ';')
+
+        return ('ANALYZE', token[1] if token else None)
+
+    def parse_explain(self):
+        # EXPLAIN [ANALYZE] instrucción; ANALYZE tras EXPLAIN es siempre el modificador
+        self.expect('KEYWORD', 'EXPLAIN')
+        analyze = self.match('KEYWORD', 'ANALYZE') is not None
+        token = self.current_token()
+        instr = self.parse_instruction()
+        if not instr or instr[0] == 'EXPLAIN':
+            line = token[2] if token else "EOF"
+            pos = token[3] if token else ""
+            raise SyntaxError(f"Error sintáctico: se esperaba una instrucción tras EXPLAIN en línea {line} posición {pos}")
+
+        return ('EXPLAIN', analyze, instr)
+
+    def parse_copy(self):
+        # COPY tabla [(columnas)] FROM 'archivo.csv' [WITH HEADER];
+        self.expect('KEYWORD', 'COPY')
+        table_name = self.expect('IDENTIFIER')[1]
+        columns = self.parse_column_list("COPY")
+        self.expect('KEYWORD', 'FROM')
+        filename = self.expect('STRING')[1][1:-1]
+        header = self.parse_header_option()
+        self.expect('SYMBOL', ';')
+
+        return ('COPY', table_name, columns, filename, header)
+
+    def parse_load(self):
+        # LOAD 'archivo.csv' INTO tabla [(columnas)] [WITH HEADER];
+        self.expect('KEYWORD', 'LOAD')
+        filename = self.expect('STRING')[1][1:-1]
+        self.expect('KEYWORD', 'INTO')
+        table_name = self.expect('IDENTIFIER')[1]
+        columns = self.parse_column_list("LOAD")
+        header = self.parse_header_option()
+        self.expect('SYMBOL', ';')
+
+        return ('COPY', table_name, columns, filename, header)
+
+    def parse_header_option(self):
+        if self.match('IDENTIFIER', 'WITH'):
+            self.expect('IDENTIFIER', 'HEADER')
+            return True
+        return False
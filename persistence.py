@@ -0,0 +1,243 @@
+"""
+Almacenamiento persistente en disco con registro de escritura anticipada (WAL).
+
+Un directorio de base de datos contiene:
+
+* catalog.json: esquemas, motor e índices de cada tabla, y la generación vigente.
+* <tabla>.<gen>.dat: datos de la tabla en el último checkpoint, en segmentos de
+  hasta SEGMENT_ROWS filas (cabecera con CRC32 + columnas serializadas). Se leen
+  mediante mmap y se cargan columna a columna, sin validar de nuevo.
+* wal.<gen>.log: registros añadidos tras ese checkpoint (INSERT, UPDATE, DELETE
+  y cambios de esquema), cada uno con su longitud y CRC32.
+
+Escribir solo cuesta añadir un registro al WAL. Al abrir se carga el checkpoint y
+se reaplica el WAL hasta el último registro íntegro, sin volver a ejecutar SQL.
+Un checkpoint escribe una generación nueva y la activa reemplazando catalog.json
+de forma atómica, así que una caída a mitad nunca mezcla datos de dos generaciones.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+SEGMENT_MAGIC = b'SEG1'
+SEGMENT_HEADER = struct.Struct('<4sIII')  # magia, filas, bytes, crc32
+SEGMENT_ROWS = 8192
+
+WAL_HEADER = struct.Struct('<II')  # bytes, crc32
+
+# Tamaño del WAL a partir del cual commit() hace un checkpoint automático
+CHECKPOINT_WAL_BYTES = 64 << 20
+
+CATALOG = 'catalog.json'
+
+
+def write_segments(path, columns, count):
+    """
+    Escribe las columnas (listas de valores) en segmentos de SEGMENT_ROWS filas;
+    la escritura es atómica (archivo temporal + rename).
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        for start in range(0, count, SEGMENT_ROWS):
+            segment = [values[start:start + SEGMENT_ROWS] for values in columns]
+            payload = pickle.dumps(segment, protocol=pickle.HIGHEST_PROTOCOL)
+            rows = min(SEGMENT_ROWS, count - start)
+            f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, rows, len(payload), zlib.crc32(payload)))
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_segments(path):
+    """Genera las columnas de cada segmento, leyendo el archivo mediante mmap."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            offset = 0
+            while offset < len(mm):
+                magic, count, size, crc = SEGMENT_HEADER.unpack_from(mm, offset)
+                offset += SEGMENT_HEADER.size
+                payload = view[offset:offset + size]
+                if magic != SEGMENT_MAGIC or len(payload) != size or zlib.crc32(payload) != crc:
+                    raise ValueError(f"Archivo de datos dañado: '{path}'")
+                columns = pickle.loads(payload)
+                payload.release()
+                offset += size
+                yield columns
+        finally:
+            view.release()
+
+
+def read_wal(path):
+    """
+    Devuelve (registros, fin) con los registros íntegros del WAL y la posición donde
+    termina el último; lo que sigue es una escritura a medias y se descarta.
+    """
+    records = []
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return records, 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        offset = 0
+        while offset + WAL_HEADER.size <= len(mm):
+            size, crc = WAL_HEADER.unpack_from(mm, offset)
+            start = offset + WAL_HEADER.size
+            payload = mm[start:start + size]
+            if len(payload) != size or zlib.crc32(payload) != crc:
+                break
+            records.append(pickle.loads(payload))
+            offset = start + size
+    return records, offset
+
+
+class WriteAheadLog:
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.sync = sync
+        self.file = open(path, 'ab')
+
+    def append(self, *record):
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        self.file.write(WAL_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+    def commit(self):
+        """Entrega los registros al sistema operativo (y al disco si sync=True)."""
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        self.commit()
+        self.file.close()
+
+
+class Database:
+    """Directorio de base de datos asociado a un Executor."""
+
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.sync = sync
+        self.generation = 0
+        self.wal = None
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _data_file(self, table_name, generation):
+        return self._file(f"{table_name}.{generation}.dat")
+
+    def _wal_file(self, generation):
+        return self._file(f"wal.{generation}.log")
+
+    def open(self, executor):
+        """Carga el último checkpoint en executor.tables y reaplica el WAL."""
+        catalog_path = self._file(CATALOG)
+        if os.path.exists(catalog_path):
+            with open(catalog_path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            self.generation = catalog['generation']
+            for entry in catalog['tables']:
+                columns = [(name, col_type, constraints) for name, col_type, constraints in entry['columns']]
+                table = executor.create_table(entry['name'], columns, entry['storage'])
+                for columns in read_segments(self._data_file(entry['name'], self.generation)):
+                    table.load_columns(columns)
+                for index_name, column in entry['indexes']:
+                    table.create_index(index_name, column)
+
+        wal_path = self._wal_file(self.generation)
+        records, end = read_wal(wal_path)
+        for record in records:
+            self.apply(executor, record)
+        if os.path.exists(wal_path) and os.path.getsize(wal_path) > end:
+            with open(wal_path, 'r+b') as f:
+                f.truncate(end)
+
+        self.wal = WriteAheadLog(wal_path, self.sync)
+        for table in executor.tables.values():
+            table.journal = self.wal.append
+
+    def apply(self, executor, record):
+        """Reaplica un registro del WAL sin volver a validar ni registrar."""
+        op, table_name = record[0], record[1]
+        if op == 'CREATE_TABLE':
+            _, _, columns, storage = record
+            executor.create_table(table_name, columns, storage)
+            return
+        table = executor.tables[table_name]
+        if op == 'INSERT':
+            table.load_columns(record[2])
+        elif op == 'UPDATE':
+            _, _, positions, assignments = record
+            table.apply_update([(i, table.row_at(i)) for i in positions], assignments)
+        elif op == 'DELETE':
+            positions = record[2]
+            table.delete_positions(None if positions is None else set(positions))
+        elif op == 'CREATE_INDEX':
+            table.create_index(record[2], record[3])
+        elif op == 'DROP_INDEX':
+            table.drop_index(record[2])
+        else:
+            raise ValueError(f"Registro desconocido en el WAL: '{op}'")
+
+    def table_created(self, table):
+        self.wal.append('CREATE_TABLE', table.name, table.columns, table.storage)
+        table.journal = self.wal.append
+
+    def log(self, *record):
+        self.wal.append(*record)
+
+    def commit(self, executor):
+        """Cierra una instrucción: vacía el WAL y hace checkpoint si creció demasiado."""
+        self.wal.commit()
+        if self.wal.size() > CHECKPOINT_WAL_BYTES:
+            self.checkpoint(executor)
+
+    def checkpoint(self, executor):
+        """Escribe una generación nueva con el estado actual y empieza un WAL vacío."""
+        self.wal.commit()
+        new_generation = self.generation + 1
+        entries = []
+        for table in executor.tables.values():
+            # Los ficheros guardan solo las filas vivas, con las posiciones ya compactadas
+            table.compact()
+            columns = [table.column_values(i) for i in range(len(table.columns))]
+            write_segments(self._data_file(table.name, new_generation), columns, table.row_count())
+            entries.append({
+                'name': table.name,
+                'columns': table.columns,
+                'storage': table.storage,
+                'indexes': [[index.name, index.column] for index in table.indexes.values() if index.kind == 'ORDERED'],
+            })
+        new_wal = WriteAheadLog(self._wal_file(new_generation), self.sync)
+
+        tmp = self._file(CATALOG + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'generation': new_generation, 'tables': entries}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file(CATALOG))
+
+        old_generation = self.generation
+        self.wal.close()
+        self.wal = new_wal
+        self.generation = new_generation
+        for table in executor.tables.values():
+            table.journal = self.wal.append
+        for name in os.listdir(self.path):
+            if name.endswith(f".{old_generation}.dat"):
+                os.remove(self._file(name))
+        os.remove(self._wal_file(old_generation))
+
+    def close(self):
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
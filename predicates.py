@@ -0,0 +1,139 @@
+import operator
+
+from column_stats import estimate_selectivity
+from table import convert_value, strip_quotes
+
+OPERATORS = {
+    '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '>': operator.gt,
+    '<=': operator.le, '>=': operator.ge,
+}
+
+# Un constructor por operador: el predicado resultante hace una sola comparación
+# por fila, sin conversiones ni despacho por el texto del operador.
+_BUILDERS = {
+    '=': lambda i, v: lambda row: row[i] == v,
+    '!=': lambda i, v: lambda row: row[i] != v,
+    '<': lambda i, v: lambda row: row[i] < v,
+    '>': lambda i, v: lambda row: row[i] > v,
+    '<=': lambda i, v: lambda row: row[i] <= v,
+    '>=': lambda i, v: lambda row: row[i] >= v,
+}
+
+# Para relaciones con None (las columnas de la derecha de un LEFT JOIN sin pareja):
+# None no cumple ninguna comparación. En '=' basta con la normal, el literal nunca es None.
+_NULLABLE_BUILDERS = {
+    '=': _BUILDERS['='],
+    '!=': lambda i, v: lambda row: (x := row[i]) is not None and x != v,
+    '<': lambda i, v: lambda row: (x := row[i]) is not None and x < v,
+    '>': lambda i, v: lambda row: (x := row[i]) is not None and x > v,
+    '<=': lambda i, v: lambda row: (x := row[i]) is not None and x <= v,
+    '>=': lambda i, v: lambda row: (x := row[i]) is not None and x >= v,
+}
+
+
+def convert_literal(table, col_idx, val):
+    """Convierte el literal de una condición al tipo de la columna con la que se compara."""
+    col_name, col_type = table.columns[col_idx][0], table.columns[col_idx][1]
+    try:
+        return convert_value(strip_quotes(val), col_type)
+    except (TypeError, ValueError):
+        raise ValueError(f"Error: valor {val} no válido para la columna '{col_name}' ({col_type}) en la condición")
+
+
+def compile_condition(table, condition):
+    """
+    Compila una condición para `table`: una comparación (columna, operador, literal)
+    o una combinación ('AND', [condiciones]), ('OR', [condiciones]) o ('NOT', condición).
+    Si la tabla es nullable (una relación con LEFT JOIN) las comparaciones con
+    None son falsas.
+
+    En una comparación el índice de la columna, el literal convertido y el operador
+    se resuelven una sola vez; la función fila -> bool resultante lleva los
+    atributos col_idx, op y value. Toda función compilada lleva además selectivity
+    (fracción estimada de filas que la cumplen, con las estadísticas de ANALYZE si
+    las hay) y cost (comparaciones que puede llegar a hacer por fila).
+    """
+    if len(condition) == 2:
+        kind, operand = condition
+        if kind == 'NOT':
+            return _compile_not(compile_condition(table, operand))
+        parts = [compile_condition(table, part) for part in operand]
+        return _compile_and(parts) if kind == 'AND' else _compile_or(parts)
+
+    col, op, val = condition
+    if op not in _BUILDERS:
+        raise ValueError(f"Operador desconocido '{op}' en condición")
+    col_idx = table.get_column_index(col)
+    value = convert_literal(table, col_idx, val)
+
+    builders = _NULLABLE_BUILDERS if getattr(table, 'nullable', False) else _BUILDERS
+    predicate = builders[op](col_idx, value)
+    predicate.col_idx = col_idx
+    predicate.op = op
+    predicate.value = value
+    stats = getattr(table, 'stats', {}).get(table.columns[col_idx][0])
+    predicate.selectivity = estimate_selectivity(stats, op, value)
+    predicate.cost = 1
+    return predicate
+
+
+def _compile_and(parts):
+    """
+    Conjunción con cortocircuito. Las partes se evalúan por rango
+    (selectividad - 1) / coste: primero las que descartan más filas por
+    comparación. conjuncts conserva ese orden; driver es la primera comparación
+    simple y residual comprueba el resto (para recorridos que resuelven driver
+    por su cuenta, p. ej. sobre una columna de ColumnarTable).
+    """
+    parts = sorted(parts, key=lambda part: (part.selectivity - 1) / part.cost)
+
+    def predicate(row):
+        for part in parts:
+            if not part(row):
+                return False
+        return True
+
+    predicate.conjuncts = parts
+    predicate.selectivity = _product(part.selectivity for part in parts)
+    predicate.cost = sum(part.cost for part in parts)
+    predicate.driver = next((part for part in parts if hasattr(part, 'op')), None)
+    predicate.residual = None
+    if predicate.driver is not None:
+        rest = [part for part in parts if part is not predicate.driver]
+        if rest:
+            predicate.residual = rest[0] if len(rest) == 1 else _compile_and(rest)
+    return predicate
+
+
+def _compile_or(parts):
+    """Disyunción con cortocircuito: primero las partes que más filas aceptan por comparación."""
+    parts = sorted(parts, key=lambda part: -part.selectivity / part.cost)
+
+    def predicate(row):
+        for part in parts:
+            if part(row):
+                return True
+        return False
+
+    predicate.disjuncts = parts
+    predicate.selectivity = 1 - _product(1 - part.selectivity for part in parts)
+    predicate.cost = sum(part.cost for part in parts)
+    return predicate
+
+
+def _compile_not(part):
+    def predicate(row):
+        return not part(row)
+
+    predicate.negated = part
+    predicate.selectivity = 1 - part.selectivity
+    predicate.cost = part.cost
+    return predicate
+
+
+def _product(values):
+    result = 1.0
+    for val in values:
+        result *= val
+    return result
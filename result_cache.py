@@ -0,0 +1,97 @@
+"""
+Caché de resultados de SELECT.
+
+Cada entrada guarda el resultado junto con las tablas de las que depende y su
+versión (Table.version, que aumenta con cada INSERT, UPDATE o DELETE). Una
+entrada solo se usa si todas esas tablas siguen registradas y con la misma
+versión; si no, se descarta. La caché está acotada en número de entradas y en
+memoria estimada, y expulsa primero las usadas hace más tiempo.
+"""
+from collections import OrderedDict
+import sys
+import threading
+
+
+def freeze(obj):
+    """Convierte una instrucción (listas, dicts) en una clave hashable equivalente."""
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(item) for item in obj)
+    if isinstance(obj, dict):
+        return tuple(sorted((key, freeze(val)) for key, val in obj.items()))
+    return obj
+
+
+# Filas que se miden para estimar el tamaño de un resultado
+_SAMPLE_ROWS = 64
+
+
+def estimate_bytes(result):
+    """Memoria aproximada de (columnas, filas), a partir de una muestra de filas."""
+    cols, rows = result
+    if not rows:
+        return sys.getsizeof(rows)
+    sample = rows[:_SAMPLE_ROWS]
+    sampled = sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in sample)
+    return sys.getsizeof(rows) + sampled * len(rows) // len(sample)
+
+
+class ResultCache:
+    def __init__(self, maxsize=256, max_bytes=64 << 20):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Las consultas de varias sesiones (server.py) la usan desde distintos hilos
+        self.lock = threading.RLock()
+
+    def get(self, key, tables):
+        """Resultado guardado para `key` si sigue vigente respecto a `tables` (nombre -> Table), o None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                result, versions, nbytes = entry
+                if all(tables.get(table.name) is table and table.version == version
+                       for table, version in versions):
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return result
+                self.discard(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, result, depends_on):
+        """Guarda el resultado; depends_on son las tablas leídas para obtenerlo."""
+        nbytes = estimate_bytes(result)
+        if nbytes > self.max_bytes // 4:
+            # Un resultado tan grande expulsaría casi todo lo demás
+            return
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = (result, tuple((table, table.version) for table in depends_on), nbytes)
+            self.bytes += nbytes
+            while len(self.entries) > self.maxsize or self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entradas': len(self.entries),
+            'bytes': self.bytes,
+            'aciertos': self.hits,
+            'fallos': self.misses,
+            'tasa_aciertos': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,243 @@
+"""
+Servidor SQL asíncrono: muchos clientes consultan las mismas tablas en memoria.
+
+Protocolo: cada mensaje es un entero de 4 bytes big-endian con la longitud
+seguido de ese número de bytes de JSON en UTF-8.
+
+* Petición: {"sql": "SELECT ...;", "params": [...]}; params es opcional y da
+  valor a los '?' del texto, como Executor.execute_sql.
+* Respuesta: {"ok": true, "results": [...]} con un elemento por instrucción,
+  {"message": ...} o {"message": ..., "columns": [...], "rows": [...]}; si una
+  instrucción falla, {"ok": false, "error": ..., "results": [...]} con las
+  anteriores. Las fechas se envían como texto ISO.
+
+Cada conexión es una Session sobre el Executor compartido. Antes de ejecutar una
+instrucción se toma el cerrojo lectores-escritor de cada tabla que usa, en orden
+de nombre: los SELECT de una misma tabla se ejecutan a la vez y una escritura
+espera a que terminen. Las instrucciones se ejecutan fuera del bucle de eventos:
+las lecturas en un pool de hilos y las escrituras en un único hilo, así que
+quedan serializadas entre sí (y el WAL las recibe de una en una). Los recorridos
+de tablas van siempre en serie: con varios hilos vivos parallel.py no hace fork.
+
+    python server.py --port 5433 --storage COLUMNAR --db datos
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import json
+import os
+import struct
+
+from executor import Executor, materialize
+from statement_cache import bind
+
+HEADER = struct.Struct('>I')
+
+# Mensajes mayores se rechazan y se cierra la conexión
+MAX_MESSAGE_BYTES = 64 << 20
+
+# Hilos que ejecutan lecturas a la vez
+READ_THREADS = 8
+
+# Instrucciones que solo leen tablas
+READ_INSTRUCTIONS = ('SELECT', 'SHOW_INDEX')
+
+
+async def read_message(reader):
+    """Siguiente mensaje decodificado, o None si el otro extremo cerró la conexión."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    size, = HEADER.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Mensaje de {size} bytes supera el máximo de {MAX_MESSAGE_BYTES}")
+    return json.loads(await reader.readexactly(size))
+
+
+def encode_message(obj):
+    payload = json.dumps(obj, default=str).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+
+class RWLock:
+    """
+    Cerrojo lectores-escritor del bucle de eventos. Un escritor en espera impide
+    la entrada de lectores nuevos para que las escrituras no esperen sin fin.
+    """
+
+    def __init__(self):
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire_read(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writer and not self.waiting_writers)
+            self.readers += 1
+
+    async def release_read(self):
+        async with self.condition:
+            self.readers -= 1
+            self.condition.notify_all()
+
+    async def acquire_write(self):
+        async with self.condition:
+            self.waiting_writers += 1
+            try:
+                await self.condition.wait_for(lambda: not self.writer and not self.readers)
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+
+    async def release_write(self):
+        async with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+
+class Session:
+    """Conexión de un cliente; ejecuta sus peticiones una tras otra."""
+
+    def __init__(self, server, session_id, peer):
+        self.server = server
+        self.id = session_id
+        self.peer = peer
+        self.statements = 0
+        self.errors = 0
+
+    async def handle(self, request):
+        """Ejecuta el SQL de una petición y devuelve la respuesta."""
+        results = []
+        try:
+            sql = request['sql']
+            instrucciones = await self.server.run_reader(self.server.bind, sql, request.get('params', ()))
+            for instr in instrucciones:
+                results.append(await self.server.execute(instr))
+                self.statements += 1
+        except Exception as e:
+            # Cualquier fallo de una instrucción (también OverflowError, ZeroDivisionError,
+            # el OSError de un COPY, ...) se responde como error y la sesión sigue abierta
+            self.errors += 1
+            return {'ok': False, 'error': str(e) or type(e).__name__, 'results': results}
+        return {'ok': True, 'results': results}
+
+
+class Server:
+    def __init__(self, executor, threads=READ_THREADS):
+        self.executor = executor
+        self.readers = ThreadPoolExecutor(threads, thread_name_prefix='lectura')
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix='escritura')
+        self.locks = {}
+        self.sessions = {}
+        self.next_session = 1
+
+    async def start(self, host='127.0.0.1', port=5433, path=None):
+        """Empieza a aceptar conexiones TCP (o en el socket Unix `path`)."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.readers.shutdown()
+        self.writer.shutdown()
+
+    async def handle_connection(self, reader, writer):
+        session = Session(self, self.next_session, writer.get_extra_info('peername'))
+        self.next_session += 1
+        self.sessions[session.id] = session
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except ValueError as e:
+                    writer.write(encode_message({'ok': False, 'error': str(e), 'results': []}))
+                    break
+                if request is None:
+                    break
+                response = await session.handle(request)
+                writer.write(encode_message(response))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.sessions[session.id]
+            writer.close()
+
+    def bind(self, sql, params):
+        templates, slots = self.executor.statement_cache.lookup(sql)
+        return bind(templates, slots, params)
+
+    async def run_reader(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, func, *args)
+
+    async def execute(self, instr):
+        """Ejecuta una instrucción con los cerrojos de sus tablas tomados."""
+        names, write = self.executor.instruction_tables(instr)
+        async with self.locked(names, write):
+            pool = self.writer if write else self.readers
+            return await asyncio.get_running_loop().run_in_executor(pool, self.run, instr, write)
+
+    def run(self, instr, write):
+        # Las lecturas no pasan por execute_instruction: no hay nada que confirmar en el WAL
+        if write:
+            resultado, mensaje = self.executor.execute_instruction(instr)
+        else:
+            resultado, mensaje = self.executor.execute_read(instr)
+        if resultado is None:
+            return {'message': mensaje}
+        cols, rows = materialize(resultado)
+        return {'message': mensaje, 'columns': cols, 'rows': rows}
+
+    @asynccontextmanager
+    async def locked(self, names, write):
+        # Siempre en orden de nombre para que dos instrucciones no se esperen mutuamente
+        locks = [self.locks.setdefault(name, RWLock()) for name in sorted(names)]
+        taken = []
+        try:
+            for lock in locks:
+                await (lock.acquire_write() if write else lock.acquire_read())
+                taken.append(lock)
+            yield
+        finally:
+            for lock in reversed(taken):
+                await (lock.release_write() if write else lock.release_read())
+
+
+async def serve(executor, host='127.0.0.1', port=5433, path=None, threads=READ_THREADS):
+    server = Server(executor, threads)
+    listener = await server.start(host, port, path)
+    where = path if path is not None else f"{host}:{port}"
+    print(f"Servidor escuchando en {where}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=5433)
+    arg_parser.add_argument('--socket', help="socket Unix en lugar de TCP")
+    arg_parser.add_argument('--storage', default='ROW', help="motor por defecto de las tablas nuevas")
+    arg_parser.add_argument('--db', help="directorio de la base de datos (sin él, solo en memoria)")
+    arg_parser.add_argument('--threads', type=int, default=READ_THREADS, help="hilos de lectura")
+    args = arg_parser.parse_args()
+
+    executor = Executor(args.storage, path=args.db)
+    if args.socket is not None and os.path.exists(args.socket):
+        os.unlink(args.socket)
+    try:
+        asyncio.run(serve(executor, args.host, args.port, args.socket, args.threads))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Destinos de salida para los resultados: HTML, CSV y JSONL.
+
+Un destino consume los eventos de Executor.execute_stream y escribe cada fila en
+cuanto sale del cursor, sin acumular el resultado. Los ficheros se escriben con
+el sufijo .tmp y solo se renombran si el flujo termina sin errores, así que una
+ejecución que falla no deja salida a medias. HtmlSink importa jinja2 solo al
+usarse.
+
+    sink = open_sink('csv', 'salida.csv')
+    archivos = sink.write(executor.execute_stream(parser.iter_parse()))
+
+CSV y JSONL escriben un fichero por resultado (salida.csv, salida_2.csv, ...) y
+el HTML una página por cada page_rows filas (salida.html, salida_2.html, ...).
+"""
+import csv
+import json
+import os
+
+
+def numbered(filename, number):
+    """Nombre del fichero número `number`: el primero es el propio filename."""
+    if number == 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{number}{ext}"
+
+
+class FileSink:
+    def __init__(self, filename):
+        self.filename = filename
+        self.paths = []
+
+    def write(self, events):
+        """Consume los eventos y devuelve la lista de ficheros escritos."""
+        self.paths = []
+        try:
+            self.write_events(events)
+        except BaseException:
+            for path in self.paths:
+                if os.path.exists(path + '.tmp'):
+                    os.remove(path + '.tmp')
+            raise
+        for path in self.paths:
+            os.replace(path + '.tmp', path)
+        return self.paths
+
+    def open(self, number):
+        """Abre el fichero temporal de la salida número `number`."""
+        path = numbered(self.filename, number)
+        self.paths.append(path)
+        return open(path + '.tmp', 'w', encoding='utf-8', newline='')
+
+    def results(self, events):
+        """(número, columnas, filas) de cada resultado; los mensajes se descartan."""
+        number = 0
+        for kind, value in events:
+            if kind == 'RESULTADO':
+                number += 1
+                yield number, value[0], value[1]
+
+
+class HtmlSink(FileSink):
+    """Páginas HTML de como mucho page_rows filas (None: una sola página)."""
+
+    def __init__(self, filename='salida.html', page_rows=None, max_messages=None):
+        super().__init__(filename)
+        self.page_rows = page_rows
+        self.max_messages = max_messages
+
+    def write_events(self, events):
+        from JinjaPy import render_pages
+
+        def page_href(number):
+            return os.path.basename(numbered(self.filename, number))
+
+        for number, chunks in enumerate(render_pages(events, self.page_rows, self.max_messages, page_href), 1):
+            with self.open(number) as f:
+                f.writelines(chunks)
+
+
+class CsvSink(FileSink):
+    """Un CSV por resultado con los nombres de las columnas en la primera línea."""
+
+    def write_events(self, events):
+        for number, columns, rows in self.results(events):
+            with self.open(number) as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+
+
+class JsonlSink(FileSink):
+    """Un fichero por resultado con un objeto JSON por fila; las fechas van como texto ISO."""
+
+    def write_events(self, events):
+        for number, columns, rows in self.results(events):
+            with self.open(number) as f:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+                    f.write('\n')
+
+
+SINKS = {'html': HtmlSink, 'csv': CsvSink, 'jsonl': JsonlSink}
+
+
+def open_sink(kind, filename, **options):
+    """Destino de salida del formato `kind` ('html', 'csv' o 'jsonl')."""
+    if kind.lower() not in SINKS:
+        raise ValueError(f"Formato de salida desconocido '{kind}'")
+    return SINKS[kind.lower()](filename, **options)
@@ -0,0 +1,190 @@
+"""
+Instantáneas binarias de todas las tablas de un Executor.
+
+Formato (versión SNAPSHOT_VERSION); las cabeceras van en little-endian y los arrays
+en el orden de bytes de la máquina que escribió, indicado en la cabecera:
+
+    cabecera   'PYSN', versión (u16), orden de bytes de los arrays (u8), nº de tablas (u32)
+    por tabla  bloque con el esquema en JSON (nombre, columnas, motor, índices, filas)
+               por columna: INT -> bloque con el array de enteros de 64 bits
+                            DATE -> bloque con los ordinales (enteros de 64 bits)
+                            VARCHAR -> bloque con el diccionario en JSON + bloque con los
+                                       códigos (enteros de 32 bits)
+               por índice ordenado: bloque con las posiciones de las filas en el orden
+                                    del índice, para no tener que ordenar al cargar
+
+Cada bloque es (longitud u64, crc32 u32) seguido de los bytes. Al cargar, el archivo
+se proyecta con mmap y cada columna se copia de una vez a un array, sin interpretar
+fila a fila; las tablas COLUMNAR usan esos arrays directamente.
+"""
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+from columnar import ColumnarTable, DictColumn, column_vector
+from indexes import OrderedIndex
+from table import gc_paused
+
+SNAPSHOT_MAGIC = b'PYSN'
+SNAPSHOT_VERSION = 1
+
+HEADER = struct.Struct('<4sHBI')  # magia, versión, orden de bytes, tablas
+BLOCK = struct.Struct('<QI')  # bytes, crc32
+
+_BYTEORDER = {'little': 0, 'big': 1}
+
+
+def encoded_vectors(table):
+    """
+    Columnas de la tabla ya codificadas, solo con las filas no borradas (las de una
+    ColumnarTable sin filas borradas se usan tal cual).
+    """
+    if isinstance(table, ColumnarTable):
+        if table.live is None:
+            return table.vectors
+        vectors = [vector.copy() for vector in table.vectors]
+        for vector in vectors:
+            vector.keep(table.live)
+        return vectors
+    vectors = []
+    for i, col in enumerate(table.columns):
+        vector = column_vector(col[1])
+        vector.extend(table.live_values(i))
+        vectors.append(vector)
+    return vectors
+
+
+def live_order(table, index):
+    """
+    Orden del índice con las posiciones que tendrán las filas en la instantánea,
+    donde no están las borradas. La tabla no se compacta: el WAL de una base de
+    datos en disco sigue refiriéndose a las posiciones actuales.
+    """
+    order = index.order()
+    if table.live is None:
+        return order
+    renumbered = [0] * table.slot_count()
+    for new, position in enumerate(table.live_positions()):
+        renumbered[position] = new
+    return [renumbered[position] for position in order]
+
+
+def save_snapshot(tables, filename):
+    """Escribe todas las tablas (dict nombre -> Table) en `filename`."""
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, _BYTEORDER[sys.byteorder], len(tables)))
+        for table in tables.values():
+            ordered = [index for index in table.indexes.values() if index.kind == 'ORDERED']
+            schema = {
+                'name': table.name,
+                'columns': table.columns,
+                'storage': table.storage,
+                'indexes': [[index.name, index.column] for index in ordered],
+                'rows': table.row_count(),
+            }
+            _write_block(f, json.dumps(schema).encode('utf-8'))
+            for vector in encoded_vectors(table):
+                if isinstance(vector, DictColumn):
+                    _write_block(f, json.dumps(vector.dictionary, ensure_ascii=False).encode('utf-8'))
+                _write_block(f, vector.tobytes())
+            for index in ordered:
+                _write_block(f, array('q', live_order(table, index)).tobytes())
+
+
+def _write_block(f, payload):
+    f.write(BLOCK.pack(len(payload), zlib.crc32(payload)))
+    f.write(payload)
+
+
+def load_snapshot(executor, filename):
+    """Crea en el executor las tablas guardadas en `filename` y las devuelve por nombre."""
+    try:
+        f = open(filename, 'rb')
+    except OSError as e:
+        raise ValueError(f"No se pudo abrir '{filename}': {e.strerror}")
+
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        reader = _BlockReader(mm, filename)
+        try:
+            with gc_paused():
+                return _read_tables(executor, reader)
+        finally:
+            reader.release()
+
+
+def _read_tables(executor, reader):
+    magic, version, byteorder, count = reader.header()
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"'{reader.filename}' no es una instantánea")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Versión de instantánea no soportada: {version}")
+    swap = byteorder != _BYTEORDER[sys.byteorder]
+
+    tables = {}
+    for _ in range(count):
+        schema = json.loads(bytes(reader.block()))
+        columns = [tuple(col) for col in schema['columns']]
+        table = executor.create_table(schema['name'], columns, schema['storage'])
+        vectors = []
+        for col in columns:
+            vector = column_vector(col[1])
+            if isinstance(vector, DictColumn):
+                dictionary = json.loads(bytes(reader.block()))
+                vector.frombytes(reader.block(), dictionary)
+                if swap:
+                    vector.codes.byteswap()
+            else:
+                vector.frombytes(reader.block())
+                if swap:
+                    vector.values.byteswap()
+            vectors.append(vector)
+
+        if isinstance(table, ColumnarTable):
+            table.load_vectors(vectors, schema['rows'])
+        else:
+            table.load_columns([vector.decoded() for vector in vectors])
+        for index_name, column in schema['indexes']:
+            order = array('q')
+            order.frombytes(reader.block())
+            if swap:
+                order.byteswap()
+            index = OrderedIndex(index_name, column, table.get_column_index(column))
+            index.load_order(table.column_values(index.col_idx), order.tolist())
+            table.indexes[index_name] = index
+        tables[table.name] = table
+    return tables
+
+
+class _BlockReader:
+    def __init__(self, mm, filename):
+        self.view = memoryview(mm)
+        self.offset = 0
+        self.filename = filename
+        self.blocks = []
+
+    def header(self):
+        if len(self.view) < HEADER.size:
+            raise ValueError(f"Instantánea '{self.filename}' incompleta")
+        values = HEADER.unpack_from(self.view, 0)
+        self.offset = HEADER.size
+        return values
+
+    def block(self):
+        if self.offset + BLOCK.size > len(self.view):
+            raise ValueError(f"Instantánea '{self.filename}' incompleta")
+        size, crc = BLOCK.unpack_from(self.view, self.offset)
+        start = self.offset + BLOCK.size
+        payload = self.view[start:start + size]
+        self.blocks.append(payload)
+        if len(payload) != size or zlib.crc32(payload) != crc:
+            raise ValueError(f"Instantánea '{self.filename}' dañada (checksum incorrecto)")
+        self.offset = start + size
+        return payload
+
+    def release(self):
+        for payload in self.blocks:
+            payload.release()
+        self.view.release()
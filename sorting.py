@@ -0,0 +1,138 @@
+"""
+Ordenación de resultados para ORDER BY.
+
+* Con LIMIT se usa un montículo acotado (heapq.nsmallest / nlargest): O(n log k)
+  en tiempo y O(k) en memoria.
+* Sin LIMIT se ordena en memoria mientras las filas quepan en el presupuesto; si
+  no, se escriben tramos ordenados en archivos temporales y se mezclan con
+  heapq.merge, leyendo cada tramo por bloques.
+
+Todas las variantes son estables: las filas con la misma clave conservan el
+orden en que llegaron.
+"""
+import heapq
+from itertools import islice
+from operator import itemgetter
+import pickle
+import sys
+import tempfile
+
+# Memoria que puede ocupar una ordenación antes de volcar tramos a disco
+SORT_MEMORY_BYTES = 64 << 20
+
+# Filas por bloque al escribir y leer los tramos temporales
+RUN_BLOCK_ROWS = 4096
+
+# Filas que se miden para estimar cuánto ocupa cada una
+_SAMPLE_ROWS = 64
+
+
+class Descending:
+    """Envuelve un valor invirtiendo su orden; para claves con ASC y DESC mezclados."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def nulls_first(val):
+    """Clave de un valor que puede ser None: None va antes que cualquier otro valor."""
+    return (val is not None, val)
+
+
+def sort_key(col_indices, descending, nullable=False):
+    """
+    Devuelve (key, reverse) para ordenar filas completas por las columnas dadas.
+    Si todas las columnas van en el mismo sentido basta con itemgetter y reverse.
+    Con nullable=True las columnas pueden tener None (p. ej. tras un LEFT JOIN):
+    None va antes que cualquier valor, al principio con ASC y al final con DESC.
+    """
+    same = not any(descending) or all(descending)
+    reverse = all(descending)
+    if same and not nullable:
+        return itemgetter(*col_indices), reverse
+    if same:
+        def key(row):
+            return tuple(nulls_first(row[i]) for i in col_indices)
+        return key, reverse
+
+    wrap = nulls_first if nullable else (lambda val: val)
+
+    def key(row):
+        return tuple(Descending(wrap(row[i])) if desc else wrap(row[i]) for i, desc in zip(col_indices, descending))
+    return key, False
+
+
+def top_k(rows, k, key, reverse=False):
+    """Las k primeras filas en orden, manteniendo solo k filas en memoria."""
+    if reverse:
+        return heapq.nlargest(k, rows, key=key)
+    return heapq.nsmallest(k, rows, key=key)
+
+
+def row_bytes(rows):
+    """Tamaño medio estimado de una fila, a partir de una muestra."""
+    sample = rows[:_SAMPLE_ROWS]
+    if not sample:
+        return 0
+    return sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in sample) // len(sample)
+
+
+def external_sort(rows, key, reverse=False, memory_bytes=SORT_MEMORY_BYTES):
+    """
+    Genera las filas ordenadas. Acumula filas hasta llenar memory_bytes; cada vez
+    que se llena, ordena el tramo y lo vuelca a un archivo temporal.
+    """
+    runs = []
+    buffer = []
+    limit = None
+    try:
+        for row in rows:
+            buffer.append(row)
+            if limit is None and len(buffer) == _SAMPLE_ROWS:
+                limit = max(memory_bytes // max(row_bytes(buffer), 1), _SAMPLE_ROWS)
+            if limit is not None and len(buffer) >= limit:
+                buffer.sort(key=key, reverse=reverse)
+                runs.append(_write_run(buffer))
+                buffer = []
+
+        buffer.sort(key=key, reverse=reverse)
+        if not runs:
+            yield from buffer
+            return
+        if buffer:
+            runs.append(_write_run(buffer))
+            buffer = []
+        yield from heapq.merge(*[_read_run(run) for run in runs], key=key, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _write_run(rows):
+    run = tempfile.TemporaryFile()
+    for start in range(0, len(rows), RUN_BLOCK_ROWS):
+        pickle.dump(rows[start:start + RUN_BLOCK_ROWS], run, protocol=pickle.HIGHEST_PROTOCOL)
+    run.flush()
+    return run
+
+
+def _read_run(run):
+    run.seek(0)
+    while True:
+        try:
+            block = pickle.load(run)
+        except EOFError:
+            return
+        yield from block
+
+
+def apply_limit(rows, limit=None, offset=0):
+    stop = None if limit is None else offset + limit
+    return islice(rows, offset, stop)
@@ -0,0 +1,141 @@
+"""
+Caché de instrucciones ya analizadas y sentencias preparadas.
+
+El texto SQL se normaliza con una sola expresión regular: cada literal (cadena,
+fecha o número) y cada '?' se sustituye por '?' y los espacios se compactan. Las
+sentencias con la misma forma comparten la entrada de la caché aunque cambien los
+literales, y al reutilizarla solo se sustituyen los valores en la plantilla: no se
+vuelve a pasar por el lexer ni por el parser.
+"""
+from collections import OrderedDict
+import re
+import threading
+
+from lexer import iter_tokens
+from parser import Parser, bind_params
+
+# Mismos literales que reconoce el lexer; un número pegado a un identificador
+# (p. ej. col1) forma parte del identificador y no se toca.
+_LITERAL = re.compile(r"""'(?:[^'\\]|\\.)*'|(?<![A-Za-z0-9_])(?:\d{4}-\d{2}-\d{2}|\d+)|\?""")
+
+# Marca de posición para un '?' escrito por el usuario en el texto
+PARAM = object()
+
+
+def normalize(sql):
+    """
+    Devuelve (forma, huecos): el texto con los literales reemplazados por '?' y
+    los espacios compactados, y por cada '?' de la forma el literal original
+    (tal como lo entregaría el lexer) o PARAM si ya era un '?' en el texto.
+    """
+    slots = []
+
+    def replace(match):
+        literal = match.group()
+        slots.append(PARAM if literal == '?' else literal)
+        return ' ? '
+
+    shape = ' '.join(_LITERAL.sub(replace, sql).split())
+    return shape, slots
+
+
+def parse_sql(sql):
+    """Analiza el texto completo y devuelve (instrucciones, número de parámetros)."""
+    parser = Parser(iter_tokens(sql))
+    return parser.parse(), parser.param_count
+
+
+class StatementCache:
+    """LRU de instrucciones analizadas, por forma normalizada del texto."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Varias sesiones (server.py) la consultan desde distintos hilos
+        self.lock = threading.RLock()
+
+    def lookup(self, sql):
+        """
+        Devuelve (plantillas, huecos) para el texto. Las plantillas llevan un Param
+        por hueco; los huecos que no son PARAM ya traen su literal.
+        """
+        shape, slots = normalize(sql)
+        with self.lock:
+            entry = self.entries.get(shape)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(shape)
+                return entry, slots
+
+            key = (shape,)
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == sql:
+                # Texto cuyos literales no admiten '?' (p. ej. VARCHAR(10)): se cachea tal cual
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[0], [PARAM] * entry[2]
+
+            self.misses += 1
+            try:
+                templates, count = parse_sql(shape)
+            except SyntaxError:
+                templates = None
+            if templates is not None and count == len(slots):
+                self.store(shape, templates)
+                return templates, slots
+
+            # La forma no es válida con '?' en todos los literales: se analiza el texto original
+            # (los únicos Param de la plantilla son entonces los '?' del usuario)
+            templates, count = parse_sql(sql)
+            self.store(key, (templates, sql, count))
+            return templates, [PARAM] * count
+
+    def store(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entradas': len(self.entries),
+            'aciertos': self.hits,
+            'fallos': self.misses,
+            'tasa_aciertos': self.hits / total if total else 0.0,
+        }
+
+
+def bind(templates, slots, params):
+    """Instrucciones listas para ejecutar: cada hueco PARAM toma el siguiente valor de params."""
+    params = list(params)
+    expected = sum(slot is PARAM for slot in slots)
+    if len(params) != expected:
+        raise ValueError(f"Se esperaban {expected} parámetros, se recibieron {len(params)}")
+    given = iter(params)
+    values = [next(given) if slot is PARAM else slot for slot in slots]
+    return [bind_params(template, values) for template in templates]
+
+
+class PreparedStatement:
+    """Sentencia analizada una sola vez y ejecutable con distintos valores para sus '?'."""
+
+    def __init__(self, executor, sql):
+        self.executor = executor
+        self.sql = sql
+        self.templates, self.slots = executor.statement_cache.lookup(sql)
+        if len(self.templates) != 1:
+            raise SyntaxError("Una sentencia preparada debe contener exactamente una instrucción")
+        self.param_count = sum(slot is PARAM for slot in self.slots)
+
+    def execute(self, params=()):
+        """Ejecuta la sentencia y devuelve (resultado o None, mensaje)."""
+        instr, = bind(self.templates, self.slots, params)
+        return self.executor.execute_instruction(instr)
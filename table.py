@@ -0,0 +1,535 @@
+from contextlib import contextmanager
+import copy
+from datetime import date, datetime
+import gc
+from itertools import compress, islice
+import re
+
+from aggregates import finish_groups, group_states
+from column_stats import ColumnStats
+from indexes import HashIndex, OrderedIndex, RANGE_OPERATORS
+import parallel
+
+# Al borrar se compacta la tabla cuando hay al menos COMPACT_MIN_ROWS filas
+# borradas y son al menos COMPACT_FRACTION de las posiciones ocupadas
+COMPACT_MIN_ROWS = 1024
+COMPACT_FRACTION = 0.25
+
+def strip_quotes(val):
+    # Limpiar comillas si es string con comillas externas
+    if isinstance(val, str):
+        if (val.startswith("'") and val.endswith("'")) or (val.startswith('"') and val.endswith('"')):
+            return val[1:-1]
+    return val
+
+
+def convert_value(val, col_type):
+    """
+    Convierte un valor (ya sin comillas) al tipo nativo de la columna:
+    int para INT, datetime.date para DATE y str para VARCHAR.
+    Lanza ValueError si el valor no es válido para ese tipo.
+    """
+    if col_type.startswith('VARCHAR') or col_type == 'STRING':
+        if isinstance(val, str):
+            return val
+    elif col_type in ('INT', 'NUMBER'):
+        if isinstance(val, int):
+            return val
+        if isinstance(val, str):
+            return int(val)
+    elif col_type == 'DATE':
+        if isinstance(val, date):
+            return val
+        if isinstance(val, str):
+            return datetime.strptime(val, '%Y-%m-%d').date()
+    raise ValueError(f"valor {val!r} no válido para el tipo {col_type}")
+
+
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}\Z')
+
+
+def convert_column(values, col_type):
+    """
+    Convierte una lista de valores de una misma columna de una vez (map sobre la
+    lista en lugar de despachar por tipo en cada valor). Lanza ValueError o
+    TypeError si alguno no es válido.
+    """
+    if col_type.startswith('VARCHAR') or col_type == 'STRING':
+        if set(map(type, values)) <= {str}:
+            return values
+    elif col_type in ('INT', 'NUMBER'):
+        return list(map(int, values))
+    elif col_type == 'DATE':
+        if all(map(_ISO_DATE.match, values)):
+            return list(map(date.fromisoformat, values))
+        return [convert_value(val, col_type) for val in values]
+    raise ValueError(f"valores no válidos para el tipo {col_type}")
+
+
+@contextmanager
+def gc_paused():
+    """
+    Desactiva el recolector de ciclos mientras se crean muchas filas de golpe: las
+    filas no forman ciclos y cada pasada del recolector las recorre todas.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class Table:
+    storage = 'ROW'
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = self.validate_columns(columns)
+        self.init_storage()
+        self.clear_tombstones()
+        # Índices por nombre; PRIMARY KEY y UNIQUE crean un índice hash automáticamente
+        self.indexes = {}
+        for i, col in enumerate(self.columns):
+            constraints = col[2] if len(col) > 2 else []
+            if 'PRIMARY' in constraints:
+                self.indexes[f"pk_{name}"] = HashIndex(f"pk_{name}", col[0], i)
+            elif 'UNIQUE' in constraints:
+                self.indexes[f"uq_{name}_{col[0]}"] = HashIndex(f"uq_{name}_{col[0]}", col[0], i)
+        # Si no es None, recibe cada modificación como registro (operación, tabla, ...);
+        # lo usa el WAL de persistence.Database
+        self.journal = None
+        # Aumenta con cada modificación de los datos; lo usa la caché de resultados
+        self.version = 0
+        # Estadísticas por nombre de columna; las recoge ANALYZE (ver analyze)
+        self.stats = {}
+
+    def init_storage(self):
+        self.data = []
+
+    def clone(self):
+        """
+        Copia independiente de la tabla (filas, borrados e índices) que se puede
+        modificar sin tocar el original; no lleva journal.
+        """
+        table = copy.copy(self)
+        table.copy_storage()
+        table.live = None if self.live is None else bytearray(self.live)
+        table.indexes = {name: index.copy() for name, index in self.indexes.items()}
+        table.journal = None
+        return table
+
+    def copy_storage(self):
+        # Las filas se modifican en su sitio (set_values): se copia cada una
+        self.data = list(map(list.copy, self.data))
+
+    def clear_tombstones(self):
+        # Un byte por posición: 1 si la fila está viva y 0 si está borrada; None
+        # mientras no haya filas borradas. dead cuenta las posiciones a 0.
+        self.live = None
+        self.dead = 0
+
+    def validate_columns(self, columns):
+        if not isinstance(columns, list) or not all(isinstance(col, tuple) and len(col) >= 2 for col in columns):
+            raise ValueError(f"Error en la definición de columnas para '{self.name}'. Se esperaba lista de tuplas (nombre, tipo[, restricciones])")
+        return columns
+
+    def insert(self, values):
+        cleaned_values = self.clean_values(values)
+
+        for index in self.unique_indexes():
+            if index.contains(cleaned_values[index.col_idx]):
+                raise self.duplicate_error(index, cleaned_values[index.col_idx])
+
+        position = self.append_row(cleaned_values)
+        if self.live is not None:
+            self.live.append(1)
+        for index in self.indexes.values():
+            index.add(cleaned_values[index.col_idx], position)
+        self.version += 1
+        if self.journal is not None:
+            self.journal('INSERT', self.name, [[val] for val in cleaned_values])
+
+    def insert_many(self, rows, columns=None, quoted=True):
+        """
+        Inserta un lote de filas. Convierte y valida columna a columna y actualiza
+        los índices una sola vez por lote; si alguna fila es inválida no se inserta
+        ninguna. columns indica a qué columnas corresponden los valores (las demás
+        quedan en None) y quoted=False evita quitar comillas (p. ej. en un CSV).
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        positions = range(len(self.columns)) if columns is None else [self.get_column_index(c) for c in columns]
+        widths = set(map(len, rows))
+        if widths != {len(positions)}:
+            bad = next(values for values in rows if len(values) != len(positions))
+            raise ValueError(f"Error: número de valores incorrecto para tabla '{self.name}'. Esperado {len(positions)}, recibido {len(bad)}")
+
+        given = dict(zip(positions, zip(*rows)))
+        columns = [self.clean_column(i, list(given.get(i, [None] * len(rows))), quoted)
+                   for i in range(len(self.columns))]
+
+        for index in self.unique_indexes():
+            val = index.find_duplicate(columns[index.col_idx])
+            if val is not None:
+                raise self.duplicate_error(index, val)
+
+        self.load_columns(columns)
+        if self.journal is not None:
+            self.journal('INSERT', self.name, columns)
+        return len(rows)
+
+    def load_columns(self, columns):
+        """Añade columnas de valores ya validados y actualiza los índices, sin comprobaciones."""
+        start = self.append_columns(columns)
+        if self.live is not None:
+            self.live.extend(b'\x01' * (self.slot_count() - start))
+        for index in self.indexes.values():
+            index.add_many(columns[index.col_idx], start)
+        self.version += 1
+
+    def clean_column(self, col_idx, values, quoted=True):
+        if quoted:
+            values = list(map(strip_quotes, values))
+        if None in values and self.is_not_null(self.columns[col_idx]):
+            raise ValueError(f"Error: la columna '{self.columns[col_idx][0]}' no admite valores nulos en tabla '{self.name}'")
+        col_name, col_type = self.columns[col_idx][0], self.columns[col_idx][1]
+        try:
+            return convert_column(values, col_type)
+        except (TypeError, ValueError):
+            pass
+        # Valor a valor: resuelve columnas con tipos mezclados o localiza el valor inválido
+        converted = []
+        for val in values:
+            try:
+                converted.append(convert_value(val, col_type))
+            except (TypeError, ValueError):
+                raise ValueError(f"Error: tipo de dato incorrecto para columna '{col_name}' en tabla '{self.name}'")
+        return converted
+
+    def clean_values(self, values):
+        """Valida la fila y la devuelve con cada valor convertido al tipo de su columna."""
+        if len(values) != len(self.columns):
+            raise ValueError(f"Error: número de valores incorrecto para tabla '{self.name}'. Esperado {len(self.columns)}, recibido {len(values)}")
+
+        return [self.clean_value(i, val) for i, val in enumerate(values)]
+
+    def clean_value(self, col_idx, val):
+        """Quita las comillas externas, comprueba NOT NULL y convierte el valor al tipo de la columna."""
+        col = self.columns[col_idx]
+        col_name = col[0]
+
+        if val is None and self.is_not_null(col):
+            raise ValueError(f"Error: la columna '{col_name}' no admite valores nulos en tabla '{self.name}'")
+
+        try:
+            return convert_value(strip_quotes(val), col[1])
+        except (TypeError, ValueError):
+            raise ValueError(f"Error: tipo de dato incorrecto para columna '{col_name}' en tabla '{self.name}'")
+
+    def validate_type(self, val, col_type):
+        try:
+            convert_value(val, col_type)
+            return True
+        except (TypeError, ValueError):
+            return False
+
+    def select(self, columns, condition=None):
+        cols, col_indices = self.resolve_columns(columns)
+        return cols, self.project(self.matching_rows(condition), col_indices)
+
+    def iter_select(self, columns, condition=None, limit=None, offset=0):
+        """
+        Como select, pero las filas se generan a medida que se piden y el recorrido
+        se detiene en cuanto se han producido `limit` filas (tras saltar `offset`).
+        """
+        cols, col_indices = self.resolve_columns(columns)
+        stop = None if limit is None else offset + limit
+        matches = islice(self.matching_rows(condition), offset, stop)
+        return cols, ([row[i] for i in col_indices] for _, row in matches)
+
+    def count_matching(self, condition=None):
+        """Número de filas que cumplen la condición."""
+        return sum(1 for _ in self.matching_rows(condition))
+
+    def aggregate(self, condition, group_idx, specs):
+        """Agregados por grupo de las filas que cumplen la condición (ver aggregates.py)."""
+        groups = parallel.aggregate(self, condition, group_idx, specs)
+        if groups is None:
+            groups = group_states((row for _, row in self.matching_rows(condition)), group_idx, specs)
+        return finish_groups(groups, specs)
+
+    def aggregate_range(self, condition, group_idx, specs, start, stop):
+        """Acumuladores sin terminar de las filas de [start, stop) que cumplen la condición."""
+        rows = self.data[start:stop]
+        if self.live is not None:
+            rows = compress(rows, self.live[start:stop])
+        if condition is not None:
+            rows = filter(condition, rows)
+        return group_states(rows, group_idx, specs)
+
+    def iter_ordered(self, index, descending=False, condition=None):
+        """
+        Genera (posición, fila) en el orden del índice ordenado `index`, filtrando
+        con la condición; permite ORDER BY sin ordenar y parar en cuanto baste.
+        """
+        entries = reversed(index.entries) if descending else index.entries
+        for _, i in entries:
+            row = self.row_at(i)
+            if condition is None or condition(row):
+                yield i, row
+
+    def resolve_columns(self, columns):
+        if columns == ['*']:
+            cols = [col[0] for col in self.columns]
+        else:
+            cols = columns
+
+        col_indices = [self.get_column_index(c) for c in cols]
+        return cols, col_indices
+
+    def project(self, matches, col_indices):
+        """Construye las filas resultado con las columnas pedidas a partir de (posición, fila)."""
+        return [[row[i] for i in col_indices] for _, row in matches]
+
+    def matching_rows(self, condition=None):
+        """
+        Genera (posición, fila) de las filas que cumplen la condición. Si la condición
+        trae row_ids (posiciones resueltas con un índice) solo se revisan esas filas.
+        """
+        if condition is None:
+            yield from self.live_rows()
+            return
+        row_ids = getattr(condition, 'row_ids', None)
+        if row_ids is None:
+            positions = parallel.scan(self, condition)
+            if positions is not None:
+                data = self.data
+                for i in positions:
+                    yield i, data[i]
+                return
+            for i, row in self.live_rows():
+                if condition(row):
+                    yield i, row
+        else:
+            for i in row_ids:
+                row = self.data[i]
+                if condition(row):
+                    yield i, row
+
+    def update(self, updates, condition=None):
+        matches = list(self.matching_rows(condition))
+        if not matches:
+            return
+
+        assignments = []
+        for col_name, new_val in updates.items():
+            idx = self.get_column_index(col_name)
+            assignments.append((idx, self.clean_value(idx, new_val)))
+
+        # Comprobar unicidad antes de modificar nada para no dejar los índices a medias
+        touched = [(index, val) for index in self.indexes.values()
+                   for idx, val in assignments if idx == index.col_idx]
+        for index, val in touched:
+            if index.unique and (len(matches) > 1 or index.contains(val, matches[0][0])):
+                raise self.duplicate_error(index, val)
+
+        self.apply_update(matches, assignments)
+
+    def apply_update(self, matches, assignments):
+        """Asigna valores ya validados a las filas (posición, fila) y mantiene los índices."""
+        touched = [(index, val) for index in self.indexes.values()
+                   for idx, val in assignments if idx == index.col_idx]
+        for i, row in matches:
+            for index, val in touched:
+                index.remove(row[index.col_idx], i)
+                index.add(val, i)
+            self.set_values(i, row, assignments)
+        self.version += 1
+        if self.journal is not None:
+            self.journal('UPDATE', self.name, [i for i, _ in matches], assignments)
+
+    def delete(self, condition=None):
+        if condition is None:
+            self.delete_positions(None)
+        else:
+            doomed = {i for i, _ in self.matching_rows(condition)}
+            if not doomed:
+                return
+            self.delete_positions(doomed)
+
+    def delete_positions(self, doomed):
+        """
+        Borra las filas de las posiciones indicadas (None vacía la tabla). Las filas
+        solo se marcan como borradas y salen de los índices; el espacio se recupera
+        al compactar, cuando las borradas superan el umbral de COMPACT_FRACTION.
+        """
+        if doomed is None:
+            self.init_storage()
+            self.clear_tombstones()
+            self.rebuild_indexes()
+        else:
+            self.mark_deleted(doomed)
+        self.version += 1
+        if self.journal is not None:
+            self.journal('DELETE', self.name, None if doomed is None else sorted(doomed))
+        # Después del registro: al reproducir el WAL se compacta en el mismo punto
+        if self.dead >= COMPACT_MIN_ROWS and self.dead >= COMPACT_FRACTION * self.slot_count():
+            self.compact()
+
+    def mark_deleted(self, doomed):
+        if self.live is None:
+            self.live = bytearray(b'\x01') * self.slot_count()
+        live = self.live
+        doomed = [i for i in doomed if live[i]]
+        removed = [(i, self.row_at(i)) for i in doomed] if self.indexes else []
+        for i in doomed:
+            live[i] = 0
+        self.dead += len(doomed)
+        for index in self.indexes.values():
+            index.remove_many([(row[index.col_idx], i) for i, row in removed], live)
+
+    def compact(self):
+        """Elimina del almacenamiento las filas borradas; sus posiciones cambian."""
+        if not self.dead:
+            return
+        self.keep_rows(self.live)
+        self.clear_tombstones()
+        self.rebuild_indexes()
+        self.version += 1
+
+    def live_rows(self):
+        """(posición, fila) de las filas no borradas."""
+        if self.live is None:
+            return enumerate(self.data)
+        return compress(enumerate(self.data), self.live)
+
+    def live_positions(self, start=0, stop=None):
+        """Posiciones de [start, stop) cuyas filas no están borradas."""
+        stop = self.slot_count() if stop is None else stop
+        if self.live is None:
+            return range(start, stop)
+        return list(compress(range(start, stop), self.live[start:stop]))
+
+    def live_values(self, col_idx):
+        """Valores de la columna en las filas no borradas, en orden de posición."""
+        values = self.column_values(col_idx)
+        if self.live is None:
+            return values
+        return list(compress(values, self.live))
+
+    def row_count(self):
+        return self.slot_count() - self.dead
+
+    # Primitivas de almacenamiento: ColumnarTable las redefine.
+
+    def row_at(self, position):
+        return self.data[position]
+
+    def scan_range(self, condition, start, stop):
+        """Posiciones de [start, stop) cuyas filas cumplen la condición."""
+        data = self.data
+        return [i for i in self.live_positions(start, stop) if condition(data[i])]
+
+    def iter_rows(self):
+        """Todas las filas no borradas en orden de posición."""
+        if self.live is None:
+            return iter(self.data)
+        return compress(self.data, self.live)
+
+    def append_row(self, row):
+        self.data.append(row)
+        return len(self.data) - 1
+
+    def append_columns(self, columns):
+        """Añade filas dadas por columnas; devuelve la posición de la primera."""
+        start = len(self.data)
+        with gc_paused():
+            self.data.extend(map(list, zip(*columns)))
+        return start
+
+    def set_values(self, position, row, assignments):
+        # Se modifica la fila almacenada: las filas resultado son siempre copias
+        for idx, new_val in assignments:
+            row[idx] = new_val
+
+    def keep_rows(self, selectors):
+        """Conserva solo las posiciones cuyo selector es verdadero."""
+        self.data = list(compress(self.data, selectors))
+
+    def column_values(self, col_idx):
+        """Valores de la columna en todas las posiciones, incluidas las borradas."""
+        return [row[col_idx] for row in self.data]
+
+    def slot_count(self):
+        """Posiciones ocupadas, contando las filas borradas aún sin compactar."""
+        return len(self.data)
+
+    def rebuild_indexes(self):
+        positions = self.live_positions()
+        for index in self.indexes.values():
+            index.rebuild(self.live_values(index.col_idx), positions)
+
+    def is_not_null(self, col):
+        constraints = col[2] if len(col) > 2 else []
+        return 'PRIMARY' in constraints or 'NOT' in constraints
+
+    def unique_indexes(self):
+        return [index for index in self.indexes.values() if index.unique]
+
+    def index_for(self, col_name, op):
+        """Índice capaz de resolver `col_name op valor`, prefiriendo el hash para igualdades."""
+        candidates = [index for index in self.indexes.values() if index.column == col_name]
+        if op == '=':
+            candidates.sort(key=lambda index: index.kind != 'HASH')
+        elif op in RANGE_OPERATORS:
+            candidates = [index for index in candidates if index.kind == 'ORDERED']
+        else:
+            return None
+        return candidates[0] if candidates else None
+
+    def ordered_index(self, col_name):
+        """Índice ordenado sobre la columna, o None."""
+        for index in self.indexes.values():
+            if index.kind == 'ORDERED' and index.column == col_name:
+                return index
+        return None
+
+    def create_index(self, index_name, col_name):
+        if index_name in self.indexes:
+            raise ValueError(f"Índice '{index_name}' ya existe en tabla '{self.name}'")
+        index = OrderedIndex(index_name, col_name, self.get_column_index(col_name))
+        index.rebuild(self.live_values(index.col_idx), self.live_positions())
+        self.indexes[index_name] = index
+        return index
+
+    def drop_index(self, index_name):
+        index = self.indexes.get(index_name)
+        if index is None:
+            raise ValueError(f"Índice '{index_name}' no existe en tabla '{self.name}'")
+        if index.kind == 'HASH':
+            raise ValueError(f"El índice '{index_name}' pertenece a una restricción PRIMARY KEY/UNIQUE y no se puede eliminar")
+        del self.indexes[index_name]
+
+    def analyze(self):
+        """Recoge las estadísticas de cada columna con las que se ordenan los predicados."""
+        self.stats = {col[0]: ColumnStats(self.live_values(i)) for i, col in enumerate(self.columns)}
+        return self.stats
+
+    def list_indexes(self):
+        """Lista de (nombre, columna, tipo, entradas) de los índices de la tabla."""
+        return [[index.name, index.column, index.kind, len(index)] for index in self.indexes.values()]
+
+    def duplicate_error(self, index, val):
+        return ValueError(f"Error: valor duplicado '{val}' para columna '{index.column}' en tabla '{self.name}' (índice {index.name})")
+
+    def get_column_index(self, col_name):
+        for i, col in enumerate(self.columns):
+            if col[0] == col_name:
+                return i
+        raise ValueError(f"Columna '{col_name}' no existe en tabla '{self.name}'")
+
+    def __repr__(self):
+        return f"<Table {self.name} columnas={self.columns} filas={self.row_count()}>"
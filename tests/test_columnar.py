@@ -0,0 +1,25 @@
+import pytest
+
+from executor import Executor
+
+
+def test_out_of_range_int_leaves_columns_aligned():
+    executor = Executor()
+    executor.execute_sql('CREATE TABLE t (n VARCHAR, id INT) STORAGE COLUMNAR;')
+    with pytest.raises(ValueError):
+        executor.execute_sql("INSERT INTO t VALUES ('a', 99999999999999999999999);")
+    with pytest.raises(ValueError):
+        executor.execute_sql("INSERT INTO t VALUES ('c', 2), ('d', ?);", (-99999999999999999999999,))
+    executor.execute_sql("INSERT INTO t VALUES ('b', 1);")
+    with pytest.raises(ValueError):
+        executor.execute_sql('UPDATE t SET id = 99999999999999999999999;')
+    resultado, _ = executor.execute_sql('SELECT * FROM t;')[0]
+    assert resultado[1] == [['b', 1]]
+
+
+def test_int64_limits_are_accepted():
+    executor = Executor()
+    executor.execute_sql('CREATE TABLE t (id INT) STORAGE COLUMNAR;')
+    executor.execute_sql('INSERT INTO t VALUES (?), (?);', (9223372036854775807, -9223372036854775808))
+    resultado, _ = executor.execute_sql('SELECT id FROM t;')[0]
+    assert resultado[1] == [[9223372036854775807], [-9223372036854775808]]
@@ -0,0 +1,86 @@
+import pytest
+
+from executor import Executor
+
+
+def rows(executor, sql):
+    resultado, _ = executor.execute_sql(sql)[0]
+    return [list(row) for row in resultado[1]]
+
+
+@pytest.fixture
+def executor():
+    executor = Executor()
+    executor.execute_sql('CREATE TABLE a (id INT, x INT);')
+    executor.execute_sql('CREATE TABLE b (id INT, y INT, s VARCHAR);')
+    executor.execute_sql('INSERT INTO a VALUES (1, 10), (2, 20), (3, 30), (4, 40);')
+    executor.execute_sql("INSERT INTO b VALUES (1, 3, 'p'), (3, 9, 'q'), (3, 1, 'r');")
+    return executor
+
+
+def test_left_join_where_is_false_on_null(executor):
+    assert rows(executor, 'SELECT a.id, b.y FROM a LEFT JOIN b ON a.id = b.id WHERE b.y > 2;') == [[1, 3], [3, 9]]
+    assert rows(executor, 'SELECT a.id, b.y FROM a LEFT JOIN b ON a.id = b.id WHERE b.y != 3;') == [[3, 9], [3, 1]]
+
+
+def test_left_join_order_by_puts_null_first(executor):
+    assert rows(executor, 'SELECT a.id, b.y FROM a LEFT JOIN b ON a.id = b.id ORDER BY b.y;') == \
+        [[2, None], [4, None], [3, 1], [1, 3], [3, 9]]
+    assert rows(executor, 'SELECT a.id, b.y FROM a LEFT JOIN b ON a.id = b.id ORDER BY b.y DESC LIMIT 3;') == \
+        [[3, 9], [1, 3], [3, 1]]
+    assert rows(executor, 'SELECT a.id, b.y FROM a LEFT JOIN b ON a.id = b.id ORDER BY b.y DESC, a.id;') == \
+        [[3, 9], [1, 3], [3, 1], [2, None], [4, None]]
+
+
+def test_left_join_aggregates_skip_null(executor):
+    sql = 'SELECT COUNT(*), COUNT(b.y), SUM(b.y), AVG(b.y), MIN(b.s), MAX(b.y) FROM a LEFT JOIN b ON a.id = b.id;'
+    assert rows(executor, sql) == [[5, 3, 13, 13 / 3, 'p', 9]]
+    sql = ('SELECT a.id, COUNT(b.y), SUM(b.y), AVG(b.y) FROM a LEFT JOIN b ON a.id = b.id '
+           'GROUP BY a.id ORDER BY AVG(b.y);')
+    assert rows(executor, sql) == [[2, 0, None, None], [4, 0, None, None], [1, 1, 3, 3.0], [3, 2, 10, 5.0]]
+
+
+A = [(1, 10), (2, 20), (3, 30), (3, 35), (4, 40)]
+B = [(1, 3, 'p'), (3, 9, 'q'), (3, 1, 'r'), (5, 7, 's')]
+OPERATORS = {'=': lambda l, r: l == r, '<': lambda l, r: l < r, '>=': lambda l, r: l >= r}
+
+
+def expected_join(kind, op):
+    result = []
+    for a_id, x in A:
+        matches = [[a_id, x, b_id, y] for b_id, y, _ in B if OPERATORS[op](a_id, b_id)]
+        if not matches and kind == 'LEFT':
+            matches = [[a_id, x, None, None]]
+        result.extend(matches)
+    return sorted(result, key=repr)
+
+
+@pytest.fixture(params=['hash', 'merge', 'nested'])
+def join_path(request):
+    executor = Executor()
+    executor.execute_sql('CREATE TABLE a (id INT, x INT);')
+    executor.execute_sql('CREATE TABLE b (id INT, y INT, s VARCHAR);')
+    for row in A:
+        executor.execute_sql('INSERT INTO a VALUES (?, ?);', row)
+    for row in B:
+        executor.execute_sql('INSERT INTO b VALUES (?, ?, ?);', row)
+    if request.param == 'merge':
+        executor.execute_sql('CREATE INDEX a_id ON a (id);')
+        executor.execute_sql('CREATE INDEX b_id ON b (id);')
+    return executor, request.param
+
+
+def plan_method(executor, sql):
+    resultado, _ = executor.execute_sql('EXPLAIN ' + sql)[0]
+    return [row[0].strip() for row in resultado[1] if 'JOIN' in row[0] or 'NESTED' in row[0]]
+
+
+@pytest.mark.parametrize('kind', ['INNER', 'LEFT'])
+def test_join_paths_agree(join_path, kind):
+    executor, path = join_path
+    ops = ['<', '>='] if path == 'nested' else ['=']
+    for op in ops:
+        sql = f'SELECT a.id, a.x, b.id, b.y FROM a {kind} JOIN b ON a.id {op} b.id;'
+        method = {'hash': 'HASH JOIN b', 'merge': 'MERGE JOIN b', 'nested': 'NESTED LOOP b'}[path]
+        assert plan_method(executor, sql) == [method]
+        assert sorted(rows(executor, sql), key=repr) == expected_join(kind, op)
@@ -0,0 +1,93 @@
+import io
+import random
+import re
+
+import pytest
+
+import lexer
+
+
+def reference_tokens(source):
+    """Tokeniza línea a línea probando cada patrón por orden, como el lexer original."""
+    patterns = [(name, re.compile(lexer.TOKEN_TYPES[name])) for name in lexer.TOKEN_ORDER]
+    tokens = []
+    for line_num, line in enumerate(io.StringIO(source), start=1):
+        pos = 0
+        while pos < len(line):
+            for name, pattern in patterns:
+                match = pattern.match(line, pos)
+                if match:
+                    value = match.group()
+                    if name == 'WHITESPACE':
+                        pass
+                    elif name == 'IDENTIFIER' and value.upper() in lexer.KEYWORDS:
+                        tokens.append(('KEYWORD', value.upper(), line_num, pos))
+                    else:
+                        tokens.append((name, value, line_num, pos))
+                    pos = match.end()
+                    break
+            else:
+                print(f"Error léxico en línea {line_num}, posición {pos}: carácter no reconocido '{line[pos]}'")
+                pos += 1
+    return tokens
+
+
+CASES = [
+    '',
+    "SELECT nombre, edad FROM empleados WHERE fecha_nac = '1990-05-20';",
+    'select * from t where id >= 10 and id != 12 or x <= ?;\n',
+    "INSERT INTO t VALUES (1, 'a b', '2024-01-02');\nINSERT INTO t VALUES (2, 'c\\'d', 12345678901);\n",
+    'SELECT a.x, b.y FROM a LEFT JOIN b ON a.id = b.id ORDER BY a.x DESC LIMIT 3 OFFSET 1;',
+    'CREATE TABLE t (id INT PRIMARY KEY, nombre VARCHAR NOT NULL);\n\n\t  DROP TABLE t;',
+    "SELECT 'sin cerrar FROM t;\nSELECT id FROM t;\n",
+    'SELECT # FROM t; @\nSELECT é FROM t;',
+    'selectfrom SELECT_ 2024-01-0 20240102 x1y2',
+]
+
+
+def assert_same_tokens(source, capsys, chunk_sizes=(1, 3, 7, 64, lexer.CHUNK_SIZE)):
+    expected = reference_tokens(source)
+    expected_out = capsys.readouterr().out
+    for chunk_size in chunk_sizes:
+        assert list(lexer.iter_tokens(source, chunk_size=chunk_size)) == expected, chunk_size
+        assert capsys.readouterr().out == expected_out, chunk_size
+
+
+@pytest.mark.parametrize('source', CASES)
+def test_iter_tokens_matches_line_by_line_lexer(source, capsys):
+    assert_same_tokens(source, capsys)
+
+
+def test_iter_tokens_matches_line_by_line_lexer_fuzz(capsys):
+    alphabet = list("abcSELECT FROM where 0123456789-'\\\n\t ();,*<>=!.?éx_") + [
+        'SELECT', 'INSERT', '2024-01-02', "'a b'", '\n', '12345678901',
+    ]
+    rng = random.Random(1)
+    for _ in range(500):
+        source = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        assert_same_tokens(source, capsys, chunk_sizes=(1, 3, 7, 64))
+
+
+def test_bytes_and_files_match_str(tmp_path):
+    source = "SELECT id, 'ñandú' FROM t;\r\nINSERT INTO t VALUES (1);\n"
+    expected = list(lexer.iter_tokens(source.replace('\r\n', '\n')))
+    assert list(lexer.iter_tokens(source.encode('utf-8'), chunk_size=5)) == expected
+    filename = tmp_path / 'script.sql'
+    filename.write_bytes(source.encode('utf-8'))
+    assert list(lexer.iter_tokens_file(str(filename), chunk_size=5)) == expected
+    assert list(lexer.iter_tokens_file(str(filename), chunk_size=5, use_mmap=True)) == expected
+
+
+def test_unterminated_quote_stops_at_end_of_line(capsys):
+    source = "SELECT 'abc FROM t;\n" + 'SELECT id FROM t;\n' * 200
+    tokens = list(lexer.iter_tokens(source, chunk_size=16))
+    out = capsys.readouterr().out
+    assert out == "Error léxico en línea 1, posición 7: carácter no reconocido '''\n"
+    assert tokens[:4] == [
+        ('KEYWORD', 'SELECT', 1, 0),
+        ('IDENTIFIER', 'abc', 1, 8),
+        ('KEYWORD', 'FROM', 1, 12),
+        ('IDENTIFIER', 't', 1, 17),
+    ]
+    assert tokens[-1] == ('SYMBOL', ';', 201, 16)
+    assert sum(1 for t in tokens if t[1] == 'SELECT') == 201
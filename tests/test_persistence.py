@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from executor import Executor
+
+
+def ids(executor):
+    resultado, _ = executor.execute_sql('SELECT id FROM t;')[0]
+    return sorted(row[0] for row in resultado[1])
+
+
+def wal_path(path):
+    return os.path.join(path, next(name for name in os.listdir(path) if name.startswith('wal.')))
+
+
+@pytest.mark.parametrize('storage', ['ROW', 'COLUMNAR'])
+def test_reopen_without_close_replays_wal(tmp_path, storage):
+    path = str(tmp_path / 'db')
+    executor = Executor(storage=storage, path=path)
+    executor.execute_sql('CREATE TABLE t (id INT PRIMARY KEY, nombre VARCHAR);')
+    executor.execute_sql("INSERT INTO t VALUES (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd');")
+    executor.execute_sql("UPDATE t SET nombre = 'z' WHERE id = 2;")
+    executor.execute_sql('DELETE FROM t WHERE id = 3;')
+    # Sin close(): cada instrucción ya está en el WAL
+
+    reopened = Executor(storage=storage, path=path)
+    resultado, _ = reopened.execute_sql('SELECT id, nombre FROM t;')[0]
+    assert sorted(map(tuple, resultado[1])) == [(1, 'a'), (2, 'z'), (4, 'd')]
+    with pytest.raises(ValueError):
+        reopened.execute_sql("INSERT INTO t VALUES (1, 'x');")
+    reopened.close()
+
+
+def test_torn_tail_record_is_discarded(tmp_path):
+    path = str(tmp_path / 'db')
+    executor = Executor(path=path)
+    executor.execute_sql('CREATE TABLE t (id INT);')
+    executor.execute_sql('INSERT INTO t VALUES (1), (2);')
+    wal = wal_path(path)
+    intact = os.path.getsize(wal)
+    executor.execute_sql('INSERT INTO t VALUES (3);')
+    executor.close()
+
+    # Caída a mitad de escribir el último registro
+    with open(wal, 'r+b') as f:
+        f.truncate(intact + (os.path.getsize(wal) - intact) // 2)
+
+    reopened = Executor(path=path)
+    assert ids(reopened) == [1, 2]
+    assert os.path.getsize(wal) == intact
+    # Lo que se escribe después sigue a los registros íntegros
+    reopened.execute_sql('INSERT INTO t VALUES (4);')
+    reopened.close()
+    assert ids(Executor(path=path)) == [1, 2, 4]
+
+
+def test_corrupt_tail_record_is_discarded(tmp_path):
+    path = str(tmp_path / 'db')
+    executor = Executor(path=path)
+    executor.execute_sql('CREATE TABLE t (id INT);')
+    executor.execute_sql('INSERT INTO t VALUES (1);')
+    executor.execute_sql('INSERT INTO t VALUES (2);')
+    executor.close()
+
+    wal = wal_path(path)
+    with open(wal, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    assert ids(Executor(path=path)) == [1]
+
+
+def test_checkpoint_then_wal(tmp_path):
+    path = str(tmp_path / 'db')
+    executor = Executor(storage='COLUMNAR', path=path)
+    executor.execute_sql('CREATE TABLE t (id INT);')
+    executor.execute_sql('INSERT INTO t VALUES (1), (2), (3);')
+    executor.execute_sql('CREATE INDEX t_id ON t (id);')
+    executor.execute_sql('DELETE FROM t WHERE id = 2;')
+    executor.checkpoint()
+    executor.execute_sql('INSERT INTO t VALUES (5);')
+    executor.execute_sql('DELETE FROM t WHERE id = 1;')
+
+    reopened = Executor(storage='COLUMNAR', path=path)
+    assert ids(reopened) == [3, 5]
+    resultado, _ = reopened.execute_sql('SELECT id FROM t WHERE id >= 3 ORDER BY id DESC;')[0]
+    assert resultado[1] == [[5], [3]]
+    reopened.close()
@@ -0,0 +1,42 @@
+import pytest
+
+from executor import Executor
+
+
+def ids(executor, sql='SELECT id FROM t;'):
+    resultado, _ = executor.execute_sql(sql)[0]
+    return [row[0] for row in resultado[1]]
+
+
+@pytest.mark.parametrize('storage', ['ROW', 'COLUMNAR'])
+def test_snapshot_does_not_shift_wal_positions(tmp_path, storage):
+    path = str(tmp_path / 'db')
+    executor = Executor(storage=storage, path=path)
+    executor.execute_sql('CREATE TABLE t (id INT, nombre VARCHAR);')
+    for i in range(10):
+        executor.execute_sql('INSERT INTO t VALUES (?, ?);', (i, f'n{i}'))
+    executor.execute_sql('DELETE FROM t WHERE id = 0;')
+    executor.save_snapshot(str(tmp_path / 't.snap'))
+    executor.execute_sql('DELETE FROM t WHERE id = 5;')
+    executor.close()
+
+    reopened = Executor(storage=storage, path=path)
+    assert ids(reopened) == [1, 2, 3, 4, 6, 7, 8, 9]
+    reopened.close()
+
+
+@pytest.mark.parametrize('storage', ['ROW', 'COLUMNAR'])
+def test_snapshot_skips_deleted_rows(tmp_path, storage):
+    executor = Executor(storage=storage)
+    executor.execute_sql('CREATE TABLE t (id INT, nombre VARCHAR);')
+    for i in range(10):
+        executor.execute_sql('INSERT INTO t VALUES (?, ?);', (9 - i, f'n{i}'))
+    executor.execute_sql('CREATE INDEX t_id ON t (id);')
+    executor.execute_sql('DELETE FROM t WHERE id < 3;')
+    filename = str(tmp_path / 't.snap')
+    executor.save_snapshot(filename)
+
+    loaded = Executor(storage=storage)
+    loaded.load_snapshot(filename)
+    assert ids(loaded) == [9, 8, 7, 6, 5, 4, 3]
+    assert ids(loaded, 'SELECT id FROM t WHERE id >= 5 ORDER BY id;') == [5, 6, 7, 8, 9]